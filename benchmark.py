@@ -0,0 +1,221 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import queue
+import statistics
+import sys
+import time
+
+from ipc_manager import IPCManager
+from ipc_manager_pipes import IPCManagerPipes
+from receiver import Receiver
+from sender import Sender
+from transm_global_params import CongestionControlType
+from transm_global_params import TransmissionProtocol
+import transm_global_params
+
+BACKENDS = ("pipes", "queues")  # IPCManagerPipes, IPCManager
+QUEUES_ADDRESS = ('localhost', 5001)  # the sender.py/receiver.py pair uses 5000
+
+# the sweep, --quick keeps the first value of each
+PROTOCOLS = (TransmissionProtocol.ALGORITHM_TYPE_GBN, TransmissionProtocol.ALGORITHM_TYPE_SR)
+WINDOW_SIZES = (8, 32)
+BIT_ERROR_RATES = (0.0, 1e-6, 1e-5)  # about 0%, 1% and 8% of the 1 KB frames corrupted
+FRAME_SIZES = (1024, 256)
+
+KEY = ("backend", "protocol", "window", "bit_error_rate", "frame_size")
+COUNTS = ("transfers", "failed")
+METRICS = ("goodput_mb_s", "frames_s", "latency_p50_s", "latency_p99_s", "retransmission_ratio",
+           "sender_cpu_s", "receiver_cpu_s")
+# metrics where a higher value is the regression
+HIGHER_IS_WORSE = ("latency_p50_s", "latency_p99_s", "retransmission_ratio", "sender_cpu_s", "receiver_cpu_s")
+
+
+def configure(transmission_protocol, window, bit_error_rate, frame_size):
+    # the parameters of one point of the sweep, applied in both processes
+    params = dict(TRANSMISSION_PROTOCOL_TYPE=transmission_protocol, WINDOW_SIZE=window,
+                  CONGESTION_CONTROL_TYPE=CongestionControlType.FIXED_WINDOW, BIT_ERROR_RATE=bit_error_rate,
+                  FRAME_SIZE=frame_size, TRANSMISSION_TIMEOUT=30)
+    for name, value in params.items():
+        setattr(transm_global_params, name, value)
+    return params
+
+
+def make_payloads(transfer_size, frame_size):
+    return [bytes([i % 256]) * frame_size for i in range(max(1, transfer_size // frame_size))]
+
+
+def receive(backend, ipc_manager, params, transfer_size, results):
+    # receiver process: one transfer, reports its CPU time and whether the payloads arrived intact
+    for name, value in params.items():
+        setattr(transm_global_params, name, value)
+    if backend == "queues":
+        ipc_manager = IPCManager(QUEUES_ADDRESS)
+        ipc_manager.connect()
+    receiver = Receiver(ipc_manager, params['TRANSMISSION_PROTOCOL_TYPE'])
+    cpu_start = time.process_time()
+    received = receiver.receive() if receiver.wait_for_connection() else None
+    results.put(dict(is_received=received == make_payloads(transfer_size, params['FRAME_SIZE']),
+                     cpu=time.process_time() - cpu_start))
+
+
+def transfer(backend, params, transfer_size):
+    # one sender/receiver pair with the receiver in its own process,
+    # returns (seconds, sender CPU seconds, frames sent, the receiver report), None when the transfer failed
+    if backend == "pipes":
+        ipc_manager = IPCManagerPipes()
+    else:
+        ipc_manager = IPCManager(QUEUES_ADDRESS)
+        ipc_manager.start()
+    results = multiprocessing.Queue()
+    receiver_process = multiprocessing.Process(
+        target=receive, args=(backend, ipc_manager if backend == "pipes" else None, params, transfer_size, results))
+    receiver_process.start()
+    try:
+        payloads = make_payloads(transfer_size, params['FRAME_SIZE'])
+        sender = Sender(ipc_manager, params['TRANSMISSION_PROTOCOL_TYPE'])
+        cpu_start = time.process_time()
+        if not sender.wait_for_connection():
+            return None
+        start_time = time.perf_counter()
+        is_sent = sender.send(payloads)
+        elapsed = time.perf_counter() - start_time
+        cpu = time.process_time() - cpu_start
+        report = results.get(timeout=transm_global_params.TRANSMISSION_TIMEOUT)
+        receiver_process.join()
+    except queue.Empty:
+        return None
+    finally:
+        if receiver_process.is_alive():
+            receiver_process.terminate()
+        if backend == "queues":
+            ipc_manager.shutdown()
+    if not is_sent or not report['is_received']:
+        return None
+    return elapsed, cpu, sender.total_sent_, report
+
+
+def measure(backend, transmission_protocol, window, bit_error_rate, frame_size, transfer_size, repeat):
+    params = configure(transmission_protocol, window, bit_error_rate, frame_size)
+    frames_count = len(make_payloads(transfer_size, frame_size))
+    runs = [transfer(backend, params, transfer_size) for _ in range(repeat)]
+    result = dict(
+        backend=backend,
+        protocol="GBN" if transmission_protocol == TransmissionProtocol.ALGORITHM_TYPE_GBN else "SR",
+        window=window,
+        bit_error_rate=bit_error_rate,
+        frame_size=frame_size,
+        transfers=repeat,
+        failed=runs.count(None))
+    runs = [run for run in runs if run is not None]
+    if len(runs) == 0:
+        return dict(result, **{metric: None for metric in METRICS})
+    latencies = sorted(elapsed for elapsed, _, _, _ in runs)
+    return dict(
+        result,
+        goodput_mb_s=frames_count * frame_size / statistics.median(latencies) / 1e6,
+        frames_s=statistics.mean(sent / elapsed for elapsed, _, sent, _ in runs),
+        latency_p50_s=statistics.median(latencies),
+        latency_p99_s=latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+        retransmission_ratio=statistics.mean(sent / frames_count - 1 for _, _, sent, _ in runs),
+        sender_cpu_s=statistics.mean(cpu for _, cpu, _, _ in runs),
+        receiver_cpu_s=statistics.mean(report['cpu'] for _, _, _, report in runs))
+
+
+def compare(results, baseline, tolerance):
+    # the metrics that got worse than the baseline by more than tolerance (relative),
+    # returns a list of (result, metric, baseline value)
+    baseline_results = {tuple(result[name] for name in KEY): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        base = baseline_results.get(tuple(result[name] for name in KEY))
+        if base is None:
+            continue
+        if result["failed"] > base["failed"]:
+            regressions.append((result, "failed", base["failed"]))
+        for metric in METRICS:
+            if result[metric] is None or base[metric] is None:
+                continue
+            if metric in HIGHER_IS_WORSE:
+                # retransmission ratios near 0 get an absolute slack, relative changes mean nothing there
+                is_worse = result[metric] > base[metric] * (1 + tolerance) + (
+                    0.01 if metric == "retransmission_ratio" else 0.0)
+            else:
+                is_worse = result[metric] < base[metric] * (1 - tolerance)
+            if is_worse:
+                regressions.append((result, metric, base[metric]))
+    return regressions
+
+
+def format_result(result):
+    line = "{backend:<7} {protocol:<6} {window:>6} {bit_error_rate:>8.0e} {frame_size:>6} ".format(**result)
+    if result["goodput_mb_s"] is None:
+        return line + "all {} transfers failed".format(result["transfers"])
+    line += ("{goodput_mb_s:>8.3f} {frames_s:>9.0f} {latency_p50_s:>8.3f} {latency_p99_s:>8.3f} "
+             "{retransmission_ratio:>7.3f} {sender_cpu_s:>8.3f} {receiver_cpu_s:>8.3f}").format(**result)
+    if result["failed"] != 0:
+        line += " {} failed".format(result["failed"])
+    return line
+
+
+def write_csv(path, results):
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(KEY) + list(COUNTS) + list(METRICS))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="GBN and SR transfers over the IPC backends")
+    parser.add_argument("--json", help="write the results here")
+    parser.add_argument("--csv", help="write the results here")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative change flagged as a regression")
+    parser.add_argument("--backend", choices=BACKENDS, action="append", help="default: all")
+    parser.add_argument("--transfer-size", type=int, default=256 * 1024, help="payload bytes per transfer")
+    parser.add_argument("--repeat", type=int, default=5, help="transfers per point")
+    parser.add_argument("--quick", action="store_true", help="only the first value of every swept parameter")
+    args = parser.parse_args(argv)
+
+    sweep = [PROTOCOLS, WINDOW_SIZES, BIT_ERROR_RATES, FRAME_SIZES]
+    if args.quick:
+        sweep = [values[:1] for values in sweep]
+
+    print("{:<7} {:<6} {:>6} {:>8} {:>6} {:>8} {:>9} {:>8} {:>8} {:>7} {:>8} {:>8}".format(
+        "backend", "proto", "window", "BER", "frame", "MB/s", "frames/s", "p50 s", "p99 s", "retr.",
+        "snd cpu", "rcv cpu"))
+    results = []
+    for backend in args.backend or BACKENDS:
+        for transmission_protocol in sweep[0]:
+            for window in sweep[1]:
+                for bit_error_rate in sweep[2]:
+                    for frame_size in sweep[3]:
+                        result = measure(backend, transmission_protocol, window, bit_error_rate, frame_size,
+                                         args.transfer_size, args.repeat)
+                        results.append(result)
+                        print(format_result(result))
+
+    if args.json is not None:
+        with open(args.json, 'w') as file:
+            json.dump(dict(transfer_size=args.transfer_size, repeat=args.repeat, time=time.time(),
+                           results=results), file, indent=2)
+    if args.csv is not None:
+        write_csv(args.csv, results)
+
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.tolerance)
+        for result, metric, base in regressions:
+            print("REGRESSION", *(result[name] for name in KEY), metric, round(base, 4), "->",
+                  round(result[metric], 4))
+        if len(regressions) != 0:
+            return 1
+        print("no regressions against", args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    # python benchmark.py --json results.json, later runs add --baseline results.json
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+
+from ipc_manager_pipes import IPCManagerPipes
+from sender import Sender
+from receiver import Receiver
+from transm_global_params import TransmissionProtocol
+import transm_global_params
+
+
+def make_links(transmission_protocol, links_count):
+    links = []
+    for _ in range(links_count):
+        ipc_manager = IPCManagerPipes()
+        links.append((Sender(ipc_manager, transmission_protocol), Receiver(ipc_manager, transmission_protocol)))
+    return links
+
+
+def run_threads(links, data):
+    # the blocking API, a thread per end of every link
+    results = []
+
+    def send(sender):
+        results.append(sender.wait_for_connection() and sender.send(data))
+
+    def receive(receiver):
+        results.append(receiver.wait_for_connection() and receiver.receive() == data)
+
+    threads = [threading.Thread(target=send, args=(sender,)) for sender, _ in links]
+    threads += [threading.Thread(target=receive, args=(receiver,)) for _, receiver in links]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+async def run_tasks(links, data):
+    # the coroutines, every end of every link is a task of one event loop in this thread
+    async def send(sender):
+        return await sender.wait_for_connection_async() and await sender.send_async(data)
+
+    async def receive(receiver):
+        return await receiver.wait_for_connection_async() and await receiver.receive_async() == data
+
+    return await asyncio.gather(*(send(sender) for sender, _ in links),
+                                *(receive(receiver) for _, receiver in links))
+
+
+if __name__ == "__main__":
+    # every link transfers 200 frames of 256 bytes at the same time; the threads contend for the GIL,
+    # the event loop sleeps in one epoll on all the pipes
+    frames_count = 200
+    frame_size = 256
+    data = [bytes([i % 256]) * frame_size for i in range(frames_count)]
+    transm_global_params.BIT_ERROR_RATE = 1e-5
+    transm_global_params.CONNECTION_TIMEOUT = 30
+    transm_global_params.TRANSMISSION_TIMEOUT = 60
+
+    print("{:<6} {:>6} {:<8} {:>8} {:>8} {:>10} {:>8}".format(
+        "proto", "links", "mode", "wall s", "cpu s", "frames/s", "ok"))
+    for transmission_protocol in (TransmissionProtocol.ALGORITHM_TYPE_GBN, TransmissionProtocol.ALGORITHM_TYPE_SR):
+        for links_count in (10, 100, 300):
+            for mode in ("threads", "asyncio"):
+                links = make_links(transmission_protocol, links_count)
+                start_time = time.perf_counter()
+                cpu_start = time.process_time()
+                if mode == "threads":
+                    results = run_threads(links, data)
+                else:
+                    results = asyncio.run(run_tasks(links, data))
+                elapsed = time.perf_counter() - start_time
+                cpu = time.process_time() - cpu_start
+                print("{:<6} {:>6} {:<8} {:>8.3f} {:>8.3f} {:>10.0f} {:>8}".format(
+                    "GBN" if transmission_protocol == TransmissionProtocol.ALGORITHM_TYPE_GBN else "SR",
+                    links_count, mode, elapsed, cpu, sum(sender.total_sent_ for sender, _ in links) / elapsed,
+                    "{}/{}".format(sum(1 for result in results if result), len(results))))
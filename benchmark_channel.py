@@ -0,0 +1,57 @@
+import random
+import timeit
+
+from benchmark_recovery import transfer
+from channel import make_channel
+from transm_global_params import ChannelLossType
+from transm_global_params import TransmissionProtocol
+import transm_global_params
+
+# link profiles on top of the CHANNEL_* defaults
+PROFILES = [
+    ("lan", dict(CHANNEL_LATENCY=0.0005, CHANNEL_JITTER=0.0001)),
+    ("wan", dict(CHANNEL_LATENCY=0.02, CHANNEL_JITTER=0.002)),
+    ("wan 2% loss", dict(CHANNEL_LATENCY=0.02, CHANNEL_JITTER=0.002,
+                         CHANNEL_LOSS_TYPE=ChannelLossType.BERNOULLI, CHANNEL_LOSS_PROBABILITY=0.02)),
+    ("wan bursts", dict(CHANNEL_LATENCY=0.02, CHANNEL_JITTER=0.002,
+                        CHANNEL_LOSS_TYPE=ChannelLossType.GILBERT_ELLIOTT)),
+    ("wan reorder", dict(CHANNEL_LATENCY=0.02, CHANNEL_JITTER=0.002,
+                         CHANNEL_REORDER_PROBABILITY=0.05, CHANNEL_REORDER_DELAY=0.005)),
+    ("1 MB/s q32", dict(CHANNEL_LATENCY=0.005, CHANNEL_RATE=1000000, CHANNEL_QUEUE_LIMIT=32)),
+]
+
+
+def configure(params):
+    defaults = dict(CHANNEL_EMULATION=True, BIT_ERROR_RATE=0.0, CHANNEL_LATENCY=0.005, CHANNEL_JITTER=0.001,
+                    CHANNEL_REORDER_PROBABILITY=0.0, CHANNEL_REORDER_DELAY=0.002, CHANNEL_RATE=0,
+                    CHANNEL_QUEUE_LIMIT=0, CHANNEL_LOSS_TYPE=ChannelLossType.NONE, SELECTIVE_ACK=True)
+    defaults.update(params)
+    for name, value in defaults.items():
+        setattr(transm_global_params, name, value)
+
+
+if __name__ == "__main__":
+    # Go-Back-N against Selective Repeat on emulated links, 1 KB frames
+    frames_count = 1000
+    frame_size = 1024
+    transm_global_params.TRANSMISSION_TIMEOUT = 120
+
+    configure(dict(PROFILES[3][1], CHANNEL_RATE=1000000, CHANNEL_REORDER_PROBABILITY=0.05))
+    channel = make_channel(0)
+    buf = b'x' * frame_size
+    repeat = 100000
+    print("channel, every stage on:", round(timeit.timeit(lambda: channel.transmit(buf, 0.0), number=repeat)
+                                            / repeat * 1e6, 2), "us per frame")
+
+    print("{:<12} {:<6} {:>8} {:>8} {:>8} {:>8} {:>10}".format(
+        "link", "proto", "time s", "MB/s", "sent", "lost", "fast retr."))
+    for name, params in PROFILES:
+        for transmission_protocol in (TransmissionProtocol.ALGORITHM_TYPE_GBN, TransmissionProtocol.ALGORITHM_TYPE_SR):
+            configure(params)
+            random.seed(0)
+            elapsed, sender, receiver = transfer(transmission_protocol, frames_count, frame_size)
+            channel = sender.ipc_manager_.to_receiver_
+            print("{:<12} {:<6} {:>8.3f} {:>8.3f} {:>8} {:>8} {:>10}".format(
+                name, "GBN" if transmission_protocol == TransmissionProtocol.ALGORITHM_TYPE_GBN else "SR",
+                elapsed, frames_count * frame_size / elapsed / 1e6, sender.total_sent_,
+                channel.total_lost_ + channel.total_queue_dropped_, sender.total_fast_retransmit_))
@@ -0,0 +1,44 @@
+import struct
+import timeit
+import zlib
+
+from frame import Frame
+from frame import CHECKSUM
+
+PLAIN_HEADER = struct.Struct('<qBH')  # the header before the checksum field
+
+
+def plain_to_bytes(frame):
+    return PLAIN_HEADER.pack(frame.seq_num_, 0x08, frame.window_) + frame.data_
+
+
+def plain_from_bytes(buf):
+    seq_num, flags, window = PLAIN_HEADER.unpack_from(buf)
+    return Frame(bytes(buf[PLAIN_HEADER.size:]), seq_num, flags & 0x01 != 0, False)
+
+
+def measure(size, repeat):
+    frame = Frame(b'x' * size, 12345, False, False)
+    buf = frame.to_bytes()
+    plain_buf = plain_to_bytes(frame)
+    covered = buf[CHECKSUM.size:]  # header fields and payload
+
+    crc_us = timeit.timeit(lambda: zlib.crc32(covered), number=repeat) / repeat * 1e6
+    encode_us = timeit.timeit(frame.to_bytes, number=repeat) / repeat * 1e6
+    decode_us = timeit.timeit(lambda: Frame.from_bytes(buf), number=repeat) / repeat * 1e6
+    plain_encode_us = timeit.timeit(lambda: plain_to_bytes(frame), number=repeat) / repeat * 1e6
+    plain_decode_us = timeit.timeit(lambda: plain_from_bytes(plain_buf), number=repeat) / repeat * 1e6
+
+    overhead = (encode_us + decode_us) / (plain_encode_us + plain_decode_us) * 100 - 100
+    print("{:>8} {:>10.2f} {:>10.0f} {:>10.2f} {:>10.2f} | {:>10.2f} {:>10.2f} {:>9.0f}%".format(
+        size, crc_us, size / crc_us if crc_us != 0 else 0, encode_us, decode_us,
+        plain_encode_us, plain_decode_us, overhead))
+
+
+if __name__ == "__main__":
+    # price of the CRC32 at the frame codec: the checksum is computed once per encode and once per decode,
+    # against the same codec without it
+    print("{:>8} {:>10} {:>10} {:>10} {:>10} | {:>10} {:>10} {:>10}".format(
+        "payload", "crc us", "crc MB/s", "enc us", "dec us", "plain enc", "plain dec", "overhead"))
+    for size in (0, 64, 256, 1024, 4096, 16384, 65536):
+        measure(size, 100000 if size <= 4096 else 10000)
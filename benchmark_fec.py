@@ -0,0 +1,26 @@
+import random
+
+from benchmark_recovery import transfer
+from transm_global_params import TransmissionProtocol
+import transm_global_params
+
+
+if __name__ == "__main__":
+    # frames on the link (data, retransmissions and parity) and time per transfer for pure ARQ and FEC groups,
+    # FEC pays off where the recovered frames save more than the parity frames cost
+    frames_count = 300
+    transm_global_params.TRANSMISSION_TIMEOUT = 120
+    print("{:<6} {:>8} {:>6} {:>8} {:>8} {:>10} {:>8}".format(
+        "proto", "BER", "group", "sent", "parity", "recovered", "time s"))
+    for transmission_protocol in (TransmissionProtocol.ALGORITHM_TYPE_GBN, TransmissionProtocol.ALGORITHM_TYPE_SR):
+        for bit_error_rate in (2e-5, 1e-4, 2e-4, 4e-4):  # 1, 6, 12 and 22% of the 64 byte frames corrupted
+            transm_global_params.BIT_ERROR_RATE = bit_error_rate
+            for group_size in (0, 4, 8, 16):
+                transm_global_params.FEC_GROUP_SIZE = group_size
+                random.seed(0)
+                elapsed, sender, receiver = transfer(transmission_protocol, frames_count)
+                print("{:<6} {:>8.0e} {:>6} {:>8} {:>8} {:>10} {:>8.3f}".format(
+                    "GBN" if transmission_protocol == TransmissionProtocol.ALGORITHM_TYPE_GBN else "SR",
+                    bit_error_rate, group_size, sender.total_sent_,
+                    getattr(sender.ipc_manager_, 'total_parity_sent_', 0),
+                    getattr(receiver.ipc_manager_, 'total_recovered_', 0), elapsed))
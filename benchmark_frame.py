@@ -0,0 +1,38 @@
+import pickle
+import timeit
+
+from frame import Frame
+
+
+class PickledFrame:  # the previous plain-object frame, pickled whole on every send
+    def __init__(self, data, seq_num, is_last, is_corrupted):
+        self.data_ = data
+        self.seq_num_ = seq_num
+        self.is_last_ = is_last
+        self.is_corrupted_ = is_corrupted
+
+
+def measure(name, data, repeat):
+    frame = Frame(data, 12345, False, False)
+    old_frame = PickledFrame(data, 12345, False, False)
+    buf = frame.to_bytes()
+    old_buf = pickle.dumps(old_frame)
+
+    encode_us = timeit.timeit(frame.to_bytes, number=repeat) / repeat * 1e6
+    decode_us = timeit.timeit(lambda: Frame.from_bytes(buf), number=repeat) / repeat * 1e6
+    old_encode_us = timeit.timeit(lambda: pickle.dumps(old_frame), number=repeat) / repeat * 1e6
+    old_decode_us = timeit.timeit(lambda: pickle.loads(old_buf), number=repeat) / repeat * 1e6
+
+    print("{:<16} {:>8} {:>10.2f} {:>10.2f} | {:>8} {:>10.2f} {:>10.2f}".format(
+        name, len(buf), encode_us, decode_us, len(old_buf), old_encode_us, old_decode_us))
+
+
+if __name__ == "__main__":
+    repeat = 100000
+    print("{:<16} {:>8} {:>10} {:>10} | {:>8} {:>10} {:>10}".format(
+        "payload", "bytes", "enc us", "dec us", "pickle", "enc us", "dec us"))
+    measure("ack", None, repeat)
+    measure("str 64", "x" * 64, repeat)
+    measure("bytes 1024", b"x" * 1024, repeat)
+    measure("bytes 65536", b"x" * 65536, repeat // 10)
+    measure("neighbor list", [(1, 1), (2, 1), (3, 1)], repeat)
@@ -0,0 +1,97 @@
+import math
+import time
+
+import numpy
+
+from benchmark_channel import configure
+from monte_carlo import frame_error_probability
+from monte_carlo import simulate
+from monte_carlo import sweep
+from rtt_estimator import RttEstimator
+from simulator import simulate_transfer
+from transm_global_params import CongestionControlType
+from transm_global_params import TransmissionProtocol
+import transm_global_params
+
+FRAME_SIZE = 256
+LATENCY = 0.005  # sec, one way
+
+
+def settled_rto(rtt):
+    # the timeout RttEstimator settles on with the current parameters once every round trip takes rtt
+    rtt_estimator = RttEstimator(rtt)
+    for _ in range(100):
+        rtt_estimator.add_sample(rtt)
+    return rtt_estimator.rto()
+
+
+def protocol_name(transmission_protocol):
+    return "GBN" if transmission_protocol == TransmissionProtocol.ALGORITHM_TYPE_GBN else "SR"
+
+
+def cross_check(transmission_protocol, window_size, bit_error_rate, frames_count, seeds):
+    # the model against the real Sender and Receiver on the simulated link, timeout recovery only
+    configure(dict(CHANNEL_LATENCY=LATENCY, CHANNEL_JITTER=0.0, BIT_ERROR_RATE=bit_error_rate))
+    transm_global_params.CONGESTION_CONTROL_TYPE = CongestionControlType.FIXED_WINDOW
+    transm_global_params.WINDOW_SIZE = window_size
+    transm_global_params.SELECTIVE_NACK = False
+    transm_global_params.DUP_ACK_THRESHOLD = 0
+    transm_global_params.DELAYED_ACK = False
+    transm_global_params.TRANSMISSION_TIMEOUT = 60
+
+    payloads = [b'x' * FRAME_SIZE] * frames_count
+    sent = []
+    send_duration = []
+    for seed in seeds:
+        result = simulate_transfer(transmission_protocol, payloads, seed)
+        if result.payloads_ == payloads:
+            sent.append(result.sender_.total_sent_)
+            send_duration.append(result.send_duration_)
+
+    model = simulate(transmission_protocol, window_size, frames_count,
+                     frame_error_probability(FRAME_SIZE, bit_error_rate), frame_size=FRAME_SIZE,
+                     rtt=2 * LATENCY, rto=settled_rto(2 * LATENCY), transfers=10000, seed=0,
+                     initial_rto=transm_global_params.TIMEOUT_GO_BACK_N_SENDER
+                     if transmission_protocol == TransmissionProtocol.ALGORITHM_TYPE_GBN
+                     else transm_global_params.TIMEOUT_SEL_REPEAT_SENDER)
+    retransmission_ratio = numpy.mean(sent) / frames_count - 1 if len(sent) != 0 else float('nan')
+    completion_time = numpy.median(send_duration) if len(sent) != 0 else float('nan')
+    print("{:<6} {:>6} {:>10.0e} {:>8} | {:>10.3f} {:>10.3f} | {:>10.3f} {:>10.3f} {:>8}".format(
+        protocol_name(transmission_protocol), window_size, bit_error_rate, frames_count,
+        model.retransmission_ratio(), retransmission_ratio, model.completion_time(), completion_time,
+        "{}/{}".format(len(sent), len(seeds))))
+    # the model counts the retransmissions closely, its rounds of a whole window are coarser in time
+    # than the per-frame timers of the senders
+    assert len(sent) != 0
+    assert math.isclose(model.retransmission_ratio(), retransmission_ratio, rel_tol=0.2, abs_tol=0.02)
+    assert math.isclose(model.completion_time(), completion_time, rel_tol=0.4)
+
+
+if __name__ == "__main__":
+    # expected retransmissions, completion time and throughput over a WINDOW_SIZE x BIT_ERROR_RATE x protocol x
+    # frames count grid, 1000 transfers per point
+    protocols = (TransmissionProtocol.ALGORITHM_TYPE_GBN, TransmissionProtocol.ALGORITHM_TYPE_SR)
+    window_sizes = (1, 4, 16, 64)
+    bit_error_rates = (0.0, 1e-5, 1e-4, 3e-4)
+    frames_counts = (100, 1000)
+
+    start_time = time.perf_counter()
+    rows = sweep(protocols, window_sizes, bit_error_rates, frames_counts, FRAME_SIZE, rtt=2 * LATENCY,
+                 rto=settled_rto(2 * LATENCY))
+    elapsed = time.perf_counter() - start_time
+    print(len(rows), "points,", len(rows) * 1000, "transfers in", round(elapsed, 2), "s")
+
+    print("{:<6} {:>6} {:>10} {:>8} {:>10} {:>10} {:>10} {:>10}".format(
+        "proto", "window", "BER", "frames", "frame err", "retr.", "p50 s", "KB/s"))
+    for transmission_protocol, window_size, bit_error_rate, frames_count, result in rows:
+        print("{:<6} {:>6} {:>10.0e} {:>8} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.1f}".format(
+            protocol_name(transmission_protocol), window_size, bit_error_rate, frames_count,
+            frame_error_probability(FRAME_SIZE, bit_error_rate), result.retransmission_ratio(),
+            result.completion_time(), result.throughput() / 1e3))
+
+    print()
+    print("{:<6} {:>6} {:>10} {:>8} | {:>10} {:>10} | {:>10} {:>10} {:>8}".format(
+        "proto", "window", "BER", "frames", "retr.", "sim retr.", "p50 s", "sim p50 s", "sim ok"))
+    for transmission_protocol in protocols:
+        for window_size, bit_error_rate in ((4, 1e-4), (16, 3e-5), (16, 1e-4)):
+            cross_check(transmission_protocol, window_size, bit_error_rate, 200, range(30))
@@ -0,0 +1,55 @@
+import random
+import threading
+import time
+
+from ipc_manager_pipes import IPCManagerPipes
+from sender import Sender
+from receiver import Receiver
+from transm_global_params import TransmissionProtocol
+import transm_global_params
+
+
+def transfer(transmission_protocol, frames_count, frame_size=64):
+    # one transmission over pipes with the receiver in a thread, returns (seconds, sender, receiver)
+    ipc_manager = IPCManagerPipes()
+    sender = Sender(ipc_manager, transmission_protocol)
+    receiver = Receiver(ipc_manager, transmission_protocol)
+    data = [b'x' * frame_size] * frames_count
+    received = []
+
+    def receive():
+        receiver.wait_for_connection()
+        received.append(receiver.receive())
+
+    receiver_thread = threading.Thread(target=receive)
+    receiver_thread.start()
+    sender.wait_for_connection()
+    start = time.perf_counter()
+    assert sender.send(data)
+    elapsed = time.perf_counter() - start
+    receiver_thread.join()
+    assert received[0] == data
+    return elapsed, sender, receiver
+
+
+if __name__ == "__main__":
+    # with fast recovery a loss is repaired after one round trip, so the transfer time should stay flat
+    # while the RTO floor grows; without it every loss costs at least one RTO
+    frames_count = 300
+    transm_global_params.BIT_ERROR_RATE = 1.7e-4  # about 10% of the 64 byte frames are corrupted
+    transm_global_params.TRANSMISSION_TIMEOUT = 120
+    print("{:<6} {:>8} {:>14} {:>8} {:>14} {:>8}".format(
+        "proto", "RTO_MIN", "timeout only s", "sent", "fast recov. s", "sent"))
+    for transmission_protocol in (TransmissionProtocol.ALGORITHM_TYPE_GBN, TransmissionProtocol.ALGORITHM_TYPE_SR):
+        for rto_min in (0.005, 0.02, 0.08):
+            transm_global_params.RTO_MIN = rto_min
+            results = []
+            for is_fast_recovery in (False, True):
+                transm_global_params.SELECTIVE_NACK = is_fast_recovery
+                transm_global_params.DUP_ACK_THRESHOLD = 3 if is_fast_recovery else 0
+                random.seed(0)
+                elapsed, sender, receiver = transfer(transmission_protocol, frames_count)
+                results.extend((elapsed, sender.total_sent_))
+            print("{:<6} {:>8.3f} {:>14.3f} {:>8} {:>14.3f} {:>8}".format(
+                "GBN" if transmission_protocol == TransmissionProtocol.ALGORITHM_TYPE_GBN else "SR", rto_min,
+                *results))
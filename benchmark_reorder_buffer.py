@@ -0,0 +1,76 @@
+import random
+import time
+
+from frame import Frame
+from reorder_buffer import ReorderBuffer
+
+
+def arrival_order(frames_count, window_size):
+    # every window arrives shuffled, so most frames are buffered before the expected one shows up
+    seq_nums = []
+    for base in range(0, frames_count, window_size):
+        block = list(range(base, min(base + window_size, frames_count)))
+        random.shuffle(block)
+        seq_nums.extend(block)
+    return [Frame(None, seq_num, False, False) for seq_num in seq_nums]
+
+
+def reorder_list(frames):
+    # sorted-list buffering previously used by Receiver.receive_sel_repeat
+    received_frames = []
+    seq_num_expected = 0
+    for frame in frames:
+        if frame.seq_num_ == seq_num_expected:
+            seq_num_expected += 1
+            prev_seq_num = frame.seq_num_
+            while len(received_frames) != 0:
+                if received_frames[0].seq_num_ == prev_seq_num + 1:
+                    seq_num_expected += 1
+                    del received_frames[0]
+                    prev_seq_num += 1
+                else:
+                    break
+        elif len(received_frames) != 0:
+            insertion_idx = 0
+            while insertion_idx < len(received_frames) and frame.seq_num_ > received_frames[insertion_idx].seq_num_:
+                insertion_idx += 1
+            if insertion_idx < len(received_frames) and received_frames[insertion_idx].seq_num_ != frame.seq_num_:
+                received_frames.insert(insertion_idx, frame)
+            elif insertion_idx == len(received_frames):
+                received_frames.append(frame)
+        else:
+            received_frames.append(frame)
+    return seq_num_expected
+
+
+def reorder_ring(frames, window_size):
+    received_frames = ReorderBuffer(window_size)
+    seq_num_expected = 0
+    for frame in frames:
+        if frame.seq_num_ == seq_num_expected:
+            seq_num_expected += 1
+            while len(received_frames) != 0:
+                if received_frames.pop(seq_num_expected) is None:
+                    break
+                seq_num_expected += 1
+        else:
+            received_frames.insert(frame, seq_num_expected)
+    return seq_num_expected
+
+
+if __name__ == "__main__":
+    frames_count = 100000
+    random.seed(0)
+    print("{:>8} {:>14} {:>14} {:>8}".format("window", "list us/frame", "ring us/frame", "speedup"))
+    for window_size in (5, 64, 1024):
+        frames = arrival_order(frames_count, window_size)
+
+        start = time.perf_counter()
+        assert reorder_list(frames) == frames_count
+        list_us = (time.perf_counter() - start) / frames_count * 1e6
+
+        start = time.perf_counter()
+        assert reorder_ring(frames, window_size) == frames_count
+        ring_us = (time.perf_counter() - start) / frames_count * 1e6
+
+        print("{:>8} {:>14.3f} {:>14.3f} {:>8.1f}".format(window_size, list_us, ring_us, list_us / ring_us))
@@ -0,0 +1,125 @@
+import math
+import random
+import time
+from queue import PriorityQueue
+
+from routing import ShortestPathTree
+from routing import changed_edges
+
+
+def random_graph(nodes_count, degree):
+    # connected: a random spanning tree plus random edges up to the average degree, weights 1..10
+    edges = {}
+    for node in range(1, nodes_count):
+        edges[(random.randrange(node), node)] = random.randint(1, 10)
+    while len(edges) < nodes_count * degree // 2:
+        node, neighbor = random.sample(range(nodes_count), 2)
+        edges[(min(node, neighbor), max(node, neighbor))] = random.randint(1, 10)
+    return edges
+
+
+def adjacency_list(edges, nodes_count):
+    adjacency = {node: [] for node in range(nodes_count)}
+    for (node, neighbor), weight in edges.items():
+        adjacency[node].append((neighbor, weight))
+        adjacency[neighbor].append((node, weight))
+    return adjacency
+
+
+def find_shortest_path(adjacency_list, start_id, finish_id):
+    # per destination search previously used by Node.receive_topology, without its print
+    distances = {}
+    is_visited = {}
+    for i in adjacency_list.keys():
+        is_visited[i] = False
+        distances[i] = math.inf
+    distances[start_id] = 0
+    prev = {}
+    q = PriorityQueue()
+    q.put((0, start_id))
+
+    while not q.empty():
+        cur_node = q.get()[1]
+
+        if cur_node == finish_id:
+            break
+
+        is_visited[cur_node] = True
+        for neighbor in adjacency_list[cur_node]:
+            neighbor_id = neighbor[0]
+            edge_weight = neighbor[1]
+
+            if not is_visited[neighbor_id]:
+                if distances[neighbor_id] > edge_weight + distances[cur_node]:
+                    distances[neighbor_id] = edge_weight + distances[cur_node]
+                    prev[neighbor_id] = cur_node
+                q.put((distances[neighbor_id], neighbor_id))
+
+    if finish_id not in prev.keys():
+        return []
+    prev_id = prev[finish_id]
+    path = [finish_id]
+    while prev_id != start_id:
+        path.append(prev_id)
+        prev_id = prev[prev_id]
+    path.append(start_id)
+    path.reverse()
+    return path
+
+
+def churn(edges, nodes_count, changes_count):
+    # removes, reweights and adds changes_count edges in total
+    edges = dict(edges)
+    keys = random.sample(list(edges), 2 * changes_count // 3)
+    for key in keys[:changes_count // 3]:
+        del edges[key]
+    for key in keys[changes_count // 3:]:
+        edges[key] = random.randint(1, 10)
+    while len(keys) < changes_count:
+        node, neighbor = random.sample(range(nodes_count), 2)
+        edges[(min(node, neighbor), max(node, neighbor))] = random.randint(1, 10)
+        keys.append((node, neighbor))
+    return edges
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    degree = 4
+    repeats = 20
+
+    print("{:>7} {:>16} {:>10} {:>14} {:>14}".format(
+        "nodes", "per-dest ms", "build ms", "update(1) ms", "update(16) ms"))
+    for nodes_count in (100, 1000, 10000):
+        edges = random_graph(nodes_count, degree)
+        adjacency = adjacency_list(edges, nodes_count)
+
+        # the old search is quadratic, it is timed on up to 100 destinations and scaled to all of them
+        destinations = range(1, min(nodes_count, 101))
+        start = time.perf_counter()
+        for destination in destinations:
+            find_shortest_path(adjacency, 0, destination)
+        per_dest_ms = (time.perf_counter() - start) / len(destinations) * (nodes_count - 1) * 1e3
+
+        tree = ShortestPathTree(0)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            tree.build(adjacency)
+        build_ms = (time.perf_counter() - start) / repeats * 1e3
+        for destination in destinations:
+            assert len(tree.path(destination)) == len(find_shortest_path(adjacency, 0, destination))
+
+        update_ms = []
+        for changes_count in (1, 16):
+            elapsed = 0.0
+            for _ in range(repeats):
+                edges_new = churn(edges, nodes_count, changes_count)
+                adjacency_new = adjacency_list(edges_new, nodes_count)
+                changed = changed_edges(adjacency, adjacency_new)
+                start = time.perf_counter()
+                tree.update(adjacency_new, changed)
+                elapsed += time.perf_counter() - start
+                edges, adjacency = edges_new, adjacency_new
+            update_ms.append(elapsed / repeats * 1e3)
+
+        print("{:>7} {:>16.1f} {:>10.2f} {:>14.3f} {:>14.3f}".format(
+            nodes_count, per_dest_ms, build_ms, update_ms[0], update_ms[1]))
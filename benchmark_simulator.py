@@ -0,0 +1,44 @@
+import time
+
+from benchmark_channel import PROFILES
+from benchmark_channel import configure
+from simulator import simulate_transfer
+from transm_global_params import ChannelLossType
+from transm_global_params import TransmissionProtocol
+
+
+def run(transmission_protocol, payloads, seeds):
+    results = [simulate_transfer(transmission_protocol, payloads, seed) for seed in seeds]
+    return results, sum(result.sender_.total_sent_ for result in results)
+
+
+if __name__ == "__main__":
+    # simulated transfers of 100 frames of 256 bytes on the link profiles of benchmark_channel.py,
+    # every seed is a different run of the link, the same seed gives the same run
+    frames_count = 100
+    frame_size = 256
+    seeds = range(200)
+    payloads = [bytes([i % 256]) * frame_size for i in range(frames_count)]
+    # per-frame acks (SELECTIVE_ACK off) on a lossy link, every lost ack has to be made up for by a duplicate's ack
+    profiles = PROFILES + [("wan 2% nosack", dict(PROFILES[2][1], SELECTIVE_ACK=False)),
+                           ("wan 10% nosack", dict(CHANNEL_LATENCY=0.02, CHANNEL_JITTER=0.002,
+                                                   CHANNEL_LOSS_TYPE=ChannelLossType.BERNOULLI,
+                                                   CHANNEL_LOSS_PROBABILITY=0.1, SELECTIVE_ACK=False))]
+
+    print("{:<14} {:<6} {:>10} {:>10} {:>8} {:>10} {:>10}".format(
+        "link", "proto", "transf/s", "frames/s", "ok", "virt. s", "same run"))
+    for name, params in profiles:
+        for transmission_protocol in (TransmissionProtocol.ALGORITHM_TYPE_GBN, TransmissionProtocol.ALGORITHM_TYPE_SR):
+            configure(params)
+            start_time = time.perf_counter()
+            results, total_sent = run(transmission_protocol, payloads, seeds)
+            elapsed = time.perf_counter() - start_time
+
+            delivered = sum(1 for result in results if result.payloads_ == payloads)
+            replay = simulate_transfer(transmission_protocol, payloads, seeds[0])
+            is_same = (replay.duration_ == results[0].duration_
+                       and replay.sender_.total_sent_ == results[0].sender_.total_sent_)
+            print("{:<14} {:<6} {:>10.0f} {:>10.0f} {:>8} {:>10.3f} {:>10}".format(
+                name, "GBN" if transmission_protocol == TransmissionProtocol.ALGORITHM_TYPE_GBN else "SR",
+                len(results) / elapsed, total_sent / elapsed, "{}/{}".format(delivered, len(results)),
+                sum(result.duration_ for result in results) / len(results), "yes" if is_same else "NO"))
@@ -0,0 +1,85 @@
+import contextlib
+import io
+import pickle
+import random
+import time
+
+from benchmark_routing import random_graph
+from designated_node import DesignatedNode
+from node import Node
+from topology import TopologySnapshot
+
+
+def designated_node(edges, nodes_count):
+    # every node has reported its neighbors once
+    node = DesignatedNode()
+    neighbors = {i: [] for i in range(nodes_count)}
+    for (i, j), weight in edges.items():
+        neighbors[i].append((j, weight))
+        neighbors[j].append((i, weight))
+    for i in range(nodes_count):
+        node.update_neighbors(i, neighbors[i])
+    return node
+
+
+def sync(des_node, node):
+    # one sync window for one node: the message, its size on the link and the time the node takes to apply it
+    message = des_node.topology_message(node.id_)
+    buf = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    start = time.perf_counter()
+    node.update_topology(pickle.loads(buf))
+    elapsed = time.perf_counter() - start
+    des_node.acked_epochs_[node.id_] = node.epoch_
+    return len(buf), elapsed
+
+
+if __name__ == "__main__":
+    # a node catches up once per window while churn_count nodes report a changed neighbor list in between;
+    # without epochs every window was a snapshot
+    random.seed(0)
+    degree = 4
+    windows = 20
+
+    print("{:>6} {:>6} {:>14} {:>14} {:>16} {:>16}".format(
+        "nodes", "churn", "snapshot KB", "delta KB", "snapshot ms", "delta ms"))
+    for nodes_count in (100, 1000, 10000):
+        edges = random_graph(nodes_count, degree)
+        for churn_count in (1, 10):
+            des_node = designated_node(edges, nodes_count)
+            node = Node(0)
+            snapshot_node = Node(0)  # catches up with a full snapshot every window instead
+            snapshot_sizes = []
+            snapshot_times = []
+            delta_sizes = []
+            delta_times = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                sync(des_node, node)
+                snapshot_node.update_topology(TopologySnapshot(0, dict(des_node.adjacency_list_)))
+                for _ in range(windows):
+                    for _ in range(churn_count):
+                        # a node loses one neighbor and finds another one
+                        i = random.randrange(nodes_count)
+                        neighbors = des_node.adjacency_list_[i][1:]
+                        j = random.randrange(nodes_count)
+                        if j != i and j not in dict(neighbors):
+                            neighbors = neighbors + [(j, random.randint(1, 10))]
+                        des_node.update_neighbors(i, neighbors)
+
+                    size, elapsed = sync(des_node, node)
+                    delta_sizes.append(size)
+                    delta_times.append(elapsed)
+
+                    # what the same window cost when the whole adjacency list was sent, with the same changes
+                    message = TopologySnapshot(des_node.epoch_, dict(des_node.adjacency_list_))
+                    buf = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+                    start = time.perf_counter()
+                    snapshot_node.update_topology(pickle.loads(buf))
+                    snapshot_times.append(time.perf_counter() - start)
+                    snapshot_sizes.append(len(buf))
+            assert node.adjacency_list_ == des_node.adjacency_list_
+            assert snapshot_node.adjacency_list_ == des_node.adjacency_list_
+            assert node.routes_.next_hops_ == snapshot_node.routes_.next_hops_
+
+            print("{:>6} {:>6} {:>14.1f} {:>14.2f} {:>16.2f} {:>16.3f}".format(
+                nodes_count, churn_count, sum(snapshot_sizes) / windows / 1024, sum(delta_sizes) / windows / 1024,
+                sum(snapshot_times) / windows * 1e3, sum(delta_times) / windows * 1e3))
@@ -0,0 +1,338 @@
+import heapq
+import itertools
+import math
+import random
+import struct
+import time
+from collections import deque
+
+from frame import Frame
+from frame import LENGTH
+import transm_global_params
+from transm_global_params import ChannelLossType
+
+try:
+    import numpy
+except ImportError:  # the draws are then generated block by block with the random module
+    numpy = None
+
+# emulated frames are written to the IPC layer each prefixed by their delivery time, then their length
+DELIVERY = struct.Struct('<d')
+
+
+def flip_bits(buf, bit_error_rate, draws=None):
+    # every bit of buf is flipped independently with probability bit_error_rate. The gaps between flipped bits
+    # are geometric, so the cost grows with the number of errors rather than with the number of bits, and an
+    # error-free frame is returned as it is, without a copy
+    if bit_error_rate <= 0:
+        return buf
+    uniform = random.random if draws is None else draws.uniform
+    bit_count = len(buf) * 8
+    log_no_error = math.log1p(-bit_error_rate) if bit_error_rate < 1 else -math.inf
+    bit = int(math.log(1.0 - uniform()) / log_no_error)
+    if bit >= bit_count:
+        return buf
+
+    out = bytearray(buf)
+    while bit < bit_count:
+        out[bit >> 3] ^= 1 << (bit & 7)
+        bit += 1 + int(math.log(1.0 - uniform()) / log_no_error)
+    return out
+
+
+def with_channel(ipc_manager):
+    # managers that emulate the link themselves (see simulator.py) are left as they are
+    if not transm_global_params.CHANNEL_EMULATION or getattr(ipc_manager, 'is_link_emulated_', False):
+        return ipc_manager
+    return ChannelIPCManager(ipc_manager, make_channel(transm_global_params.BIT_ERROR_RATE), make_channel(0))
+
+
+def make_channel(bit_error_rate, draws=None):
+    # one direction of the link configured by the CHANNEL_* parameters
+    if transm_global_params.CHANNEL_LOSS_TYPE == ChannelLossType.BERNOULLI:
+        loss = BernoulliLoss(transm_global_params.CHANNEL_LOSS_PROBABILITY)
+    elif transm_global_params.CHANNEL_LOSS_TYPE == ChannelLossType.GILBERT_ELLIOTT:
+        loss = GilbertElliottLoss(transm_global_params.CHANNEL_GOOD_TO_BAD_PROBABILITY,
+                                  transm_global_params.CHANNEL_BAD_TO_GOOD_PROBABILITY,
+                                  transm_global_params.CHANNEL_GOOD_LOSS_PROBABILITY,
+                                  transm_global_params.CHANNEL_BAD_LOSS_PROBABILITY)
+    else:
+        loss = None
+    return Channel(loss=loss,
+                   latency=transm_global_params.CHANNEL_LATENCY,
+                   jitter=transm_global_params.CHANNEL_JITTER,
+                   reorder_probability=transm_global_params.CHANNEL_REORDER_PROBABILITY,
+                   reorder_delay=transm_global_params.CHANNEL_REORDER_DELAY,
+                   rate=transm_global_params.CHANNEL_RATE,
+                   queue_limit=transm_global_params.CHANNEL_QUEUE_LIMIT,
+                   bit_error_rate=bit_error_rate,
+                   draws=draws if draws is not None else RandomDraws(transm_global_params.CHANNEL_SEED))
+
+
+class RandomDraws:
+    # uniform and standard normal numbers generated a block at a time and handed out one by one. The blocks start
+    # small and double up to CHANNEL_RANDOM_BLOCK, a short simulated transfer draws a few hundred numbers at most
+    def __init__(self, seed=None, block_size=None):
+        self.block_size_ = block_size or transm_global_params.CHANNEL_RANDOM_BLOCK
+        if numpy is not None:
+            self.generator_ = numpy.random.default_rng(seed)
+        else:
+            self.generator_ = random.Random(seed)
+        self.uniform_ = []
+        self.normal_ = []
+        self.uniform_block_size_ = min(64, self.block_size_)
+        self.normal_block_size_ = min(64, self.block_size_)
+
+    def uniform(self):
+        if len(self.uniform_) == 0:
+            if numpy is not None:
+                self.uniform_ = self.generator_.random(self.uniform_block_size_).tolist()
+            else:
+                self.uniform_ = [self.generator_.random() for _ in range(self.uniform_block_size_)]
+            self.uniform_block_size_ = min(2 * self.uniform_block_size_, self.block_size_)
+        return self.uniform_.pop()
+
+    def normal(self):
+        if len(self.normal_) == 0:
+            if numpy is not None:
+                self.normal_ = self.generator_.standard_normal(self.normal_block_size_).tolist()
+            else:
+                self.normal_ = [self.generator_.gauss(0.0, 1.0) for _ in range(self.normal_block_size_)]
+            self.normal_block_size_ = min(2 * self.normal_block_size_, self.block_size_)
+        return self.normal_.pop()
+
+
+class BernoulliLoss:
+    # every frame is lost independently with the same probability
+    def __init__(self, loss_probability):
+        self.loss_probability_ = loss_probability
+
+    def is_lost(self, draws):
+        return draws.uniform() < self.loss_probability_
+
+
+class GilbertElliottLoss:
+    # two state Markov chain: the state may change before every frame, which is then lost with the
+    # probability of the new state. The bad state lasts 1 / bad_to_good frames on average
+    def __init__(self, good_to_bad, bad_to_good, good_loss, bad_loss):
+        self.good_to_bad_ = good_to_bad
+        self.bad_to_good_ = bad_to_good
+        self.good_loss_ = good_loss
+        self.bad_loss_ = bad_loss
+        self.is_bad_ = False
+
+    def is_lost(self, draws):
+        if self.is_bad_:
+            self.is_bad_ = draws.uniform() >= self.bad_to_good_
+        else:
+            self.is_bad_ = draws.uniform() < self.good_to_bad_
+        return draws.uniform() < (self.bad_loss_ if self.is_bad_ else self.good_loss_)
+
+
+class Channel:
+    # One direction of an emulated link. Every frame handed to transmit() is either dropped by the loss model
+    # or by a full queue, or gets the time it comes out of the link: it waits in the queue behind the frames
+    # before it while the link runs at rate bytes/s, then travels for latency plus normal jitter, and with
+    # reorder_probability it is held back another reorder_delay so that the next frames overtake it.
+    # Jitter alone doesn't reorder, a frame never comes out before the one sent ahead of it.
+    # Bit errors hit the frames that get through.
+    # rate 0 means no bandwidth limit, queue_limit 0 an unbounded queue.
+
+    def __init__(self, loss=None, latency=0.0, jitter=0.0, reorder_probability=0.0, reorder_delay=0.0, rate=0,
+                 queue_limit=0, bit_error_rate=0.0, draws=None):
+        self.loss_ = loss
+        self.latency_ = latency
+        self.jitter_ = jitter
+        self.reorder_probability_ = reorder_probability
+        self.reorder_delay_ = reorder_delay
+        self.rate_ = rate
+        self.queue_limit_ = queue_limit
+        self.bit_error_rate_ = bit_error_rate
+        self.draws_ = draws if draws is not None else RandomDraws()
+
+        self.queue_ = deque()  # times the frames waiting for the link are fully sent
+        self.link_free_time_ = 0.0
+        self.delivery_time_ = 0.0  # of the last frame not held back for reordering
+
+        self.total_lost_ = 0  # dropped by the loss model
+        self.total_queue_dropped_ = 0
+
+    def transmit(self, buf, cur_time):
+        # returns (buf as it arrives, delivery time), or None when the frame is dropped
+        if self.loss_ is not None and self.loss_.is_lost(self.draws_):
+            self.total_lost_ += 1
+            return None
+
+        if self.rate_ != 0:
+            while len(self.queue_) != 0 and self.queue_[0] <= cur_time:
+                self.queue_.popleft()
+            if self.queue_limit_ != 0 and len(self.queue_) >= self.queue_limit_:
+                self.total_queue_dropped_ += 1
+                return None
+            self.link_free_time_ = max(self.link_free_time_, cur_time) + len(buf) / self.rate_
+            self.queue_.append(self.link_free_time_)
+            delivery_time = self.link_free_time_ + self.latency_
+        else:
+            delivery_time = cur_time + self.latency_
+
+        if self.jitter_ != 0:
+            delivery_time += self.jitter_ * self.draws_.normal()
+        delivery_time = max(delivery_time, self.delivery_time_)
+        self.delivery_time_ = delivery_time
+        if self.reorder_probability_ != 0 and self.draws_.uniform() < self.reorder_probability_:
+            delivery_time += self.reorder_delay_
+        return flip_bits(buf, self.bit_error_rate_, self.draws_), delivery_time
+
+
+class ChannelIPCManager:
+    # Link emulator between Sender/Receiver and an IPC manager, both ends of a link have to be wrapped.
+    # The sending end passes every frame through its Channel and writes the survivors with their delivery time,
+    # the receiving end holds them in a heap and hands them out once that time has come.
+    # Everything else is passed through to the wrapped manager.
+
+    def __init__(self, ipc_manager, to_receiver, to_sender):
+        self.ipc_manager_ = ipc_manager
+        self.to_receiver_ = to_receiver
+        self.to_sender_ = to_sender
+
+        self.in_flight_from_sender_ = []  # min-heap of (delivery time, arrival order, frame buf)
+        self.in_flight_from_receiver_ = []
+        self.pending_from_sender_ = deque()
+        self.pending_from_receiver_ = deque()
+        self.arrival_order_ = itertools.count()  # keeps frames due at the same time in order
+
+    def __getattr__(self, name):
+        return getattr(self.ipc_manager_, name)
+
+    def send_to_receiver(self, msg):
+        self.send_many_to_receiver([msg])
+
+    def send_to_sender(self, msg):
+        self.send_many_to_sender([msg])
+
+    def send_many_to_receiver(self, msgs):
+        buf = self.pack(self.to_receiver_, msgs)
+        if len(buf) != 0:
+            self.ipc_manager_.write_to_receiver(buf)
+
+    def send_many_to_sender(self, msgs):
+        buf = self.pack(self.to_sender_, msgs)
+        if len(buf) != 0:
+            self.ipc_manager_.write_to_sender(buf)
+
+    @staticmethod
+    def pack(channel, frames):
+        parts = []
+        cur_time = time.time()
+        for frame in frames:
+            transmitted = channel.transmit(frame.to_bytes(), cur_time)
+            if transmitted is None:
+                continue
+            buf, delivery_time = transmitted
+            parts.append(DELIVERY.pack(delivery_time))
+            parts.append(LENGTH.pack(len(buf)))
+            parts.append(buf)
+        return b''.join(parts)
+
+    def get_from_sender(self, timeout=0):
+        return self.get(self.pending_from_sender_, self.in_flight_from_sender_, self.ipc_manager_.read_from_sender,
+                        timeout)
+
+    def get_from_receiver(self, timeout=0):
+        return self.get(self.pending_from_receiver_, self.in_flight_from_receiver_,
+                        self.ipc_manager_.read_from_receiver, timeout)
+
+    def get_many_from_sender(self, timeout=0):
+        return self.get_many(self.pending_from_sender_, self.in_flight_from_sender_,
+                             self.ipc_manager_.read_from_sender, timeout)
+
+    def get_many_from_receiver(self, timeout=0):
+        return self.get_many(self.pending_from_receiver_, self.in_flight_from_receiver_,
+                             self.ipc_manager_.read_from_receiver, timeout)
+
+    async def get_many_from_sender_async(self, timeout=0):
+        return await self.get_many_async(self.pending_from_sender_, self.in_flight_from_sender_,
+                                         self.ipc_manager_.read_from_sender,
+                                         self.ipc_manager_.wait_readable_from_sender, timeout)
+
+    async def get_many_from_receiver_async(self, timeout=0):
+        return await self.get_many_async(self.pending_from_receiver_, self.in_flight_from_receiver_,
+                                         self.ipc_manager_.read_from_receiver,
+                                         self.ipc_manager_.wait_readable_from_receiver, timeout)
+
+    def next_delivery_from_sender(self):
+        return self.in_flight_from_sender_[0][0] if len(self.in_flight_from_sender_) != 0 else None
+
+    def next_delivery_from_receiver(self):
+        return self.in_flight_from_receiver_[0][0] if len(self.in_flight_from_receiver_) != 0 else None
+
+    def has_pending_from_sender(self):
+        return self.has_pending(self.pending_from_sender_, self.in_flight_from_sender_)
+
+    def has_pending_from_receiver(self):
+        return self.has_pending(self.pending_from_receiver_, self.in_flight_from_receiver_)
+
+    def get(self, pending, in_flight, read, timeout):
+        if len(pending) == 0:
+            pending.extend(self.get_many(pending, in_flight, read, timeout))
+            if len(pending) == 0:
+                return None
+        return pending.popleft()
+
+    def get_many(self, pending, in_flight, read, timeout):
+        # like IPCManagerBase.get_many_from_sender, but only frames whose delivery time has come count
+        frames = list(pending)
+        pending.clear()
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            is_done, wait_time = self.collect(frames, in_flight, read, deadline)
+            if is_done:
+                return frames
+            buf = read(wait_time)
+            if buf is not None:
+                self.unpack(in_flight, buf)
+
+    async def get_many_async(self, pending, in_flight, read, wait_readable, timeout):
+        # get_many for asyncio code, the wrapped manager's wait_readable coroutine waits instead of read
+        frames = list(pending)
+        pending.clear()
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            is_done, wait_time = self.collect(frames, in_flight, read, deadline)
+            if is_done:
+                return frames
+            await wait_readable(wait_time)
+
+    def collect(self, frames, in_flight, read, deadline):
+        # takes in everything written so far and moves the frames due by now to frames,
+        # returns (is_done, how long to wait for the next write or delivery, None for ever)
+        buf = read(0)
+        while buf is not None:
+            self.unpack(in_flight, buf)
+            buf = read(0)
+
+        cur_time = time.time()
+        while len(in_flight) != 0 and in_flight[0][0] <= cur_time:
+            frames.append(Frame.from_bytes(heapq.heappop(in_flight)[2]))
+        if len(frames) != 0 or (deadline is not None and cur_time >= deadline):
+            return True, 0
+
+        wait_time = None if deadline is None else deadline - cur_time
+        if len(in_flight) != 0:
+            wait_time = in_flight[0][0] - cur_time if wait_time is None else min(wait_time, in_flight[0][0] - cur_time)
+        return False, wait_time
+
+    def unpack(self, in_flight, buf):
+        offset = 0
+        view = memoryview(buf)
+        while offset < len(buf):
+            delivery_time = DELIVERY.unpack_from(buf, offset)[0]
+            offset += DELIVERY.size
+            length = LENGTH.unpack_from(buf, offset)[0]
+            offset += LENGTH.size
+            heapq.heappush(in_flight, (delivery_time, next(self.arrival_order_), view[offset: offset + length]))
+            offset += length
+
+    @staticmethod
+    def has_pending(pending, in_flight):
+        return len(pending) != 0 or (len(in_flight) != 0 and in_flight[0][0] <= time.time())
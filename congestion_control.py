@@ -0,0 +1,82 @@
+import time
+from collections import deque
+
+import transm_global_params
+from transm_global_params import CongestionControlType
+
+
+class CongestionControl:
+    # Policy interface used by Sender: window() bounds the frames in flight, on_ack() is called with the
+    # number of newly acknowledged frames, on_loss() when a frame is found lost while acks keep arriving
+    # and on_timeout() when the sender had to fall back to a full retransmission timeout.
+    # Every change of the window is appended to trace_ as (clock(), window).
+
+    def __init__(self, window, clock=time.time):
+        self.clock_ = clock
+        self.trace_ = deque(maxlen=transm_global_params.CWND_TRACE_LENGTH)
+        self.trace_.append((clock(), window))
+
+    def window(self):
+        raise NotImplementedError
+
+    def on_ack(self, acked_count):
+        pass
+
+    def on_loss(self):
+        pass
+
+    def on_timeout(self):
+        pass
+
+    def record(self, prev_window):
+        if self.window() != prev_window:
+            self.trace_.append((self.clock_(), self.window()))
+
+
+class FixedWindow(CongestionControl):
+    def __init__(self, window_size, clock=time.time):
+        super().__init__(window_size, clock)
+        self.window_size_ = window_size
+
+    def window(self):
+        return self.window_size_
+
+
+class AimdCongestionControl(CongestionControl):
+    # slow start up to ssthresh, then +1 frame per window of acks; halve on loss, restart from 1 on timeout
+    def __init__(self, max_window, initial_window=1, clock=time.time):
+        super().__init__(initial_window, clock)
+        self.max_window_ = max_window
+        self.cwnd_ = float(initial_window)
+        self.ssthresh_ = float(max_window)
+
+    def window(self):
+        return int(self.cwnd_)
+
+    def on_ack(self, acked_count):
+        prev_window = self.window()
+        for _ in range(acked_count):
+            if self.cwnd_ < self.ssthresh_:
+                self.cwnd_ += 1
+            else:
+                self.cwnd_ += 1 / self.cwnd_
+        self.cwnd_ = min(self.cwnd_, self.max_window_)
+        self.record(prev_window)
+
+    def on_loss(self):
+        prev_window = self.window()
+        self.ssthresh_ = max(self.cwnd_ / 2, 2)
+        self.cwnd_ = self.ssthresh_
+        self.record(prev_window)
+
+    def on_timeout(self):
+        prev_window = self.window()
+        self.ssthresh_ = max(self.cwnd_ / 2, 2)
+        self.cwnd_ = 1
+        self.record(prev_window)
+
+
+def make_congestion_control(congestion_control_type, clock=time.time):
+    if congestion_control_type == CongestionControlType.AIMD:
+        return AimdCongestionControl(transm_global_params.MAX_WINDOW_SIZE, clock=clock)
+    return FixedWindow(min(transm_global_params.WINDOW_SIZE, transm_global_params.MAX_WINDOW_SIZE), clock)
@@ -0,0 +1,33 @@
+import time
+
+import transm_global_params
+
+
+class DelayedAck:
+    # Holds back the ack of in-order frames until DELAYED_ACK_COUNT of them are pending or DELAYED_ACK_TIMEOUT
+    # has passed since the first one. Acks are cumulative, so whatever ack goes out next covers the held frames.
+
+    def __init__(self, clock=time.time):
+        self.clock_ = clock
+        self.pending_ = 0
+        self.deadline_ = None  # ack timer, None while nothing is held
+
+    def hold(self):
+        # called for an in-order frame that may go unacked, returns True when its ack is held back
+        if not transm_global_params.DELAYED_ACK:
+            return False
+        self.pending_ += 1
+        if self.pending_ >= transm_global_params.DELAYED_ACK_COUNT:
+            self.reset()
+            return False
+        if self.deadline_ is None:
+            self.deadline_ = self.clock_() + transm_global_params.DELAYED_ACK_TIMEOUT
+        return True
+
+    def reset(self):
+        # called for every ack sent
+        self.pending_ = 0
+        self.deadline_ = None
+
+    def is_due(self, cur_time):
+        return self.deadline_ is not None and cur_time >= self.deadline_
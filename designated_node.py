@@ -1,74 +1,152 @@
+from collections import deque
 import time
 import threading
 
 from utils import get_time_h_m_s
+from metrics import aggregate
+from topology import TopologyAck
+from topology import TopologyDelta
+from topology import TopologySnapshot
+import tracing
 import transm_global_params
 
 
 class DesignatedNode:
-    def __init__(self):
+    def __init__(self, tracer=None):
         self.senders_ = []
         self.receivers_ = []
         self.adjacency_list_ = {}
+        self.tracer_ = tracer  # shared by the node and its links, as in Node
+
+        # versioned topology, see topology.py
+        self.epoch_ = 0
+        self.history_ = deque(maxlen=transm_global_params.TOPOLOGY_HISTORY_LENGTH)  # (epoch, ids of changed lists)
+        self.acked_epochs_ = {}  # node id -> epoch it has applied last
+
+    def links(self):
+        # name -> Sender or Receiver of every link of the node
+        links = {}
+        for i, sender in enumerate(self.senders_):
+            links["to node " + str(i)] = sender
+        for i, receiver in enumerate(self.receivers_):
+            links["from node " + str(i)] = receiver
+        return links
+
+    def metrics(self):
+        # per link snapshots of every Sender and Receiver of the node and their roll-up, see metrics.py
+        links = {name: link.metrics() for name, link in self.links().items()}
+        return dict(total=aggregate(links.values()), links=links)
+
+    def trace_links(self):
+        if self.tracer_ is None:
+            return
+        for name, link in self.links().items():
+            link.tracer_ = self.tracer_
+            link.link_id_ = self.tracer_.link(name)
+
+    def trace(self, event, node_id):
+        if self.tracer_ is not None:
+            self.tracer_.record(event, node_id)
+
+    def update_neighbors(self, sender_id, neighbors):
+        # the adjacency list stays symmetric, so the lists holding sender_id are the ones of its old neighbors
+        touched = {sender_id}
+        touched.update(neighbor[0] for neighbor in self.adjacency_list_.get(sender_id, []))
+        touched.update(neighbor[0] for neighbor in neighbors)
+        prev_lists = {key: self.adjacency_list_.get(key) for key in touched}
+
+        for neighbor in self.adjacency_list_.get(sender_id, []):
+            index = neighbor[0]
+            self.adjacency_list_[index] = [i for i in self.adjacency_list_[index] if i[0] != sender_id]
+
+        self.adjacency_list_[sender_id] = neighbors
+        for neighbor in neighbors:
+            index = neighbor[0]
+            weight = neighbor[1]
+            if index not in self.adjacency_list_.keys():
+                self.adjacency_list_[index] = [(sender_id, weight)]
+            else:
+                self.adjacency_list_[index] = self.adjacency_list_[index] + [(sender_id, weight)]
+
+        changed = [key for key in touched if self.adjacency_list_.get(key) != prev_lists[key]]
+        if len(changed) != 0:
+            self.epoch_ += 1
+            self.history_.append((self.epoch_, changed))
+
+    def topology_message(self, node_id):
+        # what the node needs to catch up from the epoch it has acked, None when it is up to date
+        acked_epoch = self.acked_epochs_.get(node_id)
+        if acked_epoch == self.epoch_:
+            return None
+        # history_ holds consecutive epochs up to epoch_
+        if acked_epoch is not None and self.epoch_ - acked_epoch <= len(self.history_):
+            changes = {}
+            for epoch, changed in self.history_:
+                if epoch > acked_epoch:
+                    for key in changed:
+                        changes[key] = self.adjacency_list_[key]
+            return TopologyDelta(acked_epoch, self.epoch_, changes)
+        return TopologySnapshot(self.epoch_, dict(self.adjacency_list_))
 
     def receive_topology_update(self, stop_event, lock, receiver, node, sender_id):
         while not stop_event.is_set():
             is_connected = receiver.wait_for_connection()
             if is_connected:
-                adj_list_update = receiver.receive()
-
-                if adj_list_update is not None:
-                    print("designated node :", "received update from node #", sender_id, adj_list_update[0],
-                          get_time_h_m_s())
-                    lock.acquire()
-
-                    adj_list_update = adj_list_update[0]
-
-                    for key in node.adjacency_list_:
-                        node.adjacency_list_[key] = [i for i in node.adjacency_list_[key] if i[0] != sender_id]
-
-                    if len(adj_list_update) == 0:
-                        node.adjacency_list_[sender_id] = adj_list_update
-                    else:
-                        node.adjacency_list_[sender_id] = adj_list_update
-                        for neighbor in adj_list_update:
-                            index = neighbor[0]
-                            weight = neighbor[1]
-                            if index not in node.adjacency_list_.keys():
-                                node.adjacency_list_[index] = [(sender_id, weight)]
-                            else:
-                                node.adjacency_list_[index].append((sender_id, weight))
-
-                    lock.release()
-
-    def send_topology(self, stop_event, stop_topology_send_event, sender, topology):
-        resend_topology = False
+                report = receiver.receive()
+
+                if report is not None:
+                    for payload in report:
+                        lock.acquire()
+                        if isinstance(payload, TopologyAck):
+                            node.acked_epochs_[sender_id] = payload.epoch_
+                            node.trace(tracing.TOPOLOGY_ACK, sender_id)
+                        else:
+                            print("designated node :", "received update from node #", sender_id, payload,
+                                  get_time_h_m_s())
+                            node.trace(tracing.TOPOLOGY_UPDATE, sender_id)
+                            node.update_neighbors(sender_id, payload)
+                        lock.release()
+
+    def send_topology(self, stop_event, start_topology_send_event, stop_topology_send_event, lock, sender, node_id):
         while not stop_event.is_set():
-            if not stop_topology_send_event.is_set() and resend_topology:
+            if not start_topology_send_event.wait(transm_global_params.CONNECTION_TIMEOUT):
+                continue
+            # the lists are replaced, never changed in place, so the message can be sent outside of the lock
+            lock.acquire()
+            message = self.topology_message(node_id)
+            lock.release()
+            while message is not None and not stop_topology_send_event.is_set():
                 is_connected = sender.wait_for_connection()
                 if is_connected:
-                    is_sent = sender.send([topology])
+                    is_sent = sender.send([message])
                     if is_sent:
-                        resend_topology = False
-            elif stop_topology_send_event.is_set():
-                resend_topology = True
+                        self.trace(tracing.TOPOLOGY_SNAPSHOT_SENT if isinstance(message, TopologySnapshot)
+                                   else tracing.TOPOLOGY_DELTA_SENT, node_id)
+                        break
+            # topology is sent once per sync window, sleep until the window is closed
+            while not stop_topology_send_event.wait(transm_global_params.CONNECTION_TIMEOUT):
+                if stop_event.is_set():
+                    break
 
     def run(self):
+        self.trace_links()
         threads_send = []
         threads_receive = []
 
         stop_node_event = threading.Event()
+        start_topology_send_event = threading.Event()
         stop_topology_send_event = threading.Event()
         stop_topology_send_event.set()
 
+        lock = threading.Lock()
+
         for i in range(len(self.senders_)):
             threads_send.append(
                 threading.Thread(target=self.send_topology,
                                  args=(
-                                     stop_node_event, stop_topology_send_event, self.senders_[i],
-                                     self.adjacency_list_)))
-
-        lock = threading.Lock()
+                                     stop_node_event, start_topology_send_event, stop_topology_send_event, lock,
+                                     self.senders_[i],
+                                     i)))
 
         for i in range(len(self.receivers_)):
             threads_receive.append(
@@ -83,11 +161,18 @@ class DesignatedNode:
         start_time = time.time()
         time_since_last_topology_send = time.time()
         while time.time() - start_time < transm_global_params.DESIGNATED_NODE_LIFETIME:
-            if time.time() - time_since_last_topology_send > transm_global_params.GRAPH_SYNC_TIME_INTERVAL:
-                print("designated node :", "sending current topology to the nodes", get_time_h_m_s())
-                stop_topology_send_event.clear()
-                time.sleep(transm_global_params.GRAPH_SYNC_TIME)
-                stop_topology_send_event.set()
+            time_to_sync = time_since_last_topology_send + transm_global_params.GRAPH_SYNC_TIME_INTERVAL - time.time()
+            if time_to_sync >= 0:
+                time_to_exit = start_time + transm_global_params.DESIGNATED_NODE_LIFETIME - time.time()
+                time.sleep(max(0.0, min(time_to_sync, time_to_exit)))
+                continue
+            print("designated node :", "sending current topology to the nodes", get_time_h_m_s())
+            self.trace(tracing.TOPOLOGY_BROADCAST, len(self.adjacency_list_))
+            stop_topology_send_event.clear()
+            start_topology_send_event.set()
+            time.sleep(transm_global_params.GRAPH_SYNC_TIME)
+            start_topology_send_event.clear()
+            stop_topology_send_event.set()
 
         stop_node_event.set()
 
@@ -97,3 +182,5 @@ class DesignatedNode:
             thread.join()
 
         print("designated node :", "I'm out", get_time_h_m_s())
+        if self.tracer_ is not None:
+            self.tracer_.dump("designated_node_trace.bin")
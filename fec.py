@@ -0,0 +1,234 @@
+import struct
+from collections import deque
+
+from frame import Frame
+from frame import HEADER
+from transm_global_params import TransmissionProtocol
+import transm_global_params
+
+# parity frame payload: xor of the encoded frame lengths, frames in the group, then the xor of the encoded frames
+PARITY_HEADER = struct.Struct('<IH')
+
+
+def encode(frame):
+    # what the parity covers: the frame as the sender built it, before the channel got to it
+    return Frame(frame.data_, frame.seq_num_, frame.is_last_, False).to_bytes()
+
+
+def with_fec(ipc_manager, transmission_protocol):
+    if transm_global_params.FEC_GROUP_SIZE == 0:
+        return ipc_manager
+    # the Selective Repeat receiver buffers out-of-order frames itself and acks them, only Go-Back-N needs them
+    # held back until the gap is filled
+    return FecIPCManager(ipc_manager, transm_global_params.FEC_GROUP_SIZE,
+                         transmission_protocol == TransmissionProtocol.ALGORITHM_TYPE_GBN)
+
+
+class FecGroup:
+    # receiving side state of the frames seq_num_first .. seq_num_first + group_size - 1
+    def __init__(self, seq_num_first, count):
+        self.seq_num_first_ = seq_num_first
+        self.count_ = count  # only the group with the last frame is shorter
+        self.seq_num_next_ = seq_num_first  # frames below it were passed on in order
+        self.seq_nums_ = set()
+        self.xor_ = 0
+        self.xor_length_ = 0
+        self.held_ = {}  # seq num -> frame that arrived after a gap
+        self.parity_ = None  # (xor, xor of lengths, frames count)
+        self.is_done_ = False
+
+
+class FecIPCManager:
+    # Hybrid ARQ layer between Sender/Receiver and an IPC manager. Data frames are split into groups of group_size
+    # consecutive seq nums; after the first transmission of a group the sending side adds a parity frame holding
+    # the xor of the encoded frames and of their lengths. The receiving side rebuilds a single lost or corrupted
+    # frame of a group from the rest and the parity, without a retransmission round trip. With is_holding (for
+    # Go-Back-N) frames following a gap in their group are held back until the parity arrives, so the protocol
+    # above still sees them in order.
+    # Everything else is passed through to the wrapped manager.
+
+    def __init__(self, ipc_manager, group_size, is_holding=True):
+        self.ipc_manager_ = ipc_manager
+        self.group_size_ = group_size
+        self.is_holding_ = is_holding  # frames after a gap wait for it, otherwise they are passed on at once
+        self.pending_from_sender_ = deque()
+
+        self.total_parity_sent_ = 0
+        self.total_recovered_ = 0
+
+        self.reset()
+
+    def __getattr__(self, name):
+        return getattr(self.ipc_manager_, name)
+
+    def reset(self):
+        # seq nums restart from 0 with every connection
+        self.seq_num_next_ = 0  # sending side: frames below it are already in a parity
+        self.xor_ = 0
+        self.xor_length_ = 0
+        self.count_ = 0
+        self.groups_ = {}  # receiving side: group idx -> FecGroup
+        self.group_highest_ = 0
+
+    def send_to_receiver(self, msg):
+        self.send_many_to_receiver([msg])
+
+    def send_many_to_receiver(self, msgs):
+        frames = []
+        for frame in msgs:
+            frames.append(frame)
+            if frame.seq_num_ == transm_global_params.ESTABLISH_CONNECTION_CODE:
+                self.reset()
+            if frame.seq_num_ != self.seq_num_next_:  # retransmission, or not a data frame
+                continue
+
+            buf = encode(frame)
+            self.xor_ ^= int.from_bytes(buf, 'little')
+            self.xor_length_ ^= len(buf)
+            self.count_ += 1
+            self.seq_num_next_ += 1
+            if self.count_ == self.group_size_ or frame.is_last_:
+                data = (PARITY_HEADER.pack(self.xor_length_, self.count_)
+                        + self.xor_.to_bytes((self.xor_.bit_length() + 7) // 8, 'little'))
+                frames.append(Frame(data, frame.seq_num_ // self.group_size_, False, False, is_parity=True))
+                self.total_parity_sent_ += 1
+                self.xor_ = 0
+                self.xor_length_ = 0
+                self.count_ = 0
+        self.ipc_manager_.send_many_to_receiver(frames)
+
+    def get_from_sender(self, timeout=0):
+        if len(self.pending_from_sender_) == 0:
+            self.pending_from_sender_.extend(self.get_many_from_sender(timeout))
+            if len(self.pending_from_sender_) == 0:
+                return None
+        return self.pending_from_sender_.popleft()
+
+    def get_many_from_sender(self, timeout=0):
+        if len(self.pending_from_sender_) != 0:
+            frames = list(self.pending_from_sender_)
+            self.pending_from_sender_.clear()
+            return frames
+        return self.decode(self.ipc_manager_.get_many_from_sender(timeout), timeout)
+
+    async def get_many_from_sender_async(self, timeout=0):
+        if len(self.pending_from_sender_) != 0:
+            frames = list(self.pending_from_sender_)
+            self.pending_from_sender_.clear()
+            return frames
+        return self.decode(await self.ipc_manager_.get_many_from_sender_async(timeout), timeout)
+
+    def decode(self, received, timeout):
+        # the frames of a get_many_from_sender(timeout) of the wrapped manager as the protocol has to see them
+        frames = []
+        for frame in received:
+            if frame.is_corrupted_:  # data or parity, its group has lost it either way
+                if not self.is_holding_:  # Selective Repeat nacks it by its seq num at once
+                    frames.append(frame)
+                continue
+            if frame.seq_num_ == transm_global_params.ESTABLISH_CONNECTION_CODE:
+                self.reset()
+                frames.append(frame)
+            elif frame.is_parity_:
+                self.add_parity(frame, frames)
+            elif frame.seq_num_ >= 0 and not frame.is_ack_:
+                self.add_frame(frame, frames)
+            else:
+                frames.append(frame)
+
+        if len(received) == 0 and timeout != 0:
+            frames.extend(self.release_from_sender())
+        return frames
+
+    def release_from_sender(self):
+        # the link went quiet, no parity is coming for the groups waiting
+        frames = []
+        for group in self.groups_.values():
+            self.release(group, frames)
+        return frames
+
+    def has_pending_from_sender(self):
+        return len(self.pending_from_sender_) != 0 or self.ipc_manager_.has_pending_from_sender()
+
+    def group(self, group_idx, frames):
+        # a group that starts while an older one still waits for its parity means that parity was lost
+        while self.group_highest_ < group_idx:
+            self.group_highest_ += 1
+            for group in self.groups_.values():
+                if group.seq_num_first_ < self.group_highest_ * self.group_size_:
+                    self.release(group, frames)
+            # groups older than the receive buffer only get retransmissions, nothing to rebuild there
+            self.groups_.pop(self.group_highest_ - 2 - transm_global_params.RECEIVE_BUFFER_SIZE // self.group_size_,
+                             None)
+
+        group = self.groups_.get(group_idx)
+        if group is None and group_idx == self.group_highest_:
+            group = FecGroup(group_idx * self.group_size_, self.group_size_)
+            self.groups_[group_idx] = group
+        return group  # None for groups dropped already
+
+    def add_frame(self, frame, frames):
+        group = self.group(frame.seq_num_ // self.group_size_, frames)
+        if group is None or group.is_done_:
+            frames.append(frame)
+            return
+        if frame.seq_num_ in group.held_:  # resent, the sender has given up waiting for the gap to be filled
+            self.release(group, frames)
+            return
+        if frame.seq_num_ in group.seq_nums_:  # passed on before, Go-Back-N may have dropped it
+            frames.append(frame)
+            return
+        if frame.is_last_:
+            group.count_ = frame.seq_num_ - group.seq_num_first_ + 1
+
+        buf = encode(frame)
+        group.xor_ ^= int.from_bytes(buf, 'little')
+        group.xor_length_ ^= len(buf)
+        group.seq_nums_.add(frame.seq_num_)
+        if self.is_holding_ and frame.seq_num_ != group.seq_num_next_:
+            group.held_[frame.seq_num_] = frame
+            self.rebuild(group, frames)
+            return
+
+        frames.append(frame)
+        if frame.seq_num_ == group.seq_num_next_:  # the gap is filled, the frames held behind it follow
+            group.seq_num_next_ += 1
+            while group.seq_num_next_ in group.held_:
+                frames.append(group.held_.pop(group.seq_num_next_))
+                group.seq_num_next_ += 1
+        self.rebuild(group, frames)
+
+    def add_parity(self, frame, frames):
+        group = self.group(frame.seq_num_, frames)
+        if group is None or group.is_done_:
+            return
+        xor_length, count = PARITY_HEADER.unpack_from(frame.data_)
+        group.parity_ = (int.from_bytes(frame.data_[PARITY_HEADER.size:], 'little'), xor_length, count)
+        self.rebuild(group, frames)
+
+    def rebuild(self, group, frames):
+        if group.parity_ is None:
+            if len(group.seq_nums_) == group.count_:
+                self.release(group, frames)
+            return
+
+        xor, xor_length, count = group.parity_
+        if len(group.seq_nums_) == count - 1:
+            missing = xor ^ group.xor_
+            length = xor_length ^ group.xor_length_
+            # a parity that doesn't fit the frames (of an earlier connection, or a corruption the CRC missed)
+            # rebuilds nothing
+            if length >= HEADER.size and missing.bit_length() <= 8 * length:
+                frame = Frame.from_bytes(missing.to_bytes(length, 'little'))
+                if not frame.is_corrupted_:  # the checksum of the rebuilt frame still has to match
+                    group.held_[frame.seq_num_] = frame
+                    self.total_recovered_ += 1
+        self.release(group, frames)
+
+    def release(self, group, frames):
+        if group.is_done_:
+            return
+        for seq_num in sorted(group.held_):
+            frames.append(group.held_[seq_num])
+        group.held_ = {}
+        group.is_done_ = True
@@ -1,6 +1,130 @@
+import pickle
+import struct
+import zlib
+
+# wire format: fixed little-endian header (CRC32, seq num, flags, advertised window) followed by the raw payload,
+# the CRC32 covers everything after itself
+HEADER = struct.Struct('<IqBH')
+CHECKSUM = struct.Struct('<I')
+FIELDS = struct.Struct('<qBH')
+# frames written to the IPC layer in one batch are each prefixed by their length
+LENGTH = struct.Struct('<I')
+
+FLAG_LAST = 0x01
+FLAG_ACK = 0x04
+FLAG_NACK = 0x20
+FLAG_PARITY = 0x40
+
+# payload encoding is kept in flags bits 3-4
+PAYLOAD_MASK = 0x18
+PAYLOAD_NONE = 0x00
+PAYLOAD_BYTES = 0x08
+PAYLOAD_STR = 0x10
+PAYLOAD_PICKLE = 0x18  # fallback for structured payloads (neighbor lists, topology dicts)
+
+
 class Frame:
-    def __init__(self, data, seq_num, is_last, is_corrupted):
+    __slots__ = ('data_', 'seq_num_', 'is_last_', 'is_corrupted_', 'is_ack_', 'window_', 'is_nack_', 'is_parity_')
+
+    def __init__(self, data, seq_num, is_last, is_corrupted, is_ack=False, window=0, is_nack=False,
+                 is_parity=False):
         self.data_ = data
         self.seq_num_ = seq_num
         self.is_last_ = is_last
-        self.is_corrupted_ = is_corrupted
+        self.is_corrupted_ = is_corrupted  # set on decoding when the checksum doesn't match, never sent
+        self.is_ack_ = is_ack
+        self.window_ = window  # acks only: free frames in the receive buffer
+        self.is_nack_ = is_nack  # acks only: frame seq_num was lost or corrupted, resend it now
+        self.is_parity_ = is_parity  # FEC parity of frame group seq_num, see fec.py
+
+    def copy(self):
+        return Frame(self.data_, self.seq_num_, self.is_last_, self.is_corrupted_, self.is_ack_, self.window_,
+                     self.is_nack_, self.is_parity_)
+
+    def to_bytes(self):
+        flags = 0
+        if self.is_last_:
+            flags |= FLAG_LAST
+        if self.is_ack_:
+            flags |= FLAG_ACK
+        if self.is_nack_:
+            flags |= FLAG_NACK
+        if self.is_parity_:
+            flags |= FLAG_PARITY
+
+        data = self.data_
+        if data is None:
+            payload = b''
+        elif isinstance(data, (bytes, bytearray, memoryview)):
+            flags |= PAYLOAD_BYTES
+            payload = data
+        elif isinstance(data, str):
+            flags |= PAYLOAD_STR
+            payload = data.encode()
+        else:
+            flags |= PAYLOAD_PICKLE
+            payload = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        fields = FIELDS.pack(self.seq_num_, flags, self.window_)
+        return b''.join((CHECKSUM.pack(zlib.crc32(payload, zlib.crc32(fields))), fields, payload))
+
+    @staticmethod
+    def from_bytes(buf):
+        checksum, seq_num, flags, window = HEADER.unpack_from(buf)
+        if zlib.crc32(memoryview(buf)[CHECKSUM.size:]) != checksum:
+            # nothing but the seq num is kept, and even that only as a hint: the error may be anywhere
+            return Frame(None, seq_num, False, True)
+        payload_type = flags & PAYLOAD_MASK
+        if payload_type == PAYLOAD_NONE:
+            data = None
+        elif payload_type == PAYLOAD_BYTES:
+            data = bytes(buf[HEADER.size:])
+        elif payload_type == PAYLOAD_STR:
+            data = str(buf[HEADER.size:], 'utf-8')
+        else:
+            data = pickle.loads(buf[HEADER.size:])
+        return Frame(data, seq_num, flags & FLAG_LAST != 0, False, flags & FLAG_ACK != 0,
+                     window, flags & FLAG_NACK != 0, flags & FLAG_PARITY != 0)
+
+
+def pack_frames(frames, transmit=None):
+    # transmit(buf) -> buf is the channel every encoded frame passes through, the length prefixes are left intact
+    parts = []
+    for frame in frames:
+        buf = frame.to_bytes()
+        if transmit is not None:
+            buf = transmit(buf)
+        parts.append(LENGTH.pack(len(buf)))
+        parts.append(buf)
+    return b''.join(parts)
+
+
+def unpack_frames(buf):
+    frames = []
+    offset = 0
+    view = memoryview(buf)
+    while offset < len(buf):
+        length = LENGTH.unpack_from(buf, offset)[0]
+        offset += LENGTH.size
+        frames.append(Frame.from_bytes(view[offset: offset + length]))
+        offset += length
+    return frames
+
+
+def pack_sack_bitmap(seq_num_base, seq_nums):
+    # bit i is set when frame seq_num_base + 1 + i has been received out of order
+    bits = 0
+    for seq_num in seq_nums:
+        bits |= 1 << (seq_num - seq_num_base - 1)
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def unpack_sack_bitmap(seq_num_base, bitmap):
+    bits = int.from_bytes(bitmap, 'little')
+    seq_nums = []
+    seq_num = seq_num_base + 1
+    while bits != 0:
+        if bits & 1:
+            seq_nums.append(seq_num)
+        bits >>= 1
+        seq_num += 1
+    return seq_nums
@@ -1,6 +1,10 @@
+import asyncio
 from multiprocessing.managers import BaseManager
 import queue
 
+from ipc_manager_base import IPCManagerBase
+import transm_global_params
+
 queue_s2r = queue.Queue()
 queue_r2s = queue.Queue()
 
@@ -13,9 +17,10 @@ def get_queue_r2s():
     return queue_r2s
 
 
-class IPCManager:
+class IPCManager(IPCManagerBase):
 
     def __init__(self, address):
+        super().__init__()
         self.base_manager_ = None
         self.shared_queue_s2r_ = None
         self.shared_queue_r2s_ = None
@@ -43,18 +48,46 @@ class IPCManager:
         if self.base_manager_ is not None:
             self.base_manager_.shutdown()
 
-    def get_from_sender(self):
-        if self.shared_queue_s2r_.empty():
+    def read_from_sender(self, timeout):
+        return self.read_from_queue(self.shared_queue_s2r_, timeout)
+
+    def read_from_receiver(self, timeout):
+        return self.read_from_queue(self.shared_queue_r2s_, timeout)
+
+    @staticmethod
+    def read_from_queue(shared_queue, timeout):
+        try:
+            if timeout == 0:
+                return shared_queue.get_nowait()
+            return shared_queue.get(timeout=timeout)
+        except queue.Empty as empty:
+            # the proxy raises the exception object it also holds in a local of the raising frame, drop the
+            # traceback to break that cycle, otherwise the caller's frames stay alive until the next gc pass
+            empty.__traceback__ = None
             return None
-        return self.shared_queue_s2r_.get()
 
-    def get_from_receiver(self):
-        if self.shared_queue_r2s_.empty():
-            return None
-        return self.shared_queue_r2s_.get()
+    async def wait_readable_from_sender(self, timeout):
+        return await wait_queue_readable(self.shared_queue_s2r_, timeout)
+
+    async def wait_readable_from_receiver(self, timeout):
+        return await wait_queue_readable(self.shared_queue_r2s_, timeout)
+
+    def write_to_receiver(self, buf):
+        self.shared_queue_s2r_.put(buf)
+
+    def write_to_sender(self, buf):
+        self.shared_queue_r2s_.put(buf)
 
-    def send_to_receiver(self, msg):
-        self.shared_queue_s2r_.put(msg)
 
-    def send_to_sender(self, msg):
-        self.shared_queue_r2s_.put(msg)
+async def wait_queue_readable(shared_queue, timeout):
+    # a queue proxy has no descriptor for the event loop to watch, it is polled at IPC_POLL_INTERVAL
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    while shared_queue.empty():
+        if deadline is not None and loop.time() >= deadline:
+            return False
+        sleep_time = transm_global_params.IPC_POLL_INTERVAL
+        if deadline is not None:
+            sleep_time = min(sleep_time, deadline - loop.time())
+        await asyncio.sleep(sleep_time)
+    return True
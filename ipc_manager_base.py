@@ -0,0 +1,119 @@
+from collections import deque
+
+from channel import flip_bits
+from frame import pack_frames
+from frame import unpack_frames
+import transm_global_params
+
+
+class IPCManagerBase:
+    # Frame-level API shared by the IPC backends. Every IPC message is a batch of encoded frames,
+    # backends only implement read_from_sender/read_from_receiver(timeout) -> bytes or None
+    # and write_to_receiver/write_to_sender(buf), plus wait_readable_from_sender/wait_readable_from_receiver(timeout)
+    # coroutines for asyncio code and selectable_from_sender/selectable_from_receiver() for the Reactor.
+    # Frames to the receiver cross a channel with BIT_ERROR_RATE, acks are delivered intact.
+
+    def __init__(self):
+        self.pending_from_sender_ = deque()
+        self.pending_from_receiver_ = deque()
+
+    def get_from_sender(self, timeout=0):
+        # timeout=0 polls, timeout=None blocks until a frame arrives
+        if len(self.pending_from_sender_) == 0:
+            buf = self.read_from_sender(timeout)
+            if buf is None:
+                return None
+            self.pending_from_sender_.extend(unpack_frames(buf))
+        return self.pending_from_sender_.popleft()
+
+    def get_from_receiver(self, timeout=0):
+        if len(self.pending_from_receiver_) == 0:
+            buf = self.read_from_receiver(timeout)
+            if buf is None:
+                return None
+            self.pending_from_receiver_.extend(unpack_frames(buf))
+        return self.pending_from_receiver_.popleft()
+
+    def get_many_from_sender(self, timeout=0):
+        # waits for the first batch like get_from_sender, then drains everything already queued without blocking
+        return self.drain(self.pending_from_sender_, self.read_from_sender, timeout)
+
+    def get_many_from_receiver(self, timeout=0):
+        return self.drain(self.pending_from_receiver_, self.read_from_receiver, timeout)
+
+    @staticmethod
+    def drain(pending, read, timeout):
+        frames = list(pending)
+        pending.clear()
+        if len(frames) == 0:
+            buf = read(timeout)
+            if buf is None:
+                return frames
+            frames = unpack_frames(buf)
+        buf = read(0)
+        while buf is not None:
+            frames.extend(unpack_frames(buf))
+            buf = read(0)
+        return frames
+
+    async def get_many_from_sender_async(self, timeout=0):
+        # get_many_from_sender for asyncio code, when nothing is there the backend's
+        # wait_readable_from_sender(timeout) coroutine leaves the wait to the event loop
+        frames = self.get_many_from_sender(0)
+        if len(frames) == 0 and await self.wait_readable_from_sender(timeout):
+            frames = self.get_many_from_sender(0)
+        return frames
+
+    async def get_many_from_receiver_async(self, timeout=0):
+        frames = self.get_many_from_receiver(0)
+        if len(frames) == 0 and await self.wait_readable_from_receiver(timeout):
+            frames = self.get_many_from_receiver(0)
+        return frames
+
+    def selectable_from_sender(self):
+        # object with fileno() that turns readable when the sender writes, for a selector (see reactor.py);
+        # None when the backend has none and has to be polled
+        return None
+
+    def selectable_from_receiver(self):
+        return None
+
+    def next_delivery_from_sender(self):
+        # time the frames already read but held back become due, None when none are (see ChannelIPCManager)
+        return None
+
+    def next_delivery_from_receiver(self):
+        return None
+
+    def release_from_sender(self):
+        # frames held back for ones still to come, handed out once a wait for the sender timed out with nothing
+        # read (see FecIPCManager). For the Reactor, whose get_many never waits
+        return []
+
+    def release_from_receiver(self):
+        return []
+
+    def has_pending_from_sender(self):
+        return len(self.pending_from_sender_) != 0
+
+    def has_pending_from_receiver(self):
+        return len(self.pending_from_receiver_) != 0
+
+    @staticmethod
+    def transmit(buf):
+        return flip_bits(buf, transm_global_params.BIT_ERROR_RATE)
+
+    def send_to_receiver(self, msg):
+        self.write_to_receiver(pack_frames([msg], self.transmit))
+
+    def send_to_sender(self, msg):
+        self.write_to_sender(pack_frames([msg]))
+
+    def send_many_to_receiver(self, msgs):
+        # coalesces a burst of frames into a single IPC write
+        if len(msgs) != 0:
+            self.write_to_receiver(pack_frames(msgs, self.transmit))
+
+    def send_many_to_sender(self, msgs):
+        if len(msgs) != 0:
+            self.write_to_sender(pack_frames(msgs))
@@ -1,8 +1,12 @@
+import asyncio
 from multiprocessing import Pipe
 
+from ipc_manager_base import IPCManagerBase
 
-class IPCManagerPipes:
+
+class IPCManagerPipes(IPCManagerBase):
     def __init__(self):
+        super().__init__()
         self.s2r_conn_r_, self.s2r_conn_w_ = Pipe()
         self.r2s_conn_r_, self.r2s_conn_w_ = Pipe()
 
@@ -15,18 +19,52 @@ class IPCManagerPipes:
     # def shutdown(self):
     #     pass
 
-    def get_from_sender(self):
-        if not self.s2r_conn_r_.poll():
+    def read_from_sender(self, timeout):
+        if not self.s2r_conn_r_.poll(timeout):
             return None
-        return self.s2r_conn_r_.recv()
+        return self.s2r_conn_r_.recv_bytes()
 
-    def get_from_receiver(self):
-        if not self.r2s_conn_r_.poll():
+    def read_from_receiver(self, timeout):
+        if not self.r2s_conn_r_.poll(timeout):
             return None
-        return self.r2s_conn_r_.recv()
+        return self.r2s_conn_r_.recv_bytes()
+
+    async def wait_readable_from_sender(self, timeout):
+        return await wait_readable(self.s2r_conn_r_, timeout)
+
+    async def wait_readable_from_receiver(self, timeout):
+        return await wait_readable(self.r2s_conn_r_, timeout)
+
+    def selectable_from_sender(self):
+        return self.s2r_conn_r_
+
+    def selectable_from_receiver(self):
+        return self.r2s_conn_r_
+
+    def write_to_receiver(self, buf):
+        self.s2r_conn_w_.send_bytes(buf)
+
+    def write_to_sender(self, buf):
+        self.r2s_conn_w_.send_bytes(buf)
+
+
+async def wait_readable(conn, timeout):
+    # True once conn has data, False after timeout seconds (None for ever); meanwhile the event loop watches
+    # its descriptor along with everything else, no thread is blocked. The caller has found conn empty already
+    if timeout == 0:
+        return False
+    loop = asyncio.get_running_loop()
+    is_readable = loop.create_future()
 
-    def send_to_receiver(self, msg):
-        self.s2r_conn_w_.send(msg)
+    def finish(result):
+        if not is_readable.done():
+            is_readable.set_result(result)
 
-    def send_to_sender(self, msg):
-        self.r2s_conn_w_.send(msg)
+    loop.add_reader(conn.fileno(), finish, True)
+    timer = loop.call_later(timeout, finish, False) if timeout is not None else None
+    try:
+        return await is_readable
+    finally:
+        loop.remove_reader(conn.fileno())
+        if timer is not None:
+            timer.cancel()
@@ -0,0 +1,102 @@
+import bisect
+from collections import Counter
+
+# upper bounds of the histogram buckets in seconds, from 10 us up to about 84 s, 4 per doubling, so a percentile
+# is off by 19% at most
+TIME_BOUNDS = tuple(1e-5 * 2 ** (i / 4) for i in range(93))
+
+
+class Histogram:
+    # Counts of values in the buckets (bounds[i - 1], bounds[i]], values past the last bound go into one more.
+    # add() is a bisect and two increments. There is a single writer, the protocol loop of the link, so another
+    # thread can take a snapshot() at any time without a lock, at worst it misses the values being added.
+
+    def __init__(self, bounds=TIME_BOUNDS):
+        self.bounds_ = bounds
+        self.counts_ = [0] * (len(bounds) + 1)
+        self.sum_ = 0.0
+
+    def add(self, value):
+        self.counts_[bisect.bisect_left(self.bounds_, value)] += 1
+        self.sum_ += value
+
+    def snapshot(self):
+        return HistogramSnapshot(self.bounds_, list(self.counts_), self.sum_)
+
+
+class HistogramSnapshot:
+    def __init__(self, bounds, counts, total):
+        self.bounds_ = bounds
+        self.counts_ = counts
+        self.sum_ = total
+
+    def count(self):
+        return sum(self.counts_)
+
+    def mean(self):
+        count = self.count()
+        return self.sum_ / count if count != 0 else None
+
+    def percentile(self, percent):
+        # upper bound of the bucket holding the value, inf past the last bound, None when empty
+        count = self.count()
+        if count == 0:
+            return None
+        rank = percent / 100 * count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts_):
+            seen += bucket_count
+            if seen >= rank and bucket_count != 0:
+                return self.bounds_[i] if i < len(self.bounds_) else float('inf')
+        return float('inf')
+
+    def merge(self, other):
+        return HistogramSnapshot(self.bounds_, [a + b for a, b in zip(self.counts_, other.counts_)],
+                                 self.sum_ + other.sum_)
+
+    def __repr__(self):
+        return "count {} mean {} p50 {} p99 {}".format(self.count(), self.mean(), self.percentile(50),
+                                                       self.percentile(99))
+
+
+class LinkMetrics:
+    # Counters and histograms of one Sender or Receiver, kept for the life of the object. Only its protocol loop
+    # updates them, with plain increments, readers use snapshot().
+
+    def __init__(self):
+        # sender
+        self.timeouts_ = 0  # expiry rounds of the retransmission timer
+        self.retransmitted_frames_ = 0  # on timeouts, nacks and duplicate acks
+        self.retransmits_per_seq_ = Counter()  # seq num -> retransmissions in the current transfer
+        self.rtt_ = Histogram()
+        self.time_in_window_ = Histogram()  # from the first transmission of a frame until the window passes it
+        # receiver
+        self.duplicate_frames_ = 0
+        self.corrupted_frames_ = 0
+        self.out_of_order_frames_ = 0  # arrived ahead of the expected one, buffered by SR, dropped by GBN
+        # both, of the completed transfers
+        self.transfer_duration_ = Histogram()
+
+    def snapshot(self):
+        return dict(timeouts=self.timeouts_,
+                    retransmitted_frames=self.retransmitted_frames_,
+                    retransmits_per_seq=dict(self.retransmits_per_seq_),
+                    duplicate_frames=self.duplicate_frames_,
+                    corrupted_frames=self.corrupted_frames_,
+                    out_of_order_frames=self.out_of_order_frames_,
+                    rtt=self.rtt_.snapshot(),
+                    time_in_window=self.time_in_window_.snapshot(),
+                    transfer_duration=self.transfer_duration_.snapshot())
+
+
+def aggregate(snapshots):
+    # roll-up of link snapshots: counters are summed and histograms merged,
+    # retransmits_per_seq is left out, seq nums of different links have nothing in common
+    total = {}
+    for snapshot in snapshots:
+        for name, value in snapshot.items():
+            if name == 'retransmits_per_seq':
+                continue
+            total[name] = value if name not in total else (
+                total[name].merge(value) if isinstance(value, HistogramSnapshot) else total[name] + value)
+    return total
@@ -0,0 +1,129 @@
+import numpy
+
+from frame import HEADER
+from transm_global_params import TransmissionProtocol
+import transm_global_params
+
+
+def frame_error_probability(frame_size, bit_error_rate, loss_probability=0.0):
+    # a frame fails when the channel drops it or any of its bits, header included, is flipped
+    bits = (frame_size + HEADER.size) * 8
+    return 1 - (1 - loss_probability) * (1 - bit_error_rate) ** bits
+
+
+class MonteCarloResult:
+    # per transfer arrays of one point of the sweep
+    def __init__(self, frames_count, frame_size, sent, rounds, duration, is_done):
+        self.frames_count_ = frames_count
+        self.frame_size_ = frame_size
+        self.sent_ = sent  # data frames sent, retransmissions included
+        self.rounds_ = rounds  # windows sent before the last frame was acked
+        self.duration_ = duration  # sec, first frame sent to the last one acked
+        self.is_done_ = is_done  # False when the transfer didn't finish in max_rounds
+
+    def throughput(self):
+        # payload bytes/s of the finished transfers
+        done = self.duration_[self.is_done_]
+        if len(done) == 0:
+            return 0.0
+        return float(numpy.mean(self.frames_count_ * self.frame_size_ / numpy.maximum(done, 1e-12)))
+
+    def retransmission_ratio(self):
+        return float(numpy.mean(self.sent_ - self.frames_count_) / self.frames_count_)
+
+    def completion_time(self, percentile=50):
+        done = self.duration_[self.is_done_]
+        return float(numpy.percentile(done, percentile)) if len(done) != 0 else float('inf')
+
+
+def simulate(transmission_protocol, window_size, frames_count, data_error_probability, ack_error_probability=0.0,
+             frame_size=1024, rtt=0.01, rto=0.02, frame_time=0.0, transfers=1000, max_rounds=100000, seed=None,
+             initial_rto=None, rto_max=transm_global_params.RTO_MAX):
+    # Round model of many independent transfers at once, every array has a row per transfer. A round sends
+    # the window [base, base + window_size) that isn't acked yet, each frame gets through with
+    # 1 - data_error_probability and its ack with 1 - ack_error_probability. The round takes frame_time per
+    # frame sent plus rtt, or rto when a frame of the window wasn't acked and the sender had to time out.
+    # As in RttEstimator the timeout is initial_rto until the first frame sent only once is acked, rto after,
+    # and it doubles on every timeout up to rto_max until such a frame is acked again;
+    # the SR timers of the frames lost in a window expire one after another and double it once each.
+    # GBN acks are cumulative and frames after the first lost one are discarded by the receiver,
+    # SR keeps every frame that got through and resends only the unacked ones
+    generator = numpy.random.default_rng(seed)
+    offsets = numpy.arange(window_size)
+    base = numpy.zeros(transfers, dtype=numpy.int64)
+    sent = numpy.zeros(transfers, dtype=numpy.int64)
+    rounds = numpy.zeros(transfers, dtype=numpy.int64)
+    duration = numpy.zeros(transfers)
+    backoff = numpy.ones(transfers)
+    base_rto = numpy.full(transfers, rto if initial_rto is None else initial_rto)
+    seq_num_next = numpy.zeros(transfers, dtype=numpy.int64)  # first frame never sent
+    seq_num_unsampled = numpy.zeros(transfers, dtype=numpy.int64)  # GBN, frames before it were sent at a timeout
+    is_sel_repeat = transmission_protocol == TransmissionProtocol.ALGORITHM_TYPE_SR
+    acked = numpy.zeros((transfers, frames_count + window_size), dtype=bool) if is_sel_repeat else None
+
+    active = numpy.arange(transfers)
+    for _ in range(max_rounds):
+        if len(active) == 0:
+            break
+        seq_nums = base[active, None] + offsets
+        in_window = seq_nums < frames_count
+        delivered = generator.random(seq_nums.shape) >= data_error_probability
+        is_acked = generator.random(seq_nums.shape) >= ack_error_probability
+
+        if is_sel_repeat:
+            was_acked = acked[active[:, None], seq_nums]
+            sending = in_window & ~was_acked
+            now_acked = was_acked | (sending & delivered & is_acked)
+            is_sample = (sending & now_acked & ~was_acked & (seq_nums >= seq_num_next[active, None])).any(axis=1)
+            acked[active[:, None], seq_nums] = now_acked
+            # the window slides over the acked prefix
+            progress = numpy.argmin(numpy.hstack((now_acked & in_window,
+                                                  numpy.zeros((len(active), 1), dtype=bool))), axis=1)
+            losses = (sending & ~now_acked).sum(axis=1)
+        else:
+            sending = in_window
+            # the receiver takes the frames up to the first lost one, the highest ack that got back counts
+            in_order = numpy.cumprod(delivered | ~in_window, axis=1, dtype=bool) & in_window
+            progress = numpy.max((in_order & is_acked) * (offsets + 1), axis=1)
+            losses = (progress < in_window.sum(axis=1)).astype(numpy.int64)
+            # acks of the frames before the lost one slide the window, the frames it lets in are sent and
+            # discarded by the receiver before the timeout
+            refill = numpy.where(losses != 0, numpy.minimum(
+                progress, numpy.maximum(frames_count - base[active] - window_size, 0)), 0)
+            # the GBN sender samples the oldest frame only, and only when it wasn't in flight at a timeout
+            is_sample = (progress != 0) & (base[active] >= seq_num_unsampled[active])
+
+        sent_now = sending.sum(axis=1)
+        seq_num_sent = base[active] + in_window.sum(axis=1)
+        if not is_sel_repeat:
+            sent_now += refill
+            seq_num_sent += refill
+            seq_num_unsampled[active] = numpy.where(losses != 0, seq_num_sent, seq_num_unsampled[active])
+        sent[active] += sent_now
+        rounds[active] += 1
+        active_backoff = numpy.where(is_sample, 1.0, backoff[active])
+        active_rto = numpy.where(is_sample, rto, base_rto[active])
+        wait = numpy.where(losses != 0, numpy.minimum(active_rto * active_backoff, rto_max), rtt)
+        duration[active] += sent_now * frame_time + wait
+        backoff[active] = numpy.minimum(active_backoff * 2.0 ** losses, numpy.maximum(rto_max / active_rto, 1.0))
+        base_rto[active] = active_rto
+        seq_num_next[active] = numpy.maximum(seq_num_next[active], seq_num_sent)
+        base[active] += progress
+        active = active[base[active] < frames_count]
+
+    return MonteCarloResult(frames_count, frame_size, sent, rounds, duration, base >= frames_count)
+
+
+def sweep(protocols, window_sizes, bit_error_rates, frames_counts, frame_size=1024, loss_probability=0.0,
+          rtt=0.01, rto=0.02, frame_time=0.0, transfers=1000, seed=0):
+    # rows of (protocol, window size, bit error rate, frames count, result) over the whole grid
+    rows = []
+    for transmission_protocol in protocols:
+        for window_size in window_sizes:
+            for bit_error_rate in bit_error_rates:
+                for frames_count in frames_counts:
+                    result = simulate(transmission_protocol, window_size, frames_count,
+                                      frame_error_probability(frame_size, bit_error_rate, loss_probability),
+                                      loss_probability, frame_size, rtt, rto, frame_time, transfers, seed=seed)
+                    rows.append((transmission_protocol, window_size, bit_error_rate, frames_count, result))
+    return rows
@@ -1,63 +1,149 @@
 import time
-import math
-from queue import PriorityQueue
 import threading
 
+from protocol_driver import Wait
+from protocol_driver import collect_payloads
+from reactor import Reactor
+from reactor import ReactorEvent
+from routing import ShortestPathTree
+from routing import changed_edges
+from topology import TopologyAck
+from topology import TopologySnapshot
 from utils import get_time_h_m_s
 from utils import split_string
+from metrics import aggregate
+import tracing
 import transm_global_params
 
 
 class Node:
-    def __init__(self, identifier):
+    def __init__(self, identifier, tracer=None):
         self.id_ = identifier
+        self.tracer_ = tracer  # shared by the node and its links, see trace_links()
         self.senders_neighbors_ = {}
         self.receivers_neighbors_ = {}
         self.sender_des_node_ = None
         self.receiver_des_node_ = None
         self.adjacency_list_ = {}
         self.neighbor_ids_ = []
-        self.shortest_paths_ = {}
-
-    def find_shortest_path(self, start_id, finish_id):
-        distances = {}
-        is_visited = {}
-        for i in self.adjacency_list_.keys():
-            is_visited[i] = False
-            distances[i] = math.inf
-        distances[start_id] = 0
-        prev = {}
-        q = PriorityQueue()
-        q.put((0, start_id))
-
-        while not q.empty():
-            cur_node = q.get()[1]
-
-            if cur_node == finish_id:
-                break
-
-            is_visited[cur_node] = True
-            for neighbor in self.adjacency_list_[cur_node]:
-                neighbor_id = neighbor[0]
-                edge_weight = neighbor[1]
-
-                if not is_visited[neighbor_id]:
-                    if distances[neighbor_id] > edge_weight + distances[cur_node]:
-                        distances[neighbor_id] = edge_weight + distances[cur_node]
-                        prev[neighbor_id] = cur_node
-                    q.put((distances[neighbor_id], neighbor_id))
-
-        if finish_id not in prev.keys():
-            print("node #", start_id, ":", "node #", finish_id, "is unreachable", get_time_h_m_s())
-            return []
-        prev_id = prev[finish_id]
-        path = [finish_id]
-        while prev_id != start_id:
-            path.append(prev_id)
-            prev_id = prev[prev_id]
-        path.append(start_id)
-        path.reverse()
-        return path
+        self.routes_ = ShortestPathTree(identifier)
+        self.epoch_ = None  # of the topology applied last, see topology.py
+        self.is_ack_due_ = False
+
+    def links(self):
+        # name -> Sender or Receiver of every link of the node
+        links = {}
+        for i, sender in self.senders_neighbors_.items():
+            links["hello to " + str(i)] = sender
+        for i, receiver in self.receivers_neighbors_.items():
+            links["hello from " + str(i)] = receiver
+        if self.sender_des_node_ is not None:
+            links["to designated node"] = self.sender_des_node_
+        if self.receiver_des_node_ is not None:
+            links["from designated node"] = self.receiver_des_node_
+        return links
+
+    def metrics(self):
+        # per link snapshots of every Sender and Receiver of the node and their roll-up, see metrics.py
+        links = {name: link.metrics() for name, link in self.links().items()}
+        return dict(total=aggregate(links.values()), links=links)
+
+    def trace_links(self):
+        # every link records its events into the tracer of the node under its own link id
+        if self.tracer_ is None:
+            return
+        for name, link in self.links().items():
+            link.tracer_ = self.tracer_
+            link.link_id_ = self.tracer_.link(name)
+
+    def trace(self, event, node_id):
+        if self.tracer_ is not None:
+            self.tracer_.record(event, node_id)
+
+    def exclude_neighbor(self, neighbor_id_weight, neighbors_changed_event):
+        if neighbor_id_weight in self.neighbor_ids_:
+            print("node #", self.id_, ":", "node #", neighbor_id_weight[0],
+                  "seems to be dead, excluding from neighbors",
+                  get_time_h_m_s())
+            self.neighbor_ids_.remove(neighbor_id_weight)
+            self.trace(tracing.NEIGHBOR_DOWN, neighbor_id_weight[0])
+            neighbors_changed_event.set()
+
+    def include_neighbor(self, neighbor_id_weight, neighbors_changed_event):
+        if neighbor_id_weight not in self.neighbor_ids_:
+            print("node #", self.id_, ":", "node #", neighbor_id_weight[0],
+                  "discovered, appending to neighbors",
+                  get_time_h_m_s())
+            self.neighbor_ids_.append(neighbor_id_weight)
+            self.trace(tracing.NEIGHBOR_UP, neighbor_id_weight[0])
+            neighbors_changed_event.set()
+
+    def update_topology(self, message):
+        # a TopologySnapshot or a TopologyDelta, whatever its epoch the designated node is told the one applied
+        self.is_ack_due_ = True
+        if isinstance(message, TopologySnapshot):
+            changed = changed_edges(self.adjacency_list_, message.adjacency_list_)
+            self.adjacency_list_ = message.adjacency_list_
+        elif self.epoch_ is not None and message.epoch_base_ <= self.epoch_ < message.epoch_:
+            changed = changed_edges({key: self.adjacency_list_.get(key, []) for key in message.changes_},
+                                    message.changes_)
+            self.adjacency_list_.update(message.changes_)
+        else:  # already applied, or from an epoch this node has missed
+            return
+        self.epoch_ = message.epoch_
+        self.trace(tracing.TOPOLOGY_RECEIVED, len(self.adjacency_list_))
+        print("node #", self.id_, ":", "successfully received updated topology, rebuilding shortest paths",
+              # self.adjacency_list_,
+              get_time_h_m_s())
+        # one shortest path tree from this node serves every destination, a few changed edges only repair it
+        if len(changed) <= transm_global_params.ROUTING_MAX_INCREMENTAL_CHANGES:
+            self.routes_.update(self.adjacency_list_, changed)
+        else:
+            self.routes_.build(self.adjacency_list_)
+        if self.id_ in self.adjacency_list_.keys() and len(self.adjacency_list_[self.id_]) != 0:
+            print("node #", self.id_, ":", "shortest paths have been rebuilt", get_time_h_m_s())
+            self.trace(tracing.PATHS_REBUILT, len(self.routes_.next_hops_))
+        else:
+            self.trace(tracing.ISOLATED, self.id_)
+            print("node #", self.id_, ":", "node isolated from other, can't determine paths",
+                  get_time_h_m_s())
+
+    def topology_report(self, prev_eighbors_count):
+        # payloads for the designated node: the neighbor list when it has changed and the ack of the topology epoch,
+        # [] when there is nothing to tell
+        report = []
+        if len(self.neighbor_ids_) != prev_eighbors_count:
+            print("node #", self.id_, ":", "send neighbors list update to the designated node",
+                  get_time_h_m_s())
+            report.append(list(self.neighbor_ids_))
+        if self.is_ack_due_:
+            self.is_ack_due_ = False
+            report.append(TopologyAck(self.epoch_))
+        return report
+
+    def topology_reported(self, report, is_sent_successfully, prev_eighbors_count):
+        # returns the neighbors count the designated node knows of
+        for payload in report:
+            if isinstance(payload, TopologyAck):
+                if not is_sent_successfully:
+                    self.is_ack_due_ = True
+            elif is_sent_successfully:
+                prev_eighbors_count = len(payload)
+                self.trace(tracing.NEIGHBORS_SENT, len(payload))
+            else:
+                print("node #", self.id_, ":", "timeout while sending neighbors", get_time_h_m_s())
+                self.trace(tracing.NEIGHBORS_SEND_TIMEOUT, len(payload))
+        return prev_eighbors_count
+
+    def next_hop(self, destination):
+        # neighbor to forward to, None when destination is unreachable
+        return self.routes_.next_hops_.get(destination)
+
+    def shortest_paths(self):
+        # destination -> path from this node, [] when unreachable
+        if self.id_ not in self.adjacency_list_.keys() or len(self.adjacency_list_[self.id_]) == 0:
+            return {}
+        return {i: self.routes_.path(i) for i in self.adjacency_list_ if i != self.id_}
 
     def send_hello(self, stop_event, sender):
         while not stop_event.is_set():
@@ -65,18 +151,14 @@ class Node:
             if is_connected:
                 sender.send(["hello"])
 
-    def receive_hello(self, stop_event, locks, receiver, node, neighbor_id_weight):
+    def receive_hello(self, stop_event, locks, neighbors_changed_event, receiver, node, neighbor_id_weight):
         time_since_last_hello = time.time()
         while not stop_event.is_set():
             is_connected = receiver.wait_for_connection()
             if not is_connected:
                 if time.time() - time_since_last_hello > transm_global_params.HELLO_TIMEOUT:
                     locks[0].acquire()
-                    if neighbor_id_weight in node.neighbor_ids_:
-                        print("node #", node.id_, ":", "node #", neighbor_id_weight[0],
-                              "seems to be dead, excluding from neighbors",
-                              get_time_h_m_s())
-                        node.neighbor_ids_.remove(neighbor_id_weight)
+                    node.exclude_neighbor(neighbor_id_weight, neighbors_changed_event)
                     locks[0].release()
                 continue
 
@@ -84,51 +166,105 @@ class Node:
             if hello is not None:
                 time_since_last_hello = time.time()
                 locks[1].acquire()
-
-                if neighbor_id_weight not in node.neighbor_ids_:
-                    print("node #", node.id_, ":", "node #", neighbor_id_weight[0],
-                          "discovered, appending to neighbors",
-                          get_time_h_m_s())
-                    node.neighbor_ids_.append(neighbor_id_weight)
-
+                node.include_neighbor(neighbor_id_weight, neighbors_changed_event)
                 locks[1].release()
 
-    def send_topology_update(self, stop_event, sender, node):
+    def send_topology_update(self, stop_event, neighbors_changed_event, sender, node):
+        # neighbors_changed_event is also set when a topology has arrived and its epoch has to be acked
         prev_eighbors_count = len(node.neighbor_ids_)
         while not stop_event.is_set():
-            if len(node.neighbor_ids_) != prev_eighbors_count:
-                print("node #", node.id_, ":", "send neighbors list update to the designated node",
-                      get_time_h_m_s())
-
-                is_connected = sender.wait_for_connection()
-                if is_connected:
-                    is_sent_successfully = sender.send([node.neighbor_ids_])
-                    if is_sent_successfully:
-                        prev_eighbors_count = len(node.neighbor_ids_)
-                    else:
-                        print("node #", node.id_, ":", "timeout while sending neighbors", get_time_h_m_s())
-
-    def receive_topology(self, stop_event, receiver, node):
+            report = node.topology_report(prev_eighbors_count)
+            if len(report) == 0:
+                # sleep until receive_hello reports a change, waking up periodically to check stop_event
+                neighbors_changed_event.wait(transm_global_params.CONNECTION_TIMEOUT)
+                neighbors_changed_event.clear()
+            else:
+                is_sent_successfully = sender.wait_for_connection() and sender.send(report)
+                prev_eighbors_count = node.topology_reported(report, is_sent_successfully, prev_eighbors_count)
+
+    def receive_topology(self, stop_event, neighbors_changed_event, receiver, node):
         while not stop_event.is_set():
             is_connected = receiver.wait_for_connection()
             if is_connected:
                 adj_list_updated = receiver.receive()
                 if adj_list_updated is not None:
-                    node.adjacency_list_ = adj_list_updated[0]
-                    print("node #", node.id_, ":", "successfully received updated topology, rebuilding shortest paths",
-                          # node.adjacency_list_,
-                          get_time_h_m_s())
-                    if node.id_ in node.adjacency_list_.keys() and len(node.adjacency_list_[node.id_]) != 0:
-                        for i in node.adjacency_list_:
-                            if i != node.id_:
-                                node.shortest_paths_[i] = node.find_shortest_path(node.id_, i)
-                        print("node #", node.id_, ":", "shortest paths have been rebuilt", get_time_h_m_s())
-                    else:
-                        node.shortest_paths_ = {}
-                        print("node #", node.id_, ":", "node isolated from other, can't determine paths",
-                              get_time_h_m_s())
+                    node.update_topology(adj_list_updated[0])
+                    neighbors_changed_event.set()
+
+    # Reactor mode (NODE_REACTOR): the same state machines as generators over the protocol generators of the links,
+    # all of them run by one Reactor in the node's only thread, which sleeps in a single selector over every link.
+    # A generator runs alone until its next Wait, so neighbor_ids_ needs no lock
+
+    def hello_sending(self, stop_event, sender):
+        while not stop_event.is_set():
+            if (yield from sender.connect()):
+                yield from sender.send_iter(["hello"])
+
+    def hello_receiving(self, stop_event, neighbors_changed_event, receiver, neighbor_id_weight):
+        time_since_last_hello = time.time()
+        while not stop_event.is_set():
+            if not (yield from receiver.connect()):
+                if time.time() - time_since_last_hello > transm_global_params.HELLO_TIMEOUT:
+                    self.exclude_neighbor(neighbor_id_weight, neighbors_changed_event)
+                continue
+
+            if (yield from collect_payloads(receiver.receive_protocol(), [])):
+                time_since_last_hello = time.time()
+                self.include_neighbor(neighbor_id_weight, neighbors_changed_event)
+
+    def topology_update_sending(self, stop_event, neighbors_changed_event, sender):
+        prev_eighbors_count = len(self.neighbor_ids_)
+        while not stop_event.is_set():
+            report = self.topology_report(prev_eighbors_count)
+            if len(report) == 0:
+                # lifetime() sets neighbors_changed_event too when the node stops
+                yield from neighbors_changed_event.wait()
+                neighbors_changed_event.clear()
+            else:
+                is_sent_successfully = (yield from sender.connect()) and (yield from sender.send_iter(report))
+                prev_eighbors_count = self.topology_reported(report, is_sent_successfully, prev_eighbors_count)
+
+    def topology_receiving(self, stop_event, neighbors_changed_event, receiver):
+        while not stop_event.is_set():
+            if (yield from receiver.connect()):
+                adj_list_updated = []
+                if (yield from collect_payloads(receiver.receive_protocol(), adj_list_updated)):
+                    self.update_topology(adj_list_updated[0])
+                    neighbors_changed_event.set()
+
+    @staticmethod
+    def lifetime(stop_event, neighbors_changed_event):
+        yield Wait(transm_global_params.NODE_LIFETIME)
+        stop_event.set()
+        neighbors_changed_event.set()
+
+    def run_reactor(self):
+        reactor = Reactor()
+        stop_node_event = ReactorEvent(reactor)
+        neighbors_changed_event = ReactorEvent(reactor)
+
+        reactor.start(self.topology_update_sending(stop_node_event, neighbors_changed_event, self.sender_des_node_),
+                      self.sender_des_node_.ipc_manager_)
+        reactor.start(self.topology_receiving(stop_node_event, neighbors_changed_event, self.receiver_des_node_),
+                      self.receiver_des_node_.ipc_manager_, is_sender=False)
+        for i in self.senders_neighbors_:
+            reactor.start(self.hello_sending(stop_node_event, self.senders_neighbors_[i]),
+                          self.senders_neighbors_[i].ipc_manager_)
+        for i in self.receivers_neighbors_:
+            reactor.start(self.hello_receiving(stop_node_event, neighbors_changed_event, self.receivers_neighbors_[i],
+                                               (i, 1)),
+                          self.receivers_neighbors_[i].ipc_manager_, is_sender=False)
+        reactor.start(self.lifetime(stop_node_event, neighbors_changed_event))
+
+        reactor.run()
 
     def run(self):
+        self.trace_links()
+        if transm_global_params.NODE_REACTOR:
+            self.run_reactor()
+            self.save()
+            return
+
         threads_send_hello = []
         threads_receive_hello = []
 
@@ -140,17 +276,21 @@ class Node:
                                  args=(stop_node_event, self.senders_neighbors_[i])))
 
         locks = [threading.Lock(), threading.Lock()]
+        neighbors_changed_event = threading.Event()
 
         for i in self.receivers_neighbors_:
             threads_receive_hello.append(
                 threading.Thread(target=self.receive_hello,
-                                 args=(stop_node_event, locks, self.receivers_neighbors_[i], self, (i, 1))))
+                                 args=(stop_node_event, locks, neighbors_changed_event, self.receivers_neighbors_[i],
+                                       self, (i, 1))))
 
         thread_send_topology_update = threading.Thread(target=self.send_topology_update,
-                                                       args=(stop_node_event, self.sender_des_node_, self))
+                                                       args=(stop_node_event, neighbors_changed_event,
+                                                             self.sender_des_node_, self))
 
         thread_receive_topology = threading.Thread(target=self.receive_topology,
-                                                   args=(stop_node_event, self.receiver_des_node_, self))
+                                                   args=(stop_node_event, neighbors_changed_event,
+                                                         self.receiver_des_node_, self))
 
         thread_send_topology_update.start()
         thread_receive_topology.start()
@@ -170,9 +310,13 @@ class Node:
 
         thread_send_topology_update.join()
         thread_receive_topology.join()
+        self.save()
 
+    def save(self):
         print("node #", self.id_, ":", "I'm out, saving paths and topology", get_time_h_m_s())
         with open(str(self.id_) + "_outfile.txt", "w") as file:
             file.write(str(self.adjacency_list_))
             file.write("\n")
-            file.write(str(self.shortest_paths_))
+            file.write(str(self.shortest_paths()))
+        if self.tracer_ is not None:
+            self.tracer_.dump(str(self.id_) + "_trace.bin")
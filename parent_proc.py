@@ -9,6 +9,7 @@ from node import Node
 from designated_node import DesignatedNode
 from sender import Sender
 from receiver import Receiver
+from tracing import Tracer
 from utils import get_time_h_m_s
 import transm_global_params
 from transm_global_params import TopologyType
@@ -67,7 +68,7 @@ def random_coordinates(points_number):
 
 
 def run_des_node(transmission_protocol, senders, receivers):
-    node = DesignatedNode()
+    node = DesignatedNode(Tracer() if transm_global_params.NETWORK_TRACE else None)
 
     for sender in senders:
         node.senders_.append(Sender(sender, transmission_protocol, verbose=False))
@@ -79,7 +80,7 @@ def run_des_node(transmission_protocol, senders, receivers):
 
 def run_node(transmission_protocol, identifier, sender_ipc_topology, receiver_ipc_topology, senders_ipc_neighbor,
              receivers_ipc_neighbor):
-    node = Node(identifier=identifier)
+    node = Node(identifier=identifier, tracer=Tracer() if transm_global_params.NETWORK_TRACE else None)
     node.sender_des_node_ = Sender(sender_ipc_topology, transmission_protocol, verbose=False)
     node.receiver_des_node_ = Receiver(receiver_ipc_topology, transmission_protocol, verbose=False)
     for i, ipc in senders_ipc_neighbor.items():
@@ -173,9 +174,7 @@ if __name__ == '__main__':
     # processes[1].start()
     # processes[-1].start()
 
-    time_begin = time.time()
-    while time.time() - time_begin < transm_global_params.NETWORK_TIMEOUT:
-        pass
+    time.sleep(transm_global_params.NETWORK_TIMEOUT)
 
     print("Network timeout, exiting", get_time_h_m_s())
 
@@ -0,0 +1,70 @@
+import asyncio
+
+
+class Wait:
+    # yielded by the protocol generators of Sender and Receiver: wait up to timeout seconds (None for ever)
+    # for frames from the other end, the frames that arrived meanwhile are sent back into the generator
+    __slots__ = ('timeout_',)
+
+    def __init__(self, timeout):
+        self.timeout_ = timeout
+
+
+def drive(protocol, get_many):
+    # runs a protocol generator against an IPC manager, every Wait is a blocking get_many(timeout).
+    # Returns the return value of the generator
+    frames = None
+    try:
+        while True:
+            frames = get_many(timeout=protocol.send(frames).timeout_)
+    except StopIteration as stop:
+        return stop.value
+
+
+def drive_iter(protocol, get_many):
+    # the same for a protocol generator that yields payloads besides Wait, they are passed on to the caller
+    frames = None
+    while True:
+        try:
+            item = protocol.send(frames)
+        except StopIteration as stop:
+            return stop.value
+        if isinstance(item, Wait):
+            frames = get_many(timeout=item.timeout_)
+        else:
+            frames = None
+            yield item
+
+
+def collect_payloads(protocol, payloads):
+    # runs a protocol generator inside another one with yield from: its Waits go on to the driver,
+    # the payloads it yields besides them are appended to payloads. Returns the return value of the generator
+    frames = None
+    while True:
+        try:
+            item = protocol.send(frames)
+        except StopIteration as stop:
+            return stop.value
+        if isinstance(item, Wait):
+            frames = yield item
+        else:
+            frames = None
+            payloads.append(item)
+
+
+async def drive_async(protocol, get_many_async, consume=None):
+    # drive() for asyncio code: every Wait awaits get_many_async(timeout), so the event loop runs the other
+    # links meanwhile. Payloads yielded besides Wait (see drive_iter) are passed to consume(payload).
+    # Every Wait gives the other tasks a turn, even when frames are already there
+    frames = None
+    while True:
+        try:
+            item = protocol.send(frames)
+        except StopIteration as stop:
+            return stop.value
+        if isinstance(item, Wait):
+            await asyncio.sleep(0)
+            frames = await get_many_async(timeout=item.timeout_)
+        else:
+            frames = None
+            consume(item)
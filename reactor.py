@@ -0,0 +1,167 @@
+import heapq
+import itertools
+import math
+import selectors
+import time
+from collections import deque
+
+from protocol_driver import Wait
+import transm_global_params
+
+
+class Reactor:
+    # Runs the protocol generators (see protocol_driver.py) of any number of links in one thread, as the Simulator
+    # does on its virtual clock. A process runs until it yields Wait(timeout) and is resumed with the frames of its
+    # link once the link is readable or the timeout expires, whichever comes first. The read ends of the links stay
+    # registered in one selector while their processes live, so a wait costs a heap push and no system call.
+    # Links without a selectable read end (the queues backend) are polled every IPC_POLL_INTERVAL
+
+    def __init__(self, clock=time.time):
+        self.clock_ = clock
+        self.selector_ = selectors.DefaultSelector()
+        self.timers_ = []  # min-heap of (time, order, process), entries of rescheduled processes are skipped
+        self.order_ = itertools.count()
+        self.ready_ = deque()  # (process, frames) to resume
+        self.processes_count_ = 0
+        self.current_ = None  # process being resumed
+
+    def start(self, protocol, ipc_manager=None, is_sender=True):
+        # protocol runs on the link of ipc_manager, at its sender end or at its receiver end;
+        # without ipc_manager it only waits for its timeouts
+        process = ReactorProcess(protocol)
+        if ipc_manager is not None:
+            if is_sender:
+                process.get_many_ = ipc_manager.get_many_from_receiver
+                process.next_delivery_ = ipc_manager.next_delivery_from_receiver
+                process.selectable_ = ipc_manager.selectable_from_receiver()
+                process.release_ = ipc_manager.release_from_receiver
+            else:
+                process.get_many_ = ipc_manager.get_many_from_sender
+                process.next_delivery_ = ipc_manager.next_delivery_from_sender
+                process.selectable_ = ipc_manager.selectable_from_sender()
+                process.release_ = ipc_manager.release_from_sender
+            if process.selectable_ is not None:
+                self.selector_.register(process.selectable_, selectors.EVENT_READ, process)
+        self.processes_count_ += 1
+        self.ready_.append((process, None))
+        return process
+
+    def wake(self, process, is_expired=False):
+        # resumes a waiting process with whatever frames it has. Once the timeout of its Wait is over with nothing
+        # to read, the link also hands out the frames it held back for more to come, as a blocking
+        # get_many(timeout) of the link would have
+        if process.is_waiting_:
+            process.is_waiting_ = False
+            process.wake_time_ = math.inf
+            frames = None
+            if process.get_many_ is not None:
+                frames = process.get_many_(0)
+                if is_expired and len(frames) == 0:
+                    frames = process.release_()
+            self.ready_.append((process, frames))
+
+    def run(self):
+        # until every process has returned
+        while self.processes_count_ != 0:
+            while len(self.ready_) != 0:
+                self.resume(*self.ready_.popleft())
+            if self.processes_count_ == 0:
+                break
+
+            timeout = None
+            if len(self.timers_) != 0:
+                timeout = max(0.0, self.timers_[0][0] - self.clock_())
+            for key, _ in self.selector_.select(timeout):
+                self.wake(key.data)
+
+            cur_time = self.clock_()
+            while len(self.timers_) != 0 and self.timers_[0][0] <= cur_time:
+                wake_time, _, process = heapq.heappop(self.timers_)
+                if wake_time == process.wake_time_:
+                    self.wake(process, cur_time >= process.expire_time_)
+
+    def resume(self, process, frames):
+        self.current_ = process
+        while True:
+            try:
+                item = process.protocol_.send(frames)
+            except StopIteration as stop:
+                process.result_ = stop.value
+                if process.selectable_ is not None:
+                    self.selector_.unregister(process.selectable_)
+                self.processes_count_ -= 1
+                return
+            if isinstance(item, Wait):
+                break
+            process.payloads_.append(item)
+            frames = None
+
+        timeout = item.timeout_
+        cur_time = self.clock_()
+        process.expire_time_ = math.inf if timeout is None else cur_time + timeout
+        if process.get_many_ is not None and process.selectable_ is None:
+            timeout = transm_global_params.IPC_POLL_INTERVAL if timeout is None else min(
+                timeout, transm_global_params.IPC_POLL_INTERVAL)
+        if timeout == 0:
+            self.ready_.append((process, process.get_many_(0) if process.get_many_ is not None else None))
+            return
+
+        wake_time = math.inf if timeout is None else cur_time + timeout
+        if process.next_delivery_ is not None:
+            next_delivery = process.next_delivery_()
+            if next_delivery is not None:
+                wake_time = min(wake_time, next_delivery)
+        process.is_waiting_ = True
+        process.wake_time_ = wake_time
+        if wake_time != math.inf:
+            heapq.heappush(self.timers_, (wake_time, next(self.order_), process))
+
+
+class ReactorProcess:
+    def __init__(self, protocol):
+        self.protocol_ = protocol
+        self.get_many_ = None  # get_many(timeout) of its end of the link
+        self.next_delivery_ = None  # time frames already read by an emulated link become due, None when none are
+        self.selectable_ = None  # read end of the link
+        self.release_ = None  # release_from_*() of its end of the link
+        self.is_waiting_ = False
+        self.wake_time_ = math.inf
+        self.expire_time_ = math.inf  # end of the timeout of the Wait it is blocked in
+        self.result_ = None  # return value of the protocol generator
+        self.payloads_ = []  # everything else it yielded
+
+
+class ReactorEvent:
+    # threading.Event for the processes of a Reactor, wait() is a protocol generator to run with yield from.
+    # The frames that arrive at the waiting process meanwhile are dropped, so only a sender that has nothing
+    # in flight should wait on it
+
+    def __init__(self, reactor):
+        self.reactor_ = reactor
+        self.is_set_ = False
+        self.waiting_ = []
+
+    def is_set(self):
+        return self.is_set_
+
+    def set(self):
+        self.is_set_ = True
+        for process in self.waiting_:
+            self.reactor_.wake(process)
+        self.waiting_ = []
+
+    def clear(self):
+        self.is_set_ = False
+
+    def wait(self, timeout=None):
+        # returns is_set() once set() is called or after timeout seconds (None for ever)
+        if not self.is_set_:
+            process = self.reactor_.current_
+            self.waiting_.append(process)
+            try:
+                yield Wait(timeout)
+            finally:
+                # resumed by its timeout or its link rather than by set()
+                if process in self.waiting_:
+                    self.waiting_.remove(process)
+        return self.is_set_
@@ -1,19 +1,35 @@
 import datetime
 import time
 import sys
+import os
+import mmap
+from collections import deque
 
 from ipc_manager import IPCManager
 from frame import Frame
+from frame import pack_sack_bitmap
+from reorder_buffer import ReorderBuffer
+from delayed_ack import DelayedAck
+from metrics import LinkMetrics
+from tracing import Tracer
+import tracing
+from fec import with_fec
+from protocol_driver import Wait
+from protocol_driver import drive
+from protocol_driver import drive_iter
+from protocol_driver import drive_async
+from channel import with_channel
 from utils import get_time_h_m_s
-from utils import flip_biased_coin
 from utils import get_delta_ms
 from transm_global_params import TransmissionProtocol
 import transm_global_params
 
 
 class Receiver:
-    def __init__(self, ipc_manager, transmission_protocol, verbose=False):
-        self.ipc_manager_ = ipc_manager
+    def __init__(self, ipc_manager, transmission_protocol, verbose=False, clock=time.time, tracer=None, link_id=0):
+        # clock() is the time source of the protocol, the simulator (see simulator.py) passes its virtual clock
+        self.ipc_manager_ = with_fec(with_channel(ipc_manager), transmission_protocol)
+        self.clock_ = clock
         self.transmission_protocol_ = transmission_protocol
         if transmission_protocol == TransmissionProtocol.ALGORITHM_TYPE_GBN:
             if verbose:
@@ -23,251 +39,481 @@ class Receiver:
                 print("receiver: SELECTIVE REPEAT")
 
         self.VERBOSE = verbose
+        # per frame events go to the tracer (see tracing.py) as link_id, as in Sender
+        if tracer is None and verbose:
+            tracer = Tracer()
+        self.tracer_ = tracer
+        self.link_id_ = link_id
 
         self.total_received_ = 0
         self.total_sent_ack_ = 0
+        self.total_saved_ack_ = 0  # acks a receiver acking every frame would have sent on top of total_sent_ack_
+        self.metrics_ = LinkMetrics()
+
+        self.connection_data_ = None  # data attached by the sender to its connection request
+        self.advertised_window_ = transm_global_params.RECEIVE_BUFFER_SIZE  # window carried by the last ack
+
+    def metrics(self):
+        # snapshot of the counters of this link, see metrics.py, safe to take from another thread
+        return dict(self.metrics_.snapshot(), received=self.total_received_, sent_ack=self.total_sent_ack_,
+                    saved_ack=self.total_saved_ack_)
 
     def wait_for_connection(self):
-        time_start = time.time()
-        while time.time() - time_start < transm_global_params.CONNECTION_TIMEOUT:
-            req = self.ipc_manager_.get_from_sender()
-            if req is None:
-                continue
-            if req.seq_num_ == transm_global_params.ESTABLISH_CONNECTION_CODE:
-                ack = Frame(None, transm_global_params.ESTABLISH_CONNECTION_CODE, False, False)
-                self.ipc_manager_.send_to_sender(ack)
-                if self.VERBOSE:
-                    print("receiver: Connection established", get_time_h_m_s())
-                return True
+        return drive(self.connect(), self.ipc_manager_.get_many_from_sender)
+
+    async def wait_for_connection_async(self):
+        # wait_for_connection as a coroutine, the event loop runs the timers and the waits for frames
+        return await drive_async(self.connect(), self.ipc_manager_.get_many_from_sender_async)
+
+    def connect(self):
+        # protocol generator of wait_for_connection, see protocol_driver.py
+        time_start = self.clock_()
+        while self.clock_() < time_start + transm_global_params.CONNECTION_TIMEOUT:
+            reqs = yield Wait(max(0.0, time_start + transm_global_params.CONNECTION_TIMEOUT - self.clock_()))
+            for req in reqs:
+                if req.is_corrupted_:
+                    continue
+                if req.seq_num_ == transm_global_params.ESTABLISH_CONNECTION_CODE:
+                    self.connection_data_ = req.data_
+                    ack = Frame(None, transm_global_params.ESTABLISH_CONNECTION_CODE, False, False, is_ack=True,
+                                window=transm_global_params.RECEIVE_BUFFER_SIZE)
+                    self.ipc_manager_.send_to_sender(ack)
+                    if self.VERBOSE:
+                        print("receiver: Connection established", get_time_h_m_s())
+                    if self.tracer_ is not None:
+                        self.tracer_.record(tracing.CONNECTED, -1, self.link_id_)
+                    return True
         return False
 
-    def receive(self):
-        if self.transmission_protocol_ == TransmissionProtocol.ALGORITHM_TYPE_GBN:
-            return self.receive_go_back_n()
-        elif self.transmission_protocol_ == TransmissionProtocol.ALGORITHM_TYPE_SR:
-            return self.receive_sel_repeat()
+    def receive(self, sink=None, place=None):
+        # without a sink all payloads are collected and returned as a list,
+        # with a sink every in-order payload is passed to sink(payload) as it arrives and True is returned,
+        # with place see receive_iter; None on timeout in all cases
+        out_data_list = []
+        payloads = self.receive_iter(place)
+        while True:
+            try:
+                payload = next(payloads)
+            except StopIteration as stop:
+                is_complete = stop.value
+                break
+            if sink is None:
+                out_data_list.append(payload)
+            else:
+                sink(payload)
 
-    def receive_sel_repeat(self):
+        if not is_complete:
+            return None
+        return out_data_list if sink is None and place is None else True
+
+    async def receive_async(self, sink=None, place=None):
+        # receive as a coroutine, with the same sink, place and return values
         out_data_list = []
-        received_frames = []
+        is_complete = await drive_async(self.receive_protocol(place), self.ipc_manager_.get_many_from_sender_async,
+                                        out_data_list.append if sink is None else sink)
+        if not is_complete:
+            return None
+        return out_data_list if sink is None and place is None else True
+
+    def receive_iter(self, place=None):
+        # generator over in-order payloads, its return value is True when the transmission completes
+        # and False on timeout. With place, every new frame is handed to place(seq_num, payload) on arrival,
+        # out-of-order frames included, and nothing is yielded
+        return (yield from drive_iter(self.receive_protocol(place), self.ipc_manager_.get_many_from_sender))
+
+    def receive_protocol(self, place=None):
+        # protocol generator of receive_iter, yields the payloads between the Wait requests (see protocol_driver.py)
+        if self.transmission_protocol_ == TransmissionProtocol.ALGORITHM_TYPE_GBN:
+            return self.receive_go_back_n(place)
+        elif self.transmission_protocol_ == TransmissionProtocol.ALGORITHM_TYPE_SR:
+            return self.receive_sel_repeat(place)
+
+    def receive_file(self, path, file_size, frame_size=transm_global_params.FRAME_SIZE):
+        # the output file is preallocated and memory-mapped, every frame is copied straight to
+        # seq_num * frame_size as soon as it arrives, without reordering or collecting payloads
+        with open(path, 'w+b') as file:
+            file.truncate(file_size)
+            if file_size == 0:
+                return True
+            with mmap.mmap(file.fileno(), file_size) as out:
+                view = memoryview(out)
+
+                def place(seq_num, payload):
+                    offset = seq_num * frame_size
+                    view[offset: offset + len(payload)] = payload
+
+                try:
+                    return self.receive(place=place)
+                finally:
+                    # an exported view left over would make closing the map raise over the error of receive
+                    view.release()
+
+    def receive_sel_repeat(self, place=None):
+        delivered = deque()  # in-order payloads not yet taken by the consumer
+        received_frames = ReorderBuffer(transm_global_params.RECEIVE_BUFFER_SIZE)
+        delayed_ack = DelayedAck(self.clock_)  # only with SELECTIVE_ACK, plain SR acks are not cumulative
         seq_num_expected = 0
+        seq_num_highest = 0  # one past the highest seq num seen, corrupted frames included
         time_since_last_frame = None
         is_last_frame = False
+        metrics = self.metrics_
+        tracer = self.tracer_
+        link_id = self.link_id_
+
+        def handle_frames(frames):
+            nonlocal seq_num_expected, seq_num_highest, time_since_last_frame, is_last_frame
+            ack_frames = []  # acks for the whole drained batch go back in one IPC write
+            for frame in frames:
+                if is_last_frame:  # resend ack for each new frame after the last frame until timeout
+                    if not frame.is_corrupted_:
+                        self.total_received_ += 1
+                        metrics.duplicate_frames_ += 1
+                        # per-frame acks (no SELECTIVE_ACK) answer only their own frame, none can be coalesced
+                        if transm_global_params.SELECTIVE_ACK and self.is_ack_coalesced(ack_frames):
+                            continue
+                        ack_frame = self.sel_repeat_ack(frame.seq_num_ + 1, seq_num_expected, received_frames,
+                                                        delivered)
+                        if tracer is not None:
+                            tracer.record(tracing.SEND_ACK, ack_frame.seq_num_, link_id)
+                        ack_frames.append(ack_frame)
+                    continue
+
+                # the seq num of a corrupted frame is only a hint, outside the receive window it is damaged itself
+                if transm_global_params.SELECTIVE_NACK and (not frame.is_corrupted_ or self.is_in_receive_window(
+                        frame.seq_num_, seq_num_expected)):
+                    nack_frames = self.sel_repeat_nacks(frame, seq_num_highest, seq_num_expected, received_frames,
+                                                        delivered)
+                    if tracer is not None:
+                        for nack_frame in nack_frames:
+                            tracer.record(tracing.SEND_NACK, nack_frame.seq_num_, link_id)
+                    ack_frames.extend(nack_frames)
+                    seq_num_highest = max(seq_num_highest, frame.seq_num_ + 1)
+
+                if frame.is_corrupted_:  # without nack, receive re-sent frames after sender timeout
+                    if tracer is not None:
+                        tracer.record(tracing.CORRUPTED_FRAME, frame.seq_num_, link_id)
+                    metrics.corrupted_frames_ += 1
+                    continue
+
+                self.total_received_ += 1
+
+                if frame.seq_num_ < seq_num_expected:
+                    metrics.duplicate_frames_ += 1
+                    # its ack got lost, a per-frame ack has to name the duplicate itself
+                    ack_frame = self.sel_repeat_ack(frame.seq_num_ + 1, seq_num_expected, received_frames, delivered)
+                    if tracer is not None:
+                        tracer.record(tracing.DUPLICATE_FRAME, frame.seq_num_, link_id)
+                        tracer.record(tracing.SEND_ACK, ack_frame.seq_num_, link_id)
+                    ack_frames.append(ack_frame)
+                    continue
+
+                if frame.seq_num_ == seq_num_expected:
+                    if tracer is not None:
+                        tracer.record(tracing.RECEIVE_FRAME, frame.seq_num_, link_id)
+
+                    if frame.is_last_:
+                        is_last_frame = True
+
+                    seq_num_expected += 1
+                    if place is None:
+                        delivered.append(frame.data_)
+                    else:
+                        place(frame.seq_num_, frame.data_)
+                    ack_seq_num = seq_num_expected
 
-        if self.VERBOSE:
-            print("receiver: Start transmission", get_time_h_m_s())
-
-        start_transmission_time = time.time()
-
-        while True:
-            if time.time() - start_transmission_time > transm_global_params.TRANSMISSION_TIMEOUT:
-                return None
-            frame = self.ipc_manager_.get_from_sender()
-
-            if is_last_frame:  # resend ack for each new frame after the last frame until timeout
-
-                if frame is not None and not frame.is_corrupted_:
-                    self.total_received_ += 1
-                    ack_frame = Frame(
-                        data=None,
-                        seq_num=seq_num_expected,
-                        is_last=False,
-                        is_corrupted=False  # flip_biased_coin(transm_global_params.ERROR_PROBABILITY)
-                    )
-                    if self.VERBOSE:
-                        print("receiver: Resend ack after obtaining all frames", seq_num_expected, get_time_h_m_s())
-                    self.ipc_manager_.send_to_sender(ack_frame)
-                    self.total_sent_ack_ += 1
-
-                if time_since_last_frame is not None:
-                    if time.time() - time_since_last_frame > transm_global_params.TIMEOUT_RECEIVER:
-                        if self.VERBOSE:
-                            print("receiver: Timeout on resending last ack, terminating", get_time_h_m_s())
-                        break
-                continue
-
-            if frame is None:
-                continue
+                    while len(received_frames) != 0:
+                        buffered_frame = received_frames.pop(seq_num_expected)
+                        if buffered_frame is None:
+                            break
 
-            if frame.is_corrupted_:  # without nack, receive re-sent frames after sender timeout
-                if self.VERBOSE:
-                    print("receiver: Corrupted frame, ignoring", frame.seq_num_, get_time_h_m_s())
-                continue
+                        if buffered_frame.is_last_:
+                            is_last_frame = True
 
-            self.total_received_ += 1
+                        seq_num_expected += 1
+                        if place is None:  # otherwise placed on arrival
+                            delivered.append(buffered_frame.data_)
 
-            if frame.seq_num_ < seq_num_expected:
-                ack_frame = Frame(
-                    data=None,
-                    seq_num=seq_num_expected,
-                    is_last=False,
-                    is_corrupted=False  # flip_biased_coin(transm_global_params.ERROR_PROBABILITY)
-                )
-                if self.VERBOSE:
-                    print("receiver: Send ack for seq num less than expected", seq_num_expected, "is corrupted:",
-                          ack_frame.is_corrupted_, get_time_h_m_s())
-                self.ipc_manager_.send_to_sender(ack_frame)
-                self.total_sent_ack_ += 1
-                continue
+                    # frames that fill a gap or leave one behind are acked at once
+                    is_in_order = ack_seq_num == seq_num_expected and len(received_frames) == 0
+                    if (is_in_order and not is_last_frame and transm_global_params.SELECTIVE_ACK
+                            and delayed_ack.hold()):
+                        self.total_saved_ack_ += 1
+                        continue
 
-            if frame.seq_num_ == seq_num_expected:
-                if self.VERBOSE:
-                    print("receiver: Received expected frame", frame.seq_num_, get_time_h_m_s())
+                    ack_frame = self.sel_repeat_ack(ack_seq_num, seq_num_expected, received_frames, delivered)
+                    if tracer is not None:
+                        tracer.record(tracing.SEND_ACK, ack_frame.seq_num_, link_id)
+                    ack_frames.append(ack_frame)
 
-                if frame.is_last_:
-                    is_last_frame = True
+                else:
+                    if tracer is not None:
+                        tracer.record(tracing.UNEXPECTED_FRAME, frame.seq_num_, link_id)
+                    if received_frames.insert(frame, seq_num_expected):
+                        metrics.out_of_order_frames_ += 1
+                        if place is not None:
+                            place(frame.seq_num_, frame.data_)
+                            frame.data_ = None
+                    elif frame.seq_num_ in received_frames:
+                        metrics.duplicate_frames_ += 1
+                    else:  # beyond the receive buffer and dropped, an ack would pass it off as received
+                        continue
+
+                    ack_frame = self.sel_repeat_ack(frame.seq_num_ + 1, seq_num_expected, received_frames, delivered)
+                    if tracer is not None:
+                        tracer.record(tracing.SEND_ACK, ack_frame.seq_num_, link_id)
+                    ack_frames.append(ack_frame)
+
+                if is_last_frame:
+                    if self.VERBOSE:
+                        print("receiver: Last frame is received", seq_num_expected, get_time_h_m_s())
+                    if tracer is not None:
+                        tracer.record(tracing.LAST_FRAME, seq_num_expected, link_id)
+                    if time_since_last_frame is None:
+                        time_since_last_frame = self.clock_()
+
+            if self.is_ack_covering(ack_frames, seq_num_expected):
+                delayed_ack.reset()
+            elif delayed_ack.is_due(self.clock_()):
+                if tracer is not None:
+                    tracer.record(tracing.ACK_TIMER, seq_num_expected, link_id)
+                ack_frames.append(self.sel_repeat_ack(seq_num_expected, seq_num_expected, received_frames, delivered))
+                self.total_saved_ack_ -= 1
+                delayed_ack.reset()
+            self.send_acks(ack_frames)
 
-                seq_num_expected += 1
-                out_data_list.append(frame.data_)
+        if self.VERBOSE:
+            print("receiver: Start transmission", get_time_h_m_s())
+        if tracer is not None:
+            tracer.record(tracing.START, -1, link_id)
 
-                ack_frame = Frame(
-                    data=None,
-                    seq_num=seq_num_expected,
-                    is_last=False,
-                    is_corrupted=False  # flip_biased_coin(transm_global_params.ERROR_PROBABILITY)
-                )
-                if self.VERBOSE:
-                    print("receiver: Send ack", seq_num_expected, get_time_h_m_s())
-                self.ipc_manager_.send_to_sender(ack_frame)
-                self.total_sent_ack_ += 1
+        start_transmission_time = self.clock_()
 
-                prev_seq_num = frame.seq_num_
-                while len(received_frames) != 0:
-                    if received_frames[0].seq_num_ == prev_seq_num + 1:
+        while True:
+            cur_time = self.clock_()
+            if cur_time >= start_transmission_time + transm_global_params.TRANSMISSION_TIMEOUT:
+                if tracer is not None:
+                    tracer.record(tracing.TRANSMISSION_FAILED, seq_num_expected, link_id)
+                return False
+            wake_time = start_transmission_time + transm_global_params.TRANSMISSION_TIMEOUT
+            if time_since_last_frame is not None:
+                wake_time = min(wake_time, time_since_last_frame + transm_global_params.TIMEOUT_RECEIVER)
+            if delayed_ack.deadline_ is not None:
+                wake_time = min(wake_time, delayed_ack.deadline_)
+            handle_frames((yield Wait(max(0.0, wake_time - cur_time))))
+
+            yield from self.deliver(delivered, handle_frames)
+
+            if not is_last_frame and self.needs_window_update(len(received_frames)):
+                ack_frame = self.sel_repeat_ack(seq_num_expected, seq_num_expected, received_frames, delivered)
+                if tracer is not None:
+                    tracer.record(tracing.WINDOW_UPDATE, ack_frame.window_, link_id)
+                self.send_acks([ack_frame])
+
+            if time_since_last_frame is not None:
+                if self.clock_() >= time_since_last_frame + transm_global_params.TIMEOUT_RECEIVER:
+                    if self.VERBOSE:
+                        print("receiver: Timeout on resending last ack, terminating", get_time_h_m_s())
+                    metrics.transfer_duration_.add(time_since_last_frame - start_transmission_time)
+                    return True
+
+    def deliver(self, delivered, handle_frames):
+        # a consumer slower than RECEIVER_ACK_INTERVAL is interrupted to read and ack the frames that arrived
+        # meanwhile, so they don't wait in the IPC layer until the sender times out; the backlog shrinks
+        # the advertised window instead
+        pump_time = self.clock_()
+        while len(delivered) != 0:
+            yield delivered.popleft()
+            if self.clock_() - pump_time > transm_global_params.RECEIVER_ACK_INTERVAL:
+                handle_frames(self.ipc_manager_.get_many_from_sender())
+                pump_time = self.clock_()
+
+    def is_ack_coalesced(self, ack_frames):
+        # after the last frame every frame still arriving was acked once already,
+        # with DELAYED_ACK a single ack per drained batch answers them all
+        if transm_global_params.DELAYED_ACK and len(ack_frames) != 0:
+            self.total_saved_ack_ += 1
+            return True
+        return False
 
-                        if received_frames[0].is_last_:
-                            is_last_frame = True
+    @staticmethod
+    def is_ack_covering(ack_frames, seq_num_expected):
+        # acks are cumulative, the last one of a batch covers the frames held back before it but not the ones
+        # received after it, their ack timer keeps running. Nacks don't carry the cumulative ack
+        for ack_frame in reversed(ack_frames):
+            if not ack_frame.is_nack_:
+                return ack_frame.seq_num_ == seq_num_expected
+        return False
 
-                        seq_num_expected += 1
-                        out_data_list.append(received_frames[0].data_)
-
-                        # ack_frame_prev = Frame(
-                        #     data=None,
-                        #     seq_num=seq_num_expected,
-                        #     is_last=False,
-                        #     is_corrupted=False  # flip_biased_coin(transm_global_params.ERROR_PROBABILITY)
-                        # )
-                        # if self.VERBOSE:
-                        #     print("receiver: Send ack for previous frame", seq_num_expected, "is corrupted:",
-                        #       ack_frame_prev.is_corrupted_, get_time_h_m_s())
-                        # self.ipc_manager_.send_to_sender(ack_frame_prev)
-                        # self.total_sent_ack_ += 1
-
-                        del received_frames[0]
-                        prev_seq_num += 1
+    def send_acks(self, ack_frames):
+        if len(ack_frames) != 0:
+            self.advertised_window_ = ack_frames[-1].window_
+        self.ipc_manager_.send_many_to_sender(ack_frames)
+        self.total_sent_ack_ += len(ack_frames)
+
+    @staticmethod
+    def sel_repeat_ack(seq_num, seq_num_expected, received_frames, delivered):
+        # with SELECTIVE_ACK every ack is cumulative and carries a bitmap of the frames buffered out of order,
+        # otherwise it acknowledges the single frame seq_num - 1
+        window = Receiver.receive_window(len(received_frames) + len(delivered))
+        if not transm_global_params.SELECTIVE_ACK:
+            return Frame(None, seq_num, False, False, is_ack=True, window=window)
+        bitmap = pack_sack_bitmap(seq_num_expected, received_frames.seq_nums(seq_num_expected))
+        return Frame(bitmap, seq_num_expected, False, False, is_ack=True, window=window)
+
+    @staticmethod
+    def sel_repeat_nacks(frame, seq_num_highest, seq_num_expected, received_frames, delivered):
+        # nacks for the frames skipped since the highest seq num seen and for the frame itself when it is corrupted,
+        # limited to what the receive buffer can take
+        seq_num_end = seq_num_expected + transm_global_params.RECEIVE_BUFFER_SIZE
+        seq_nums = list(range(max(seq_num_highest, seq_num_expected), min(frame.seq_num_, seq_num_end)))
+        if frame.is_corrupted_ and Receiver.is_in_receive_window(frame.seq_num_, seq_num_expected):
+            if frame.seq_num_ not in received_frames:
+                seq_nums.append(frame.seq_num_)
+        window = Receiver.receive_window(len(received_frames) + len(delivered))
+        return [Frame(None, seq_num, False, False, is_ack=True, window=window, is_nack=True) for seq_num in seq_nums]
+
+    @staticmethod
+    def is_in_receive_window(seq_num, seq_num_expected):
+        return seq_num_expected <= seq_num < seq_num_expected + transm_global_params.RECEIVE_BUFFER_SIZE
+
+    @staticmethod
+    def receive_window(held_count):
+        # frames the sender may have in flight beyond its first unacked one
+        return max(0, transm_global_params.RECEIVE_BUFFER_SIZE - held_count)
+
+    def needs_window_update(self, held_count):
+        # once the consumer has caught up, a window last advertised below half of the buffer is reopened
+        # with an extra ack instead of leaving the sender to probe for it
+        half_buffer = transm_global_params.RECEIVE_BUFFER_SIZE // 2
+        return self.advertised_window_ < half_buffer <= self.receive_window(held_count)
+
+    def receive_go_back_n(self, place=None):
+        delivered = deque()  # in-order payloads not yet taken by the consumer
+        delayed_ack = DelayedAck(self.clock_)
+        seq_num_expected = 0
+        time_since_last_frame = None
+        is_last_frame = False
+        metrics = self.metrics_
+        tracer = self.tracer_
+        link_id = self.link_id_
+
+        def handle_frames(frames):
+            nonlocal seq_num_expected, time_since_last_frame, is_last_frame
+            ack_frames = []  # acks for the whole drained batch go back in one IPC write
+            for frame in frames:
+                if is_last_frame:  # resend ack for each new frame after the last frame until timeout
+                    if not frame.is_corrupted_:
+                        self.total_received_ += 1
+                        metrics.duplicate_frames_ += 1
+                        if self.is_ack_coalesced(ack_frames):
+                            continue
+                        ack_frame = Frame(
+                            data=None,
+                            seq_num=seq_num_expected,
+                            is_last=False,
+                            is_corrupted=False,
+                            is_ack=True,
+                            window=self.receive_window(len(delivered))
+                        )
+                        if tracer is not None:
+                            tracer.record(tracing.SEND_ACK, seq_num_expected, link_id)
+                        ack_frames.append(ack_frame)
+                    continue
+
+                if frame.is_corrupted_:
+                    if tracer is not None:
+                        tracer.record(tracing.CORRUPTED_FRAME, frame.seq_num_, link_id)
+                    metrics.corrupted_frames_ += 1
+                    continue
+
+                self.total_received_ += 1
+
+                if frame.seq_num_ == seq_num_expected:
+                    if tracer is not None:
+                        tracer.record(tracing.RECEIVE_FRAME, frame.seq_num_, link_id)
+
+                    if frame.is_last_:
+                        if self.VERBOSE:
+                            print("receiver: Last frame is received", seq_num_expected, get_time_h_m_s())
+                        if tracer is not None:
+                            tracer.record(tracing.LAST_FRAME, frame.seq_num_, link_id)
+                        is_last_frame = True
+                        if time_since_last_frame is None:
+                            time_since_last_frame = self.clock_()
+
+                    seq_num_expected += 1
+                    if place is None:
+                        delivered.append(frame.data_)
                     else:
-                        break
+                        place(frame.seq_num_, frame.data_)
 
-            else:
-                if self.VERBOSE:
-                    print("receiver: Received unexpected frame", frame.seq_num_, get_time_h_m_s())
-                if len(received_frames) != 0:
-                    insertion_idx = 0
-                    while insertion_idx < len(received_frames) and frame.seq_num_ > received_frames[
-                        insertion_idx].seq_num_:
-                        insertion_idx += 1
-                    if insertion_idx < len(received_frames) and received_frames[
-                        insertion_idx].seq_num_ != frame.seq_num_:
-                        received_frames.insert(insertion_idx, frame)
-                    elif insertion_idx == len(received_frames):
-                        received_frames.append(frame)
+                    if not is_last_frame and delayed_ack.hold():
+                        self.total_saved_ack_ += 1
+                        continue
                 else:
-                    received_frames.append(frame)
+                    if tracer is not None:
+                        tracer.record(tracing.UNEXPECTED_FRAME, frame.seq_num_, link_id)
+                    if frame.seq_num_ < seq_num_expected:
+                        metrics.duplicate_frames_ += 1
+                    else:
+                        metrics.out_of_order_frames_ += 1
 
                 ack_frame = Frame(
                     data=None,
-                    seq_num=frame.seq_num_ + 1,
+                    seq_num=seq_num_expected,
                     is_last=False,
-                    is_corrupted=False  # flip_biased_coin(transm_global_params.ERROR_PROBABILITY)
+                    is_corrupted=False,
+                    is_ack=True,
+                    window=self.receive_window(len(delivered))
                 )
-                if self.VERBOSE:
-                    print("receiver: Send ack", frame.seq_num_ + 1, get_time_h_m_s())
-                self.ipc_manager_.send_to_sender(ack_frame)
-                self.total_sent_ack_ += 1
-
-            if is_last_frame:
-                if self.VERBOSE:
-                    print("receiver: Last frame is received", seq_num_expected, get_time_h_m_s())
-                if time_since_last_frame is None:
-                    time_since_last_frame = time.time()
-
-        return out_data_list
-
-    def receive_go_back_n(self):
-        out_data_list = []
-        seq_num_expected = 0
-        time_since_last_frame = None
-        is_last_frame = False
+                if tracer is not None:
+                    tracer.record(tracing.SEND_ACK, seq_num_expected, link_id)
+                ack_frames.append(ack_frame)
+
+            if self.is_ack_covering(ack_frames, seq_num_expected):
+                delayed_ack.reset()
+            elif delayed_ack.is_due(self.clock_()):
+                if tracer is not None:
+                    tracer.record(tracing.ACK_TIMER, seq_num_expected, link_id)
+                ack_frames.append(Frame(None, seq_num_expected, False, False, is_ack=True,
+                                        window=self.receive_window(len(delivered))))
+                self.total_saved_ack_ -= 1
+                delayed_ack.reset()
+            self.send_acks(ack_frames)
 
         if self.VERBOSE:
             print("receiver: Start transmission", get_time_h_m_s())
+        if tracer is not None:
+            tracer.record(tracing.START, -1, link_id)
 
-        start_transmission_time = time.time()
+        start_transmission_time = self.clock_()
         while True:
-            if time.time() - start_transmission_time > transm_global_params.TRANSMISSION_TIMEOUT:
-                return None
-            frame = self.ipc_manager_.get_from_sender()
-
-            if is_last_frame:  # resend ack for each new frame after the last frame until timeout
-                if frame is not None and not frame.is_corrupted_:
-                    self.total_received_ += 1
-                    ack_frame = Frame(
-                        data=None,
-                        seq_num=seq_num_expected,
-                        is_last=False,
-                        is_corrupted=False  # flip_biased_coin(transm_global_params.ERROR_PROBABILITY)
-                    )
+            cur_time = self.clock_()
+            if cur_time >= start_transmission_time + transm_global_params.TRANSMISSION_TIMEOUT:
+                if tracer is not None:
+                    tracer.record(tracing.TRANSMISSION_FAILED, seq_num_expected, link_id)
+                return False
+            wake_time = start_transmission_time + transm_global_params.TRANSMISSION_TIMEOUT
+            if time_since_last_frame is not None:
+                wake_time = min(wake_time, time_since_last_frame + transm_global_params.TIMEOUT_RECEIVER)
+            if delayed_ack.deadline_ is not None:
+                wake_time = min(wake_time, delayed_ack.deadline_)
+            handle_frames((yield Wait(max(0.0, wake_time - cur_time))))
+
+            yield from self.deliver(delivered, handle_frames)
+
+            if not is_last_frame and self.needs_window_update(0):
+                ack_frame = Frame(None, seq_num_expected, False, False, is_ack=True, window=self.receive_window(0))
+                if tracer is not None:
+                    tracer.record(tracing.WINDOW_UPDATE, ack_frame.window_, link_id)
+                self.send_acks([ack_frame])
+
+            if time_since_last_frame is not None:
+                if self.clock_() >= time_since_last_frame + transm_global_params.TIMEOUT_RECEIVER:
                     if self.VERBOSE:
-                        print("receiver: Send ack", seq_num_expected, get_time_h_m_s())
-                    self.ipc_manager_.send_to_sender(ack_frame)
-                    self.total_sent_ack_ += 1
-
-                if time_since_last_frame is not None:
-                    if time.time() - time_since_last_frame > transm_global_params.TIMEOUT_RECEIVER:
-                        if self.VERBOSE:
-                            print("receiver: Timeout on resending last ack, terminating", get_time_h_m_s())
-                        break
-                continue
-
-            if frame is None:
-                continue
-
-            if frame.is_corrupted_:
-                if self.VERBOSE:
-                    print("receiver: Corrupted frame, ignoring", frame.seq_num_, get_time_h_m_s())
-                continue
-
-            self.total_received_ += 1
-
-            if frame.seq_num_ == seq_num_expected:
-                if self.VERBOSE:
-                    print("receiver: Received expected frame", frame.seq_num_, get_time_h_m_s())
-
-                if frame.is_last_:
-                    if self.VERBOSE:
-                        print("receiver: Last frame is received", seq_num_expected, get_time_h_m_s())
-                    is_last_frame = True
-                    if time_since_last_frame is None:
-                        time_since_last_frame = time.time()
-
-                seq_num_expected += 1
-                out_data_list.append(frame.data_)
-            else:
-                if self.VERBOSE:
-                    print("receiver: Received unexpected frame", frame.seq_num_, get_time_h_m_s())
-
-            ack_frame = Frame(
-                data=None,
-                seq_num=seq_num_expected,
-                is_last=False,
-                is_corrupted=False  # flip_biased_coin(transm_global_params.ERROR_PROBABILITY)
-            )
-            if self.VERBOSE:
-                print("receiver: Send ack", seq_num_expected, get_time_h_m_s())
-            self.ipc_manager_.send_to_sender(ack_frame)
-            self.total_sent_ack_ += 1
-
-        return out_data_list
+                        print("receiver: Timeout on resending last ack, terminating", get_time_h_m_s())
+                    metrics.transfer_duration_.add(time_since_last_frame - start_transmission_time)
+                    return True
 
 
 if __name__ == "__main__":
@@ -276,45 +522,30 @@ if __name__ == "__main__":
 
     receiver = Receiver(m, transm_global_params.TRANSMISSION_PROTOCOL_TYPE, True)
 
-    receiver.wait_for_connection()
+    if not receiver.wait_for_connection():
+        print("receiver: No connection, terminating", get_time_h_m_s())
+        sys.exit(1)
 
     start_time = datetime.datetime.now()
 
-    data = receiver.receive()
-
-    finish_time = datetime.datetime.now()
-
-    out_str = ""
-    for s in data:
-        out_str += s
-
     output_path = "output.txt"
     if len(sys.argv) > 1:
         output_path = sys.argv[1]
 
-    with open(output_path, 'w') as file:
-        file.write(out_str)
-
-    # with open('input.txt', 'r') as file:
-    #     data_gt = file.read()
-    #
-    # are_equal_strings = data_gt == out_str
-    #
-    # with open('receiver_results.txt', 'a') as file:
-    #     file.write(
-    #         str(transm_global_params.TRANSMISSION_PROTOCOL_TYPE)
-    #         + " "
-    #         + str(transm_global_params.ERROR_PROBABILITY)
-    #         + " "
-    #         + str(get_delta_ms(start_time, finish_time))
-    #         + " ms"
-    #         + " total_sent_ack: "
-    #         + str(receiver.total_sent_ack_)
-    #         + " total_received: "
-    #         + str(receiver.total_received_)
-    #         + " win size: "
-    #         + str(transm_global_params.WINDOW_SIZE)
-    #         + " successful transmission: "
-    #         + str(are_equal_strings)
-    #         + "\n"
-    #     )
+    if transm_global_params.MMAP_FILE_TRANSFER:
+        output_size, frame_size = receiver.connection_data_
+        receiver.receive_file(output_path, output_size, frame_size)
+    else:
+        with open(output_path, 'wb') as file:
+            receiver.receive(file.write)
+
+    finish_time = datetime.datetime.now()
+
+    output_size = os.path.getsize(output_path)
+    print("receiver: Received", output_size, "bytes,",
+          round(output_size / 1000 / get_delta_ms(start_time, finish_time), 3), "MB/s", get_time_h_m_s())
+    if transm_global_params.FEC_GROUP_SIZE != 0:
+        print("receiver: FEC recovered frames:", receiver.ipc_manager_.total_recovered_, get_time_h_m_s())
+
+    if receiver.tracer_ is not None:
+        receiver.tracer_.dump("receiver_trace.bin")  # python tracing.py receiver_trace.bin prints the timeline
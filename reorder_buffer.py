@@ -0,0 +1,57 @@
+class ReorderBuffer:
+    # Circular buffer for frames received ahead of seq_num_expected. Frame seq_num lives in slot
+    # seq_num % capacity, so insertion, duplicate detection and in-order removal are O(1) and nothing is shifted.
+    # The buffer can hold any frame with seq_num_expected < seq_num < seq_num_expected + capacity.
+
+    def __init__(self, capacity):
+        self.capacity_ = capacity
+        self.frames_ = [None] * capacity
+        self.occupied_ = bytearray(capacity)  # occupancy bitmap, one byte per slot
+        self.count_ = 0
+
+    def __len__(self):
+        return self.count_
+
+    def __contains__(self, seq_num):
+        idx = seq_num % self.capacity_
+        return self.occupied_[idx] == 1 and self.frames_[idx].seq_num_ == seq_num
+
+    def insert(self, frame, seq_num_expected):
+        # returns False for duplicates and frames outside of the buffered range
+        seq_num = frame.seq_num_
+        if not seq_num_expected < seq_num < seq_num_expected + self.capacity_:
+            return False
+        idx = seq_num % self.capacity_
+        if self.occupied_[idx]:
+            return False
+        self.frames_[idx] = frame
+        self.occupied_[idx] = 1
+        self.count_ += 1
+        return True
+
+    def pop(self, seq_num):
+        # removes and returns frame seq_num if it is buffered, None otherwise
+        idx = seq_num % self.capacity_
+        if not self.occupied_[idx]:
+            return None
+        frame = self.frames_[idx]
+        if frame.seq_num_ != seq_num:
+            return None
+        self.frames_[idx] = None
+        self.occupied_[idx] = 0
+        self.count_ -= 1
+        return frame
+
+    def seq_nums(self, seq_num_expected):
+        # buffered seq nums in ascending order, scanning the occupancy bitmap from the slot after seq_num_expected
+        seq_nums = []
+        if self.count_ == 0:
+            return seq_nums
+        start = (seq_num_expected + 1) % self.capacity_
+        for lo, hi, base in ((start, self.capacity_, seq_num_expected + 1 - start),
+                             (0, start, seq_num_expected + 1 + self.capacity_ - start)):
+            idx = self.occupied_.find(1, lo, hi)
+            while idx != -1:
+                seq_nums.append(base + idx)
+                idx = self.occupied_.find(1, idx + 1, hi)
+        return seq_nums
@@ -0,0 +1,148 @@
+from heapq import heappop
+from heapq import heappush
+import math
+
+
+class ShortestPathTree:
+    # Tree of the shortest paths from source over an undirected adjacency list {node: [(neighbor, weight), ...]}
+    # with positive weights, as the designated node keeps it, and the routing table derived from it: next_hops_[node]
+    # is the neighbor of source the shortest path to node leaves through. build() runs one Dijkstra over the whole
+    # graph, update() repairs the tree after a few edges have changed and only visits the nodes whose paths change
+
+    def __init__(self, source):
+        self.source_ = source
+        self.adjacency_list_ = {}
+        self.distances_ = {source: 0}
+        self.parents_ = {}
+        self.children_ = {}  # node -> set of the nodes whose parent it is
+        self.next_hops_ = {}
+
+    def build(self, adjacency_list):
+        self.adjacency_list_ = adjacency_list
+        self.distances_ = {self.source_: 0}
+        self.parents_ = {}
+        self.children_ = {}
+        self.next_hops_ = {}
+        self.settle([(0, self.source_)])
+
+    def update(self, adjacency_list, changed_edges):
+        # adjacency_list is the graph after the change, changed_edges holds (node, neighbor) of every edge added,
+        # removed or reweighted since. The subtrees hanging off changed tree edges are cut off and re-attached from
+        # their neighbors outside of them, then the changed edges are relaxed. Every distance left is still the
+        # length of a path of the new graph, so Dijkstra from the improved nodes only fixes what got shorter
+        self.adjacency_list_ = adjacency_list
+        distances = self.distances_
+        heap = []
+
+        orphans = []
+        for node, neighbor in changed_edges:
+            if self.parents_.get(neighbor) == node:
+                self.cut(neighbor, orphans)
+            elif self.parents_.get(node) == neighbor:
+                self.cut(node, orphans)
+        for orphan in orphans:
+            for neighbor, weight in adjacency_list.get(orphan, ()):
+                distance = distances.get(neighbor)
+                if distance is not None:
+                    self.relax(neighbor, orphan, distance + weight, heap)
+
+        for node, neighbor in changed_edges:
+            for node_from, node_to in ((node, neighbor), (neighbor, node)):
+                distance = distances.get(node_from)
+                if distance is None:
+                    continue
+                for adjacent, weight in adjacency_list.get(node_from, ()):
+                    if adjacent == node_to:
+                        self.relax(node_from, node_to, distance + weight, heap)
+                        break
+        self.settle(heap)
+
+    def cut(self, node, orphans):
+        # detaches the subtree of node, its nodes are unreachable until settled again
+        parent = self.parents_.pop(node)
+        self.children_[parent].discard(node)
+        stack = [node]
+        while len(stack) != 0:
+            orphan = stack.pop()
+            orphans.append(orphan)
+            del self.distances_[orphan]
+            self.next_hops_.pop(orphan, None)
+            children = self.children_.pop(orphan, None)
+            if children is not None:
+                for child in children:
+                    del self.parents_[child]
+                stack.extend(children)
+
+    def relax(self, node, neighbor, distance, heap):
+        if distance < self.distances_.get(neighbor, math.inf):
+            self.distances_[neighbor] = distance
+            parent = self.parents_.get(neighbor)
+            if parent is not None:
+                self.children_[parent].discard(neighbor)
+            self.parents_[neighbor] = node
+            children = self.children_.get(node)
+            if children is None:
+                self.children_[node] = {neighbor}
+            else:
+                children.add(neighbor)
+            heappush(heap, (distance, neighbor))
+
+    def settle(self, heap):
+        # Dijkstra from the (distance, node) candidates in heap, a node is popped after its parent,
+        # so the next hop of the parent is already known. relax() inlined
+        adjacency_list = self.adjacency_list_
+        distances = self.distances_
+        parents = self.parents_
+        children = self.children_
+        next_hops = self.next_hops_
+        source = self.source_
+        inf = math.inf
+        while len(heap) != 0:
+            distance, node = heappop(heap)
+            if distance != distances[node]:  # improved after it was pushed
+                continue
+            parent = parents.get(node)
+            if parent is not None:
+                next_hops[node] = node if parent == source else next_hops[parent]
+            node_children = None
+            for neighbor, weight in adjacency_list.get(node, ()):
+                neighbor_distance = distance + weight
+                if neighbor_distance < distances.get(neighbor, inf):
+                    distances[neighbor] = neighbor_distance
+                    parent = parents.get(neighbor)
+                    if parent is not None:
+                        children[parent].discard(neighbor)
+                    parents[neighbor] = node
+                    if node_children is None:
+                        node_children = children.get(node)
+                        if node_children is None:
+                            node_children = children[node] = set()
+                    node_children.add(neighbor)
+                    heappush(heap, (neighbor_distance, neighbor))
+
+    def path(self, node):
+        # source, ..., node; [] when node is unreachable
+        if node not in self.parents_:
+            return []
+        path = [node]
+        while node != self.source_:
+            node = self.parents_[node]
+            path.append(node)
+        path.reverse()
+        return path
+
+
+def changed_edges(adjacency_list_old, adjacency_list_new):
+    # (node, neighbor) of every edge added, removed or reweighted between the two adjacency lists
+    edges = []
+    for node in adjacency_list_old.keys() | adjacency_list_new.keys():
+        neighbors_old = adjacency_list_old.get(node, [])
+        neighbors_new = adjacency_list_new.get(node, [])
+        if neighbors_old == neighbors_new:
+            continue
+        weights_old = dict(neighbors_old)
+        weights_new = dict(neighbors_new)
+        for neighbor in weights_old.keys() | weights_new.keys():
+            if weights_old.get(neighbor) != weights_new.get(neighbor):
+                edges.append((node, neighbor))
+    return edges
@@ -0,0 +1,36 @@
+import transm_global_params
+
+
+class RttEstimator:
+    # Retransmission timeout from measured round trips as in RFC 6298: RTO = SRTT + max(G, 4 * RTTVAR), plus the
+    # time the receiver may hold an ack with DELAYED_ACK, doubled on every timeout until a new sample arrives.
+    # The clock granularity G keeps RTTVAR from collapsing to nothing on a steady link. Callers only feed samples
+    # of frames that were transmitted once (Karn's rule).
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+
+    def __init__(self, initial_rto):
+        self.srtt_ = None
+        self.rttvar_ = None
+        self.base_rto_ = initial_rto
+        self.backoff_ = 1
+
+    def add_sample(self, rtt):
+        if self.srtt_ is None:
+            self.srtt_ = rtt
+            self.rttvar_ = rtt / 2
+        else:
+            self.rttvar_ = (1 - self.BETA) * self.rttvar_ + self.BETA * abs(self.srtt_ - rtt)
+            self.srtt_ = (1 - self.ALPHA) * self.srtt_ + self.ALPHA * rtt
+        rto = self.srtt_ + max(transm_global_params.RTO_GRANULARITY, 4 * self.rttvar_)
+        if transm_global_params.DELAYED_ACK:
+            rto += transm_global_params.DELAYED_ACK_TIMEOUT
+        self.base_rto_ = min(max(rto, transm_global_params.RTO_MIN), transm_global_params.RTO_MAX)
+        self.backoff_ = 1
+
+    def back_off(self):
+        if self.base_rto_ * self.backoff_ < transm_global_params.RTO_MAX:
+            self.backoff_ *= 2
+
+    def rto(self):
+        return min(self.base_rto_ * self.backoff_, transm_global_params.RTO_MAX)
@@ -1,20 +1,46 @@
 import time
 import datetime
 import sys
+import os
+import mmap
+import traceback
+import heapq
+from collections import deque
 
 from ipc_manager import IPCManager
 from frame import Frame
-from utils import split_string
+from frame import unpack_sack_bitmap
+from rtt_estimator import RttEstimator
+from congestion_control import make_congestion_control
+from metrics import LinkMetrics
+from tracing import Tracer
+import tracing
+from fec import with_fec
+from protocol_driver import Wait
+from protocol_driver import drive
+from protocol_driver import drive_async
+from channel import with_channel
+from utils import read_chunks
+from utils import with_last_flag
 from utils import get_time_h_m_s
-from utils import flip_biased_coin
 from utils import get_delta_ms
 from transm_global_params import TransmissionProtocol
 import transm_global_params
 
 
+def oldest(send_time, other_send_time):
+    # of two send times of acked frames, None for a retransmitted one (Karn's rule)
+    if send_time is None or (other_send_time is not None and other_send_time < send_time):
+        return other_send_time
+    return send_time
+
+
 class Sender:
-    def __init__(self, ipc_manager, transmission_protocol, verbose=False):
-        self.ipc_manager_ = ipc_manager
+    def __init__(self, ipc_manager, transmission_protocol, verbose=False, congestion_control=None, clock=time.time,
+                 tracer=None, link_id=0):
+        # clock() is the time source of the protocol, the simulator (see simulator.py) passes its virtual clock
+        self.ipc_manager_ = with_fec(with_channel(ipc_manager), transmission_protocol)
+        self.clock_ = clock
         self.transmission_protocol_ = transmission_protocol
         if transmission_protocol == TransmissionProtocol.ALGORITHM_TYPE_GBN:
             if verbose:
@@ -23,124 +49,310 @@ class Sender:
             if verbose:
                 print("sender: SELECTIVE REPEAT")
         self.VERBOSE = verbose
+        # per frame events go to the tracer (see tracing.py) as link_id, verbose only prints the milestones of the
+        # connection and keeps a tracer of its own when none is given
+        if tracer is None and verbose:
+            tracer = Tracer()
+        self.tracer_ = tracer
+        self.link_id_ = link_id
 
         self.total_sent_ = 0
         self.total_received_ack_ = 0
+        self.total_fast_retransmit_ = 0  # frames resent on a nack or duplicate acks instead of a timeout
+        self.metrics_ = LinkMetrics()
 
-    def wait_for_connection(self):
-        time_start = time.time()
-        time_since_last_try = time.time()
-        while time.time() - time_start < transm_global_params.CONNECTION_TIMEOUT:
+        # kept across transmissions, so every connection converges to its own RTO
+        if transmission_protocol == TransmissionProtocol.ALGORITHM_TYPE_GBN:
+            self.rtt_estimator_ = RttEstimator(transm_global_params.TIMEOUT_GO_BACK_N_SENDER)
+        else:
+            self.rtt_estimator_ = RttEstimator(transm_global_params.TIMEOUT_SEL_REPEAT_SENDER)
+
+        # any CongestionControl policy, its trace_ holds the window changes of this connection
+        if congestion_control is None:
+            congestion_control = make_congestion_control(transm_global_params.CONGESTION_CONTROL_TYPE, clock)
+        self.congestion_control_ = congestion_control
+
+        # advertised by the receiver in every ack, frames beyond it are held back
+        self.receive_window_ = transm_global_params.RECEIVE_BUFFER_SIZE
+
+    def metrics(self):
+        # snapshot of the counters of this link, see metrics.py, safe to take from another thread
+        return dict(self.metrics_.snapshot(), sent=self.total_sent_, received_ack=self.total_received_ack_,
+                    fast_retransmit=self.total_fast_retransmit_)
+
+    def wait_for_connection(self, connection_data=None):
+        # connection_data travels with the connection request and is kept by the receiver as connection_data_
+        return drive(self.connect(connection_data), self.ipc_manager_.get_many_from_receiver)
+
+    async def wait_for_connection_async(self, connection_data=None):
+        # wait_for_connection as a coroutine, the event loop runs the timers and the waits for acks
+        return await drive_async(self.connect(connection_data), self.ipc_manager_.get_many_from_receiver_async)
+
+    def connect(self, connection_data=None):
+        # protocol generator of wait_for_connection, see protocol_driver.py
+        time_start = self.clock_()
+        time_since_last_try = time_start
+        while True:
+            cur_time = self.clock_()
+            if cur_time >= time_start + transm_global_params.CONNECTION_TIMEOUT:
+                return False
 
-            if time.time() - time_since_last_try > transm_global_params.CONNECTION_ESTABLISHMENT_INTERVAL:
+            if cur_time >= time_since_last_try + transm_global_params.CONNECTION_ESTABLISHMENT_INTERVAL:
                 if self.VERBOSE:
                     print("sender: Trying to connect", get_time_h_m_s())
-                frame = Frame(None, transm_global_params.ESTABLISH_CONNECTION_CODE, False, False)
+                if self.tracer_ is not None:
+                    self.tracer_.record(tracing.CONNECT_TRY, -1, self.link_id_)
+                frame = Frame(connection_data, transm_global_params.ESTABLISH_CONNECTION_CODE, False, False)
                 self.ipc_manager_.send_to_receiver(frame)
-                time_since_last_try = time.time()
+                time_since_last_try = cur_time
 
-            ack = self.ipc_manager_.get_from_receiver()
-            if ack is None:
-                continue
-            if ack.seq_num_ == transm_global_params.ESTABLISH_CONNECTION_CODE:
-                if self.VERBOSE:
-                    print("sender: Connection established", get_time_h_m_s())
-                return True
-        return False
+            wake_time = min(time_since_last_try + transm_global_params.CONNECTION_ESTABLISHMENT_INTERVAL,
+                            time_start + transm_global_params.CONNECTION_TIMEOUT)
+            acks = yield Wait(max(0.0, wake_time - cur_time))
+            for ack in acks:
+                if ack.is_corrupted_:
+                    continue
+                if ack.seq_num_ == transm_global_params.ESTABLISH_CONNECTION_CODE:
+                    self.receive_window_ = ack.window_
+                    if self.VERBOSE:
+                        print("sender: Connection established", get_time_h_m_s())
+                    if self.tracer_ is not None:
+                        self.tracer_.record(tracing.CONNECTED, -1, self.link_id_)
+                    return True
 
-    def send(self, data_list):
+    def send(self, data, frame_size=transm_global_params.FRAME_SIZE):
+        # data is any iterable of payloads or a binary file object read in frame_size chunks,
+        # payloads are pulled lazily so only the frames in the window are held in memory
+        return drive(self.send_iter(data, frame_size), self.ipc_manager_.get_many_from_receiver)
+
+    async def send_async(self, data, frame_size=transm_global_params.FRAME_SIZE):
+        return await drive_async(self.send_iter(data, frame_size), self.ipc_manager_.get_many_from_receiver_async)
+
+    def send_iter(self, data, frame_size=transm_global_params.FRAME_SIZE):
+        # protocol generator of send, see protocol_driver.py
+        if hasattr(data, 'read'):
+            data = read_chunks(data, frame_size)
         if self.transmission_protocol_ == TransmissionProtocol.ALGORITHM_TYPE_GBN:
-            return self.send_go_back_n(data_list)
+            return self.send_go_back_n(data)
         elif self.transmission_protocol_ == TransmissionProtocol.ALGORITHM_TYPE_SR:
-            return self.send_sel_repeat(data_list)
+            return self.send_sel_repeat(data)
 
-    def send_sel_repeat(self, data_list):
+    def send_file(self, path, frame_size=transm_global_params.FRAME_SIZE):
+        # payloads are memoryview slices of the memory-mapped file, so no copy is made before the IPC write
+        with open(path, 'rb') as file:
+            file_size = os.fstat(file.fileno()).st_size
+            if file_size == 0:
+                return True
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                view = memoryview(data)
+                try:
+                    return self.send(view[offset: offset + frame_size] for offset in range(0, file_size, frame_size))
+                except BaseException as error:
+                    # the frames of the transfer in the traceback still hold slices of the map, which could
+                    # not be closed then and the BufferError would replace error
+                    traceback.clear_frames(error.__traceback__)
+                    raise
+                finally:
+                    view.release()
+
+    def send_window(self, is_idle, probe_time, cur_time):
+        # frames allowed past the first unacked one, the smaller of the congestion and the advertised window.
+        # While the receiver advertises a zero window and nothing is in flight, a single new frame is sent
+        # every RTO as a probe, its ack carries the reopened window
+        window = min(self.congestion_control_.window(), self.receive_window_)
+        if window != 0 or not is_idle:
+            return window, None
+        if probe_time is None:
+            return 0, cur_time + self.rtt_estimator_.rto()
+        if cur_time < probe_time:
+            return 0, probe_time
+        if self.tracer_ is not None:
+            self.tracer_.record(tracing.ZERO_WINDOW_PROBE, -1, self.link_id_)
+        return 1, None
+
+    def send_sel_repeat(self, payloads):
         seq_num_first = 0
         seq_num_last = 0
 
-        cur_data_block_idx = 0
+        payloads = with_last_flag(payloads)
         is_waiting_last_ack = False
 
         # last_frame_timeout_start = 0
 
-        sent_frames = []
-        timers = []
+        sent_frames = {}  # seq num -> frame waiting for ack
+        send_times = {}  # seq num -> time of the first transmission, dropped on retransmission (Karn's rule)
+        timers = []  # min-heap of (deadline, seq num), entries of acked or rescheduled frames are skipped on pop
+        deadlines = {}  # seq num -> current retransmission deadline
+        recover_seq_num = 0  # losses of frames sent before the last window decrease don't decrease it again
+        probe_time = None
+        window_send_times = deque()  # first transmission of the frames from seq_num_first on
+        metrics = self.metrics_
+        metrics.retransmits_per_seq_.clear()
+        tracer = self.tracer_
+        link_id = self.link_id_
 
         if self.VERBOSE:
             print("sender: Start transmission", get_time_h_m_s())
+        if tracer is not None:
+            tracer.record(tracing.START, -1, link_id)
 
-        start_transmission_time = time.time()
+        start_transmission_time = self.clock_()
         while True:
-            if time.time() - start_transmission_time > transm_global_params.TRANSMISSION_TIMEOUT:
+            cur_time = self.clock_()
+            if cur_time >= start_transmission_time + transm_global_params.TRANSMISSION_TIMEOUT:
+                if tracer is not None:
+                    tracer.record(tracing.TRANSMISSION_FAILED, seq_num_first, link_id)
                 return False
-            if seq_num_last < seq_num_first + transm_global_params.WINDOW_SIZE and not is_waiting_last_ack:
+
+            burst = []  # every frame the window allows right now goes out in one IPC write
+            is_idle = len(sent_frames) == 0 and not is_waiting_last_ack
+            window, probe_time = self.send_window(is_idle, probe_time, cur_time)
+            while seq_num_last < seq_num_first + window and not is_waiting_last_ack:
+                # without any payload the transfer is a single empty last frame, so both ends see it finish
+                payload, is_last = next(payloads, (b'', True))
                 frame = Frame(
-                    data=data_list[cur_data_block_idx],
+                    data=payload,
                     seq_num=seq_num_last,
-                    is_last=True if cur_data_block_idx == len(data_list) - 1 else False,
-                    is_corrupted=flip_biased_coin(transm_global_params.ERROR_PROBABILITY)
+                    is_last=is_last,
+                    is_corrupted=False
                 )
 
-                if self.VERBOSE:
-                    print("sender: Send frame", seq_num_last, "is corrupted:", frame.is_corrupted_, get_time_h_m_s())
-                self.ipc_manager_.send_to_receiver(frame)
-                self.total_sent_ += 1
-                cur_data_block_idx += 1
+                if tracer is not None:
+                    tracer.record(tracing.SEND_FRAME, seq_num_last, link_id)
+                burst.append(frame)
 
-                if cur_data_block_idx == len(data_list):
+                if is_last:
                     if self.VERBOSE:
                         print("sender: Wait last ack, no new frame", get_time_h_m_s())
                     is_waiting_last_ack = True
                     # last_frame_timeout_start = time.time()
 
-                sent_frames.append(frame)
-                timers.append(time.time())
+                sent_frames[seq_num_last] = frame
+                send_times[seq_num_last] = cur_time
+                window_send_times.append(cur_time)
+                deadlines[seq_num_last] = cur_time + self.rtt_estimator_.rto()
+                heapq.heappush(timers, (deadlines[seq_num_last], seq_num_last))
                 seq_num_last += 1
 
-            ack = self.ipc_manager_.get_from_receiver()
-            if ack is not None and not ack.is_corrupted_:
+            self.ipc_manager_.send_many_to_receiver(burst)
+            self.total_sent_ += len(burst)
+
+            wake_time = start_transmission_time + transm_global_params.TRANSMISSION_TIMEOUT
+            if len(timers) != 0:
+                wake_time = min(wake_time, timers[0][0])
+            if probe_time is not None:
+                wake_time = min(wake_time, probe_time)
+
+            acks = yield Wait(max(0.0, wake_time - cur_time))
+            cur_time = self.clock_()
+            nacked = []
+            # send time of the oldest frame acked in the batch. Acks drained together answer the same burst,
+            # one RTT sample per ack would feed the estimator near copies of it and collapse RTTVAR; the oldest
+            # one also counts the time the receiver held its ack
+            rtt_sample_time = None
+            for ack in acks:
+                if ack.is_corrupted_:
+                    if tracer is not None:
+                        tracer.record(tracing.CORRUPTED_ACK, ack.seq_num_, link_id)
+                    continue
+
                 self.total_received_ack_ += 1
-                if seq_num_first < ack.seq_num_ <= seq_num_last:
-                    if self.VERBOSE:
-                        print("sender: Received ack", ack.seq_num_, get_time_h_m_s())
+                self.receive_window_ = ack.window_
+                if ack.is_nack_:
+                    if tracer is not None:
+                        tracer.record(tracing.RECEIVE_NACK, ack.seq_num_, link_id)
+                    nacked.append(ack.seq_num_)
+                    continue
+
+                acked_count = len(sent_frames)
+                if ack.data_ is not None and seq_num_first <= ack.seq_num_ <= seq_num_last:
+                    # selective ack: everything below the cumulative ack plus the frames flagged in the bitmap
+                    if tracer is not None:
+                        tracer.record(tracing.RECEIVE_SACK, ack.seq_num_, link_id)
+
+                    for seq_num in range(seq_num_first, ack.seq_num_):
+                        if sent_frames.pop(seq_num, None) is not None:
+                            rtt_sample_time = oldest(rtt_sample_time, send_times.pop(seq_num, None))
+                            del deadlines[seq_num]
+                    for seq_num in unpack_sack_bitmap(ack.seq_num_, ack.data_):
+                        if sent_frames.pop(seq_num, None) is not None:
+                            rtt_sample_time = oldest(rtt_sample_time, send_times.pop(seq_num, None))
+                            del deadlines[seq_num]
+
+                    while seq_num_first < seq_num_last and seq_num_first not in sent_frames:
+                        seq_num_first += 1
+                        metrics.time_in_window_.add(cur_time - window_send_times.popleft())
+
+                elif seq_num_first < ack.seq_num_ <= seq_num_last:
+                    if tracer is not None:
+                        tracer.record(tracing.RECEIVE_ACK, ack.seq_num_, link_id)
 
-                    idx_del = 0
-                    for i in range(len(sent_frames)):
-                        if sent_frames[i] is not None and ack.seq_num_ - 1 == sent_frames[i].seq_num_:
-                            idx_del = i
-                            break
+                    if sent_frames.pop(ack.seq_num_ - 1, None) is not None:
+                        rtt_sample_time = oldest(rtt_sample_time, send_times.pop(ack.seq_num_ - 1, None))
+                        del deadlines[ack.seq_num_ - 1]
 
-                    sent_frames[idx_del] = None
-                    timers[idx_del] = None
+                    while seq_num_first < seq_num_last and seq_num_first not in sent_frames:
+                        seq_num_first += 1
+                        metrics.time_in_window_.add(cur_time - window_send_times.popleft())
 
-                    if idx_del == 0:
-                        while len(sent_frames) != 0 and sent_frames[0] is None:
-                            del sent_frames[0]
-                            del timers[0]
-                            seq_num_first += 1
+                self.congestion_control_.on_ack(acked_count - len(sent_frames))
 
                 if is_waiting_last_ack and len(sent_frames) == 0:
                     if self.VERBOSE:
                         print("sender: Received last ack, terminate transmission", get_time_h_m_s())
+                    if tracer is not None:
+                        tracer.record(tracing.LAST_ACK, ack.seq_num_, link_id)
+                    metrics.transfer_duration_.add(cur_time - start_transmission_time)
                     return True
 
-            if ack is not None and ack.is_corrupted_:
-                if self.VERBOSE:
-                    print("sender: Corrupted ack, ignoring", ack.seq_num_, get_time_h_m_s())
+            if rtt_sample_time is not None:
+                self.rtt_estimator_.add_sample(cur_time - rtt_sample_time)
+                metrics.rtt_.add(cur_time - rtt_sample_time)
 
-            for i in range(len(timers)):
-                if timers[i] is None:
+            burst = []
+            for seq_num in dict.fromkeys(nacked):  # nacked frames are resent right away, with a fresh timer
+                frame = sent_frames.get(seq_num)
+                if frame is None:
                     continue
-                cur_time = time.time()
-                if cur_time - timers[i] > transm_global_params.TIMEOUT_SEL_REPEAT_SENDER:
-                    sent_frames[i].is_corrupted_ = flip_biased_coin(transm_global_params.ERROR_PROBABILITY)
-                    self.ipc_manager_.send_to_receiver(sent_frames[i])
-                    self.total_sent_ += 1
-
-                    timers[i] = time.time()
-                    if self.VERBOSE:
-                        print("sender: Timeout, retransmit", sent_frames[i].seq_num_, "is corrupted:",
-                              sent_frames[i].is_corrupted_, get_time_h_m_s())
+                burst.append(frame)
+                send_times.pop(seq_num, None)
+                deadlines[seq_num] = cur_time + self.rtt_estimator_.rto()
+                heapq.heappush(timers, (deadlines[seq_num], seq_num))
+                self.total_fast_retransmit_ += 1
+                metrics.retransmits_per_seq_[seq_num] += 1
+
+                if tracer is not None:
+                    tracer.record(tracing.FAST_RETRANSMIT, seq_num, link_id)
+
+            expired = []
+            while len(timers) != 0 and timers[0][0] <= cur_time:
+                deadline, seq_num = heapq.heappop(timers)
+                frame = sent_frames.get(seq_num)
+                if frame is None or deadlines[seq_num] != deadline:
+                    continue
+                expired.append(frame)
+                send_times.pop(seq_num, None)
+
+                if tracer is not None:
+                    tracer.record(tracing.TIMEOUT, seq_num, link_id)
+
+            if len(expired) != 0:
+                self.rtt_estimator_.back_off()  # once per expiry round, not once per frame
+                metrics.timeouts_ += 1
+                for frame in expired:
+                    deadlines[frame.seq_num_] = cur_time + self.rtt_estimator_.rto()
+                    heapq.heappush(timers, (deadlines[frame.seq_num_], frame.seq_num_))
+                    metrics.retransmits_per_seq_[frame.seq_num_] += 1
+                burst.extend(expired)
+
+            # acks of the other frames keep flowing, so a selective loss only halves the window
+            if len(burst) != 0 and max(frame.seq_num_ for frame in burst) >= recover_seq_num:
+                self.congestion_control_.on_loss()
+                recover_seq_num = seq_num_last
+
+            self.ipc_manager_.send_many_to_receiver(burst)
+            self.total_sent_ += len(burst)
+            metrics.retransmitted_frames_ += len(burst)
 
             # if is_waiting_last_ack:
             #     if time.time() - last_frame_timeout_start > transm_global_params.TIMEOUT_LAST_PACKET_SENDER:
@@ -148,77 +360,147 @@ class Sender:
             #             print("sender: Last frame re-sending timeout, terminating", get_time_h_m_s())
             #         break
 
-    def send_go_back_n(self, data_list):
+    def send_go_back_n(self, payloads):
         seq_num_first = 0
         seq_num_last = 0
 
-        time_since_last_ack = time.time()
+        time_since_last_ack = self.clock_()
 
-        cur_data_block_idx = 0
+        payloads = with_last_flag(payloads)
         is_waiting_last_ack = False
 
         # last_frame_timeout_start = 0
 
         sent_frames = []
+        send_times = {}  # seq num -> time of the first transmission, cleared when the window is resent (Karn's rule)
+        dup_ack_count = 0
+        # window start at the last resend, until the resent first frame is acked the duplicate acks
+        # still come from frames sent before that resend
+        resend_seq_num_first = -1
+        probe_time = None
+        window_send_times = deque()  # first transmission of the frames from seq_num_first on
+        metrics = self.metrics_
+        metrics.retransmits_per_seq_.clear()
+        tracer = self.tracer_
+        link_id = self.link_id_
 
         if self.VERBOSE:
             print("sender: Start transmission", get_time_h_m_s())
+        if tracer is not None:
+            tracer.record(tracing.START, -1, link_id)
 
-        start_transmission_time = time.time()
+        start_transmission_time = self.clock_()
         while True:
-            if time.time() - start_transmission_time > transm_global_params.TRANSMISSION_TIMEOUT:
+            cur_time = self.clock_()
+            if cur_time >= start_transmission_time + transm_global_params.TRANSMISSION_TIMEOUT:
+                if tracer is not None:
+                    tracer.record(tracing.TRANSMISSION_FAILED, seq_num_first, link_id)
                 return False
-            if seq_num_last < seq_num_first + transm_global_params.WINDOW_SIZE and not is_waiting_last_ack:
+
+            burst = []  # every frame the window allows right now goes out in one IPC write
+            is_idle = len(sent_frames) == 0 and not is_waiting_last_ack
+            window, probe_time = self.send_window(is_idle, probe_time, cur_time)
+            while seq_num_last < seq_num_first + window and not is_waiting_last_ack:
+                # without any payload the transfer is a single empty last frame, so both ends see it finish
+                payload, is_last = next(payloads, (b'', True))
                 frame = Frame(
-                    data=data_list[cur_data_block_idx],
+                    data=payload,
                     seq_num=seq_num_last,
-                    is_last=True if cur_data_block_idx == len(data_list) - 1 else False,
-                    is_corrupted=flip_biased_coin(transm_global_params.ERROR_PROBABILITY)
+                    is_last=is_last,
+                    is_corrupted=False
                 )
 
-                if self.VERBOSE:
-                    print("sender: Send frame", seq_num_last, "is corrupted:", frame.is_corrupted_, get_time_h_m_s())
-                self.ipc_manager_.send_to_receiver(frame)
-                self.total_sent_ += 1
-                cur_data_block_idx += 1
+                if tracer is not None:
+                    tracer.record(tracing.SEND_FRAME, seq_num_last, link_id)
+                burst.append(frame)
 
-                if cur_data_block_idx == len(data_list):
+                if is_last:
                     if self.VERBOSE:
                         print("sender: Wait last ack, no new frame", get_time_h_m_s())
                     is_waiting_last_ack = True
                     # last_frame_timeout_start = time.time()
 
                 sent_frames.append(frame)
+                send_times[seq_num_last] = self.clock_()
+                window_send_times.append(cur_time)
                 seq_num_last += 1
 
-            ack = self.ipc_manager_.get_from_receiver()
+            if is_idle and len(burst) != 0:  # the timer starts again with the first frame in flight
+                time_since_last_ack = cur_time
+            self.ipc_manager_.send_many_to_receiver(burst)
+            self.total_sent_ += len(burst)
+
+            wake_time = start_transmission_time + transm_global_params.TRANSMISSION_TIMEOUT
+            if len(sent_frames) != 0:
+                wake_time = min(wake_time, time_since_last_ack + self.rtt_estimator_.rto())
+            if probe_time is not None:
+                wake_time = min(wake_time, probe_time)
+            acks = yield Wait(max(0.0, wake_time - self.clock_()))
+
+            rtt_sample_time = None  # one sample per batch of acks, as in send_sel_repeat
+            for ack in acks:
+                if ack.is_corrupted_:
+                    if tracer is not None:
+                        tracer.record(tracing.CORRUPTED_ACK, ack.seq_num_, link_id)
+                    continue
 
-            if ack is not None and not ack.is_corrupted_:
                 self.total_received_ack_ += 1
-                if seq_num_first < ack.seq_num_ <= seq_num_last:
-                    if self.VERBOSE:
-                        print("sender: Received ack", ack.seq_num_, get_time_h_m_s())
+                self.receive_window_ = ack.window_
+                if ack.seq_num_ == seq_num_first and len(sent_frames) != 0:
+                    dup_ack_count += 1
+                    if tracer is not None:
+                        tracer.record(tracing.DUPLICATE_ACK, ack.seq_num_, link_id)
+                elif seq_num_first < ack.seq_num_ <= seq_num_last:
+                    if tracer is not None:
+                        tracer.record(tracing.RECEIVE_ACK, ack.seq_num_, link_id)
+                    dup_ack_count = 0
+                    self.congestion_control_.on_ack(ack.seq_num_ - seq_num_first)
                     while seq_num_first < ack.seq_num_:
+                        rtt_sample_time = oldest(rtt_sample_time, send_times.pop(seq_num_first, None))
                         seq_num_first += 1
-                        time_since_last_ack = time.time()
+                        time_since_last_ack = self.clock_()
                         del sent_frames[0]
+                        metrics.time_in_window_.add(time_since_last_ack - window_send_times.popleft())
                     if is_waiting_last_ack and len(sent_frames) == 0:
                         if self.VERBOSE:
                             print("sender: Received last ack, terminate transmission", get_time_h_m_s())
+                        if tracer is not None:
+                            tracer.record(tracing.LAST_ACK, ack.seq_num_, link_id)
+                        metrics.transfer_duration_.add(time_since_last_ack - start_transmission_time)
                         return True
-            else:
-                if ack is not None and ack.is_corrupted_:
-                    if self.VERBOSE:
-                        print("sender: Corrupted ack, ignoring", ack.seq_num_, get_time_h_m_s())
-                if time.time() - time_since_last_ack > transm_global_params.TIMEOUT_GO_BACK_N_SENDER:
-                    if self.VERBOSE:
-                        print("sender: Timeout, resend entire window", get_time_h_m_s())
-                    for frame in sent_frames:
-                        frame.is_corrupted_ = flip_biased_coin(transm_global_params.ERROR_PROBABILITY)
-                        self.ipc_manager_.send_to_receiver(frame)
-                        self.total_sent_ += 1
 
-                    time_since_last_ack = time.time()
+            if rtt_sample_time is not None:
+                self.rtt_estimator_.add_sample(time_since_last_ack - rtt_sample_time)
+                metrics.rtt_.add(time_since_last_ack - rtt_sample_time)
+
+            is_timeout = len(sent_frames) != 0 and self.clock_() >= time_since_last_ack + self.rtt_estimator_.rto()
+            # the receiver acks every frame after a gap with the same seq num, so the window is resent as soon as
+            # DUP_ACK_THRESHOLD of them arrive instead of waiting for the timeout. A smaller window can't produce
+            # that many, then one duplicate per frame in flight after the lost one is enough (early retransmit)
+            dup_ack_threshold = min(transm_global_params.DUP_ACK_THRESHOLD, max(1, len(sent_frames) - 1))
+            is_fast_retransmit = (not is_timeout and transm_global_params.DUP_ACK_THRESHOLD != 0
+                                  and dup_ack_count >= dup_ack_threshold and seq_num_first != resend_seq_num_first)
+            if is_timeout or is_fast_retransmit:
+                if is_timeout:
+                    if tracer is not None:
+                        tracer.record(tracing.TIMEOUT, seq_num_first, link_id)
+                    self.rtt_estimator_.back_off()
+                    self.congestion_control_.on_timeout()
+                    metrics.timeouts_ += 1
+                else:
+                    if tracer is not None:
+                        tracer.record(tracing.FAST_RETRANSMIT, seq_num_first, link_id)
+                    self.congestion_control_.on_loss()
+                    self.total_fast_retransmit_ += len(sent_frames)
+                send_times.clear()
+                self.ipc_manager_.send_many_to_receiver(sent_frames)
+                self.total_sent_ += len(sent_frames)
+                metrics.retransmitted_frames_ += len(sent_frames)
+                metrics.retransmits_per_seq_.update(range(seq_num_first, seq_num_last))
+
+                dup_ack_count = 0
+                resend_seq_num_first = seq_num_first
+                time_since_last_ack = self.clock_()
 
             # if is_waiting_last_ack and len(sent_frames) == 1:
             #     if time.time() - last_frame_timeout_start > transm_global_params.TIMEOUT_LAST_PACKET_SENDER:
@@ -228,8 +510,6 @@ class Sender:
 
 
 if __name__ == "__main__":
-    frames_count = 100
-
     m = IPCManager(('localhost', 5000))
     m.start()
     # m.connect()
@@ -237,36 +517,39 @@ if __name__ == "__main__":
     input_path = "input.txt"
     if len(sys.argv) > 1:
         input_path = sys.argv[1]
-
-    with open(input_path, 'r') as file:
-        data = file.read()
+    input_size = os.path.getsize(input_path)
 
     sender = Sender(m, transm_global_params.TRANSMISSION_PROTOCOL_TYPE, True)
 
-    sender.wait_for_connection()
+    if transm_global_params.MMAP_FILE_TRANSFER:
+        # the receiver preallocates its output from the size sent with the connection request
+        is_connected = sender.wait_for_connection((input_size, transm_global_params.FRAME_SIZE))
+    else:
+        is_connected = sender.wait_for_connection()
+    if not is_connected:
+        print("sender: No connection, terminating", get_time_h_m_s())
+        m.shutdown()
+        sys.exit(1)
 
     start_time = datetime.datetime.now()
 
-    sender.send(list(split_string(data, frames_count)))
+    if transm_global_params.MMAP_FILE_TRANSFER:
+        sender.send_file(input_path)
+    else:
+        with open(input_path, 'rb') as file:
+            sender.send(file)
 
     finish_time = datetime.datetime.now()
 
-    # with open('sender_results.txt', 'a') as file:
-    #     file.write(
-    #         str(transm_global_params.TRANSMISSION_PROTOCOL_TYPE)
-    #         + " "
-    #         + str(transm_global_params.ERROR_PROBABILITY)
-    #         + " "
-    #         + str(get_delta_ms(start_time, finish_time))
-    #         + " ms"
-    #         + " total_sent: "
-    #         + str(sender.total_sent_)
-    #         + " total_received_ack: "
-    #         + str(sender.total_received_ack_)
-    #         + " win size: "
-    #         + str(transm_global_params.WINDOW_SIZE)
-    #         + "\n"
-    #     )
+    print("sender: Sent", input_size, "bytes,",
+          round(input_size / 1000 / get_delta_ms(start_time, finish_time), 3), "MB/s", get_time_h_m_s())
+    print("sender: Frames sent:", sender.total_sent_, "fast retransmits:", sender.total_fast_retransmit_,
+          get_time_h_m_s())
+    if transm_global_params.FEC_GROUP_SIZE != 0:
+        print("sender: FEC parity frames sent:", sender.ipc_manager_.total_parity_sent_, get_time_h_m_s())
+
+    if sender.tracer_ is not None:
+        sender.tracer_.dump("sender_trace.bin")  # python tracing.py sender_trace.bin prints the timeline
 
     print("sender: Wait before shutdown connection", get_time_h_m_s())
     time.sleep(2)
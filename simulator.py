@@ -0,0 +1,201 @@
+import heapq
+import itertools
+import math
+
+from channel import RandomDraws
+from channel import make_channel
+from frame import Frame
+from protocol_driver import Wait
+from sender import Sender
+from receiver import Receiver
+from tracing import Tracer
+import transm_global_params
+
+
+class Simulator:
+    # Discrete-event engine on a virtual clock. Processes are protocol generators (see protocol_driver.py):
+    # a process runs until it yields Wait(timeout) and is resumed when the timeout expires or a frame arrives
+    # for it, whichever comes first. Time jumps from one event to the next, so a transfer takes as long
+    # as the protocol logic needs to run, and the same seed always gives the same run.
+
+    def __init__(self):
+        self.now_ = 0.0
+        self.events_ = []  # min-heap of (time, order, process), entries of rescheduled processes are skipped
+        self.order_ = itertools.count()  # events at the same time run in the order they were scheduled
+
+    def clock(self):
+        return self.now_
+
+    def start(self, protocol, get_many, inbox):
+        # get_many(timeout) hands the process the frames due now, inbox is the heap its frames arrive in
+        process = SimulatedProcess(protocol, get_many, inbox)
+        self.wake(process, self.now_)
+        return process
+
+    def wake(self, process, wake_time):
+        if not process.is_done_ and wake_time < process.wake_time_:
+            process.wake_time_ = wake_time
+            heapq.heappush(self.events_, (wake_time, next(self.order_), process))
+
+    def run(self):
+        while len(self.events_) != 0:
+            wake_time, _, process = heapq.heappop(self.events_)
+            if process.is_done_ or wake_time != process.wake_time_:
+                continue
+            self.now_ = wake_time
+            self.resume(process)
+
+    def resume(self, process):
+        frames = None
+        if process.is_started_:
+            frames = process.get_many_(timeout=process.timeout_)
+        process.is_started_ = True
+        process.wake_time_ = math.inf
+        while True:
+            try:
+                item = process.protocol_.send(frames)
+            except StopIteration as stop:
+                process.is_done_ = True
+                process.result_ = stop.value
+                return
+            if isinstance(item, Wait):
+                break
+            process.payloads_.append(item)
+            frames = None
+
+        process.timeout_ = item.timeout_
+        wake_time = math.inf if item.timeout_ is None else self.now_ + item.timeout_
+        if len(process.inbox_) != 0:
+            wake_time = min(wake_time, process.inbox_[0][0])
+        self.wake(process, wake_time)
+
+
+class SimulatedProcess:
+    def __init__(self, protocol, get_many, inbox):
+        self.protocol_ = protocol
+        self.get_many_ = get_many
+        self.inbox_ = inbox
+        self.is_started_ = False  # a new generator is started with None, later resumes get the frames
+        self.timeout_ = None  # of the Wait the process is blocked in
+        self.wake_time_ = math.inf
+        self.is_done_ = False
+        self.result_ = None  # return value of the protocol generator
+        self.payloads_ = []  # everything else it yielded
+
+
+class SimulatedLink:
+    # In-memory IPC manager of a simulated link, used by both ends. Frames are passed through a Channel on the
+    # virtual clock, encoded whenever it limits the rate or flips bits, so checksums, bit errors, loss and delays
+    # behave as on a real link.
+    is_link_emulated_ = True  # nothing for with_channel to wrap
+
+    def __init__(self, simulator, to_receiver, to_sender):
+        self.simulator_ = simulator
+        self.to_receiver_ = to_receiver
+        self.to_sender_ = to_sender
+        self.in_flight_to_receiver_ = []  # min-heap of (delivery time, order, frame or its buf)
+        self.in_flight_to_sender_ = []
+        self.receiver_process_ = None  # woken up by the frames for it
+        self.sender_process_ = None
+        self.order_ = itertools.count()
+
+    def send_to_receiver(self, msg):
+        self.send_many_to_receiver([msg])
+
+    def send_to_sender(self, msg):
+        self.send_many_to_sender([msg])
+
+    def send_many_to_receiver(self, msgs):
+        self.transmit(self.to_receiver_, self.in_flight_to_receiver_, self.receiver_process_, msgs)
+
+    def send_many_to_sender(self, msgs):
+        self.transmit(self.to_sender_, self.in_flight_to_sender_, self.sender_process_, msgs)
+
+    def transmit(self, channel, in_flight, process, frames):
+        # the channel needs the encoded frame only for its rate limit and bit errors. A frame that arrives intact
+        # is handed out as a copy of the one sent instead of being decoded (see deliver), unless the encoding
+        # would have converted its payload
+        is_encoded = channel.rate_ != 0 or channel.bit_error_rate_ != 0
+        cur_time = self.simulator_.now_
+        for frame in frames:
+            is_copied = frame.data_ is None or type(frame.data_) is bytes
+            buf = frame.to_bytes() if is_encoded or not is_copied else frame
+            transmitted = channel.transmit(buf, cur_time)
+            if transmitted is None:
+                continue
+            arrived, delivery_time = transmitted
+            if arrived is buf and is_copied:
+                arrived = frame.copy()
+            heapq.heappush(in_flight, (delivery_time, next(self.order_), arrived))
+            if process is not None:
+                self.simulator_.wake(process, delivery_time)
+
+    def get_many_from_sender(self, timeout=0):
+        # never blocks, the simulator resumes the caller once there is something to get or the timeout is over
+        return self.deliver(self.in_flight_to_receiver_)
+
+    def get_many_from_receiver(self, timeout=0):
+        return self.deliver(self.in_flight_to_sender_)
+
+    def has_pending_from_sender(self):
+        return len(self.in_flight_to_receiver_) != 0 and self.in_flight_to_receiver_[0][0] <= self.simulator_.now_
+
+    def has_pending_from_receiver(self):
+        return len(self.in_flight_to_sender_) != 0 and self.in_flight_to_sender_[0][0] <= self.simulator_.now_
+
+    def deliver(self, in_flight):
+        frames = []
+        while len(in_flight) != 0 and in_flight[0][0] <= self.simulator_.now_:
+            arrived = heapq.heappop(in_flight)[2]
+            frames.append(arrived if isinstance(arrived, Frame) else Frame.from_bytes(arrived))
+        return frames
+
+
+class SimulationResult:
+    def __init__(self, is_sent, payloads, duration, send_duration, sender, receiver, tracer=None):
+        self.is_sent_ = is_sent  # what Sender.send returned, False also when the connection failed
+        self.payloads_ = payloads  # in-order payloads delivered by the receiver, None on timeout
+        self.duration_ = duration  # virtual seconds from the start of the connection to the last event
+        self.send_duration_ = send_duration  # virtual seconds spent in Sender.send, None without a connection
+        self.sender_ = sender
+        self.receiver_ = receiver
+        self.tracer_ = tracer  # events of both sides in virtual ns, None unless traced
+
+
+def simulate_transfer(transmission_protocol, payloads, seed=0, connection_data=None, is_traced=False):
+    # connection and transmission of payloads between a Sender and a Receiver over a simulated link with the
+    # CHANNEL_* and BIT_ERROR_RATE parameters; the link draws its random numbers from seed
+    simulator = Simulator()
+    link = SimulatedLink(simulator,
+                         make_channel(transm_global_params.BIT_ERROR_RATE, RandomDraws(2 * seed)),
+                         make_channel(0, RandomDraws(2 * seed + 1)))
+    tracer = Tracer(clock=lambda: round(simulator.now_ * 1e9)) if is_traced else None
+    sender = Sender(link, transmission_protocol, clock=simulator.clock,
+                    tracer=tracer, link_id=tracer.link("sender") if is_traced else 0)
+    receiver = Receiver(link, transmission_protocol, clock=simulator.clock,
+                        tracer=tracer, link_id=tracer.link("receiver") if is_traced else 0)
+    send_times = []
+
+    def sending():
+        if not (yield from sender.connect(connection_data)):
+            return False
+        send_times.append(simulator.now_)
+        is_sent = yield from sender.send_iter(payloads)
+        send_times.append(simulator.now_)
+        return is_sent
+
+    def receiving():
+        if not (yield from receiver.connect()):
+            return False
+        return (yield from receiver.receive_protocol())
+
+    link.receiver_process_ = simulator.start(receiving(), receiver.ipc_manager_.get_many_from_sender,
+                                             link.in_flight_to_receiver_)
+    link.sender_process_ = simulator.start(sending(), sender.ipc_manager_.get_many_from_receiver,
+                                           link.in_flight_to_sender_)
+    simulator.run()
+
+    received = link.receiver_process_.payloads_ if link.receiver_process_.result_ else None
+    send_duration = send_times[1] - send_times[0] if len(send_times) == 2 else None
+    return SimulationResult(link.sender_process_.result_, received, simulator.now_, send_duration, sender, receiver,
+                            tracer)
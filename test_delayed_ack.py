@@ -0,0 +1,79 @@
+import pytest
+
+from delayed_ack import DelayedAck
+from simulator import simulate_transfer
+from transm_global_params import TransmissionProtocol
+import transm_global_params
+
+
+class Clock:
+    def __init__(self):
+        self.now_ = 0.0
+
+    def __call__(self):
+        return self.now_
+
+
+@pytest.fixture(autouse=True)
+def params(monkeypatch):
+    monkeypatch.setattr(transm_global_params, 'DELAYED_ACK', True)
+    monkeypatch.setattr(transm_global_params, 'DELAYED_ACK_COUNT', 3)
+    monkeypatch.setattr(transm_global_params, 'DELAYED_ACK_TIMEOUT', 0.002)
+
+
+def test_every_count_th_frame_is_acked():
+    delayed_ack = DelayedAck(Clock())
+    assert [delayed_ack.hold() for _ in range(7)] == [True, True, False, True, True, False, True]
+
+
+def test_deadline_runs_from_the_first_held_frame():
+    clock = Clock()
+    delayed_ack = DelayedAck(clock)
+    assert delayed_ack.deadline_ is None
+    assert not delayed_ack.is_due(100)
+    clock.now_ = 1
+    assert delayed_ack.hold()
+    clock.now_ = 1.0015
+    assert delayed_ack.hold()
+    assert delayed_ack.deadline_ == pytest.approx(1.002)
+    assert not delayed_ack.is_due(1.0019)
+    assert delayed_ack.is_due(1.002)
+
+
+def test_ack_sent_resets():
+    clock = Clock()
+    delayed_ack = DelayedAck(clock)
+    delayed_ack.hold()
+    delayed_ack.hold()
+    delayed_ack.reset()  # a gap, or the ack timer
+    assert delayed_ack.deadline_ is None
+    assert not delayed_ack.is_due(1)
+    clock.now_ = 5
+    assert delayed_ack.hold()
+    assert delayed_ack.hold()
+    assert delayed_ack.deadline_ == pytest.approx(5.002)
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(transm_global_params, 'DELAYED_ACK', False)
+    delayed_ack = DelayedAck(Clock())
+    assert not delayed_ack.hold()
+    assert delayed_ack.deadline_ is None
+
+
+@pytest.mark.parametrize('transmission_protocol', list(TransmissionProtocol))
+def test_acks_are_coalesced(monkeypatch, transmission_protocol):
+    monkeypatch.setattr(transm_global_params, 'BIT_ERROR_RATE', 0)
+    payloads = [bytes(100)] * 300
+    result = simulate_transfer(transmission_protocol, payloads)
+    assert result.payloads_ == payloads
+    receiver = result.receiver_
+    # in-order frames arriving back to back, the ack timer only goes off at the end of a burst
+    assert receiver.total_sent_ack_ < len(payloads) / 2
+    assert receiver.total_sent_ack_ + receiver.total_saved_ack_ >= len(payloads)
+
+    monkeypatch.setattr(transm_global_params, 'DELAYED_ACK', False)
+    result = simulate_transfer(transmission_protocol, payloads)
+    assert result.payloads_ == payloads
+    assert result.receiver_.total_sent_ack_ >= len(payloads)
+    assert result.receiver_.total_saved_ack_ == 0
@@ -0,0 +1,70 @@
+import random
+
+from frame import Frame
+from frame import HEADER
+from frame import pack_frames
+from frame import pack_sack_bitmap
+from frame import unpack_frames
+from frame import unpack_sack_bitmap
+
+
+def assert_same(frame, expected):
+    for name in Frame.__slots__:
+        assert getattr(frame, name) == getattr(expected, name), name
+
+
+def test_round_trip():
+    frames = [Frame(b'\x00\x01payload', 7, False, False),
+              Frame("text", 8, True, False),
+              Frame([(1, 2.5), (3, 1)], 0, False, False),
+              Frame(None, 9, False, False, is_ack=True, window=64),
+              Frame(None, 3, False, False, is_ack=True, is_nack=True),
+              Frame(b'parity', 2, False, False, is_parity=True),
+              Frame(None, -1, False, False)]
+    for frame in frames:
+        assert_same(Frame.from_bytes(frame.to_bytes()), frame)
+    for frame, expected in zip(unpack_frames(pack_frames(frames)), frames):
+        assert_same(frame, expected)
+
+
+def test_flipped_bit_fails_the_checksum():
+    buf = Frame(b'payload' * 10, 5, True, False).to_bytes()
+    for bit in range(32, len(buf) * 8):  # anywhere after the checksum
+        corrupted = bytearray(buf)
+        corrupted[bit // 8] ^= 1 << (bit % 8)
+        frame = Frame.from_bytes(bytes(corrupted))
+        assert frame.is_corrupted_
+        assert frame.data_ is None
+        assert not frame.is_last_
+
+
+def test_corrupted_checksum():
+    buf = bytearray(Frame(b'payload', 5, False, False).to_bytes())
+    buf[0] ^= 0x80
+    frame = Frame.from_bytes(bytes(buf))
+    assert frame.is_corrupted_
+    assert frame.seq_num_ == 5
+
+
+def test_empty_payload():
+    buf = Frame(b'', 1, True, False).to_bytes()
+    assert len(buf) == HEADER.size
+    frame = Frame.from_bytes(buf)
+    assert frame.data_ == b''
+    assert frame.is_last_
+
+
+def test_sack_bitmap_round_trip():
+    rng = random.Random(0)
+    for _ in range(200):
+        base = rng.randrange(-1, 1000)
+        seq_nums = sorted(rng.sample(range(base + 1, base + 200), rng.randrange(20)))
+        assert unpack_sack_bitmap(base, pack_sack_bitmap(base, seq_nums)) == seq_nums
+
+
+def test_sack_bitmap_bits():
+    assert pack_sack_bitmap(10, []) == b''
+    assert pack_sack_bitmap(10, [11]) == b'\x01'
+    assert pack_sack_bitmap(10, [12, 18, 19]) == b'\x82\x01'
+    assert unpack_sack_bitmap(10, b'\x82\x01') == [12, 18, 19]
+    assert unpack_sack_bitmap(10, b'\x00\x00') == []
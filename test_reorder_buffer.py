@@ -0,0 +1,68 @@
+import random
+
+from frame import Frame
+from reorder_buffer import ReorderBuffer
+
+
+def frame(seq_num):
+    return Frame(seq_num, seq_num, False, False)
+
+
+def test_range():
+    buffer = ReorderBuffer(8)
+    assert not buffer.insert(frame(10), 10)  # the expected one is passed on, not buffered
+    assert not buffer.insert(frame(9), 10)
+    assert not buffer.insert(frame(18), 10)  # would take the slot of 10
+    assert buffer.insert(frame(11), 10)
+    assert buffer.insert(frame(17), 10)
+    assert len(buffer) == 2
+    assert buffer.seq_nums(10) == [11, 17]
+
+
+def test_duplicate():
+    buffer = ReorderBuffer(8)
+    assert buffer.insert(frame(3), 0)
+    assert not buffer.insert(frame(3), 0)
+    assert not buffer.insert(frame(3), 1)
+    assert len(buffer) == 1
+    assert 3 in buffer
+    assert 11 not in buffer  # same slot, other seq num
+
+
+def test_wrap_around():
+    buffer = ReorderBuffer(8)
+    for seq_num in (6, 7, 9, 11):
+        assert buffer.insert(frame(seq_num), 5)
+    assert buffer.seq_nums(5) == [6, 7, 9, 11]  # slots 6, 7, 1, 3
+    assert buffer.pop(5) is None
+    assert buffer.pop(14) is None  # slot 6 holds 6
+    assert buffer.pop(6).seq_num_ == 6
+    assert buffer.pop(7).seq_num_ == 7
+    assert buffer.seq_nums(7) == [9, 11]
+    assert buffer.insert(frame(14), 7)  # slot 6 again
+    assert not buffer.insert(frame(15), 7)
+    assert buffer.seq_nums(8) == [9, 11, 14]
+
+
+def test_against_a_dict():
+    # a receiver taking random frames around its window, delivering whatever becomes in order
+    rng = random.Random(0)
+    capacity = 16
+    buffer = ReorderBuffer(capacity)
+    expected = {}
+    seq_num_expected = 0
+    for _ in range(10000):
+        seq_num = seq_num_expected + rng.randrange(-4, capacity + 4)
+        if seq_num == seq_num_expected:
+            seq_num_expected += 1
+            while seq_num_expected in expected:
+                assert buffer.pop(seq_num_expected) is expected.pop(seq_num_expected)
+                seq_num_expected += 1
+            continue
+        is_accepted = seq_num_expected < seq_num < seq_num_expected + capacity and seq_num not in expected
+        new_frame = frame(seq_num)
+        assert buffer.insert(new_frame, seq_num_expected) == is_accepted
+        if is_accepted:
+            expected[seq_num] = new_frame
+        assert len(buffer) == len(expected)
+        assert buffer.seq_nums(seq_num_expected) == sorted(expected)
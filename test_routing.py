@@ -0,0 +1,101 @@
+from heapq import heappop
+from heapq import heappush
+import random
+
+import pytest
+
+from routing import ShortestPathTree
+from routing import changed_edges
+
+
+def adjacency_list(edges, nodes_count):
+    adjacency = {node: [] for node in range(nodes_count)}
+    for (node, neighbor), weight in edges.items():
+        adjacency[node].append((neighbor, weight))
+        adjacency[neighbor].append((node, weight))
+    return adjacency
+
+
+def dijkstra(adjacency, source):
+    distances = {source: 0}
+    heap = [(0, source)]
+    while len(heap) != 0:
+        distance, node = heappop(heap)
+        if distance != distances[node]:
+            continue
+        for neighbor, weight in adjacency.get(node, ()):
+            if distance + weight < distances.get(neighbor, float('inf')):
+                distances[neighbor] = distance + weight
+                heappush(heap, (distance + weight, neighbor))
+    return distances
+
+
+def check(tree, adjacency):
+    # equal paths may be picked differently, so every path is checked against the distances of a full Dijkstra
+    distances = dijkstra(adjacency, tree.source_)
+    assert tree.distances_ == distances
+    weights = {(node, neighbor): weight for node in adjacency for neighbor, weight in adjacency[node]}
+    for node in adjacency:
+        path = tree.path(node)
+        if node == tree.source_ or node not in distances:
+            assert node not in tree.next_hops_
+            continue
+        assert path[0] == tree.source_ and path[-1] == node
+        assert sum(weights[edge] for edge in zip(path, path[1:])) == distances[node]
+        assert tree.next_hops_[node] == path[1]
+    assert set(tree.next_hops_) == distances.keys() - {tree.source_}
+
+
+def change(edges, nodes_count, rng):
+    edges = dict(edges)
+    for _ in range(rng.randint(1, 4)):
+        kind = rng.random()
+        if kind < 0.3 and len(edges) != 0:
+            del edges[rng.choice(list(edges))]
+        elif kind < 0.6 and len(edges) != 0:
+            edges[rng.choice(list(edges))] = rng.randint(1, 10)
+        elif kind < 0.7:  # a node leaves
+            node = rng.randrange(nodes_count)
+            edges = {edge: weight for edge, weight in edges.items() if node not in edge}
+        else:
+            node, neighbor = sorted(rng.sample(range(nodes_count), 2))
+            edges[(node, neighbor)] = rng.randint(1, 10)
+    return edges
+
+
+def test_build():
+    adjacency = {0: [(1, 4), (2, 1)], 1: [(0, 4), (2, 2), (3, 1)], 2: [(0, 1), (1, 2)], 3: [(1, 1)], 4: []}
+    tree = ShortestPathTree(0)
+    tree.build(adjacency)
+    assert tree.distances_ == {0: 0, 1: 3, 2: 1, 3: 4}
+    assert tree.path(3) == [0, 2, 1, 3]
+    assert tree.next_hops_ == {1: 2, 2: 2, 3: 2}
+    assert tree.path(4) == []
+    check(tree, adjacency)
+
+
+def test_changed_edges():
+    old = {0: [(1, 1), (2, 3)], 1: [(0, 1)], 2: [(0, 3)]}
+    new = {0: [(1, 2)], 1: [(0, 2)], 2: []}
+    assert sorted(changed_edges(old, new)) == [(0, 1), (0, 2), (1, 0), (2, 0)]
+    assert changed_edges(old, old) == []
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_update_matches_dijkstra(seed):
+    rng = random.Random(seed)
+    nodes_count = rng.randint(2, 40)
+    edges = {}
+    for _ in range(rng.randint(0, 3 * nodes_count)):
+        node, neighbor = sorted(rng.sample(range(nodes_count), 2))
+        edges[(node, neighbor)] = rng.randint(1, 10)
+    adjacency = adjacency_list(edges, nodes_count)
+    tree = ShortestPathTree(rng.randrange(nodes_count))
+    tree.build(adjacency)
+    check(tree, adjacency)
+    for _ in range(50):
+        edges = change(edges, nodes_count, rng)
+        adjacency_new = adjacency_list(edges, nodes_count)
+        tree.update(adjacency_new, changed_edges(adjacency, adjacency_new))
+        adjacency = adjacency_new
+        check(tree, adjacency)
@@ -0,0 +1,89 @@
+import pytest
+
+from rtt_estimator import RttEstimator
+from simulator import simulate_transfer
+from transm_global_params import TransmissionProtocol
+import transm_global_params
+
+
+@pytest.fixture(autouse=True)
+def params(monkeypatch):
+    monkeypatch.setattr(transm_global_params, 'RTO_MIN', 0.02)
+    monkeypatch.setattr(transm_global_params, 'RTO_MAX', 2)
+    monkeypatch.setattr(transm_global_params, 'RTO_GRANULARITY', 0.002)
+    monkeypatch.setattr(transm_global_params, 'DELAYED_ACK', False)
+
+
+def test_first_sample():
+    estimator = RttEstimator(1)
+    estimator.add_sample(0.1)
+    assert estimator.srtt_ == 0.1
+    assert estimator.rttvar_ == 0.05
+    assert estimator.rto() == pytest.approx(0.1 + 4 * 0.05)
+
+
+def test_steady_link_settles_on_the_granularity():
+    estimator = RttEstimator(1)
+    for _ in range(200):
+        estimator.add_sample(0.05)
+    assert estimator.rto() == pytest.approx(0.05 + transm_global_params.RTO_GRANULARITY)
+
+
+def test_delayed_ack_timeout_is_added(monkeypatch):
+    monkeypatch.setattr(transm_global_params, 'DELAYED_ACK', True)
+    estimator = RttEstimator(1)
+    estimator.add_sample(0.1)
+    assert estimator.rto() == pytest.approx(0.1 + 4 * 0.05 + transm_global_params.DELAYED_ACK_TIMEOUT)
+
+
+def test_clamp():
+    estimator = RttEstimator(1)
+    estimator.add_sample(0.001)
+    assert estimator.rto() == transm_global_params.RTO_MIN
+    estimator = RttEstimator(1)
+    estimator.add_sample(5)
+    assert estimator.rto() == transm_global_params.RTO_MAX
+
+
+def test_back_off_doubles_up_to_the_max():
+    estimator = RttEstimator(0.3)
+    rtos = []
+    for _ in range(6):
+        rtos.append(estimator.rto())
+        estimator.back_off()
+    assert rtos == pytest.approx([0.3, 0.6, 1.2, 2, 2, 2])
+    assert estimator.backoff_ == 8  # stops doubling once past RTO_MAX
+
+
+def test_sample_resets_the_back_off():
+    estimator = RttEstimator(1)
+    estimator.add_sample(0.1)
+    rto = estimator.rto()
+    estimator.back_off()
+    estimator.back_off()
+    assert estimator.rto() == pytest.approx(4 * rto)
+    estimator.add_sample(0.1)
+    assert estimator.backoff_ == 1
+    assert estimator.rto() < 2 * rto
+
+
+@pytest.mark.parametrize('transmission_protocol', list(TransmissionProtocol))
+@pytest.mark.parametrize('is_nack', [True, False])
+def test_retransmitted_frames_give_no_samples(monkeypatch, transmission_protocol, is_nack):
+    # Karn's rule: the ack of a resent frame can't tell which transmission it is for. Were it measured from the
+    # first one, the sample would take the wait for the retransmission in, a round trip for a nack and an RTO for
+    # a timeout. A fixed latency and corrupted frames only leave the round trip plus the delayed ack timeout
+    monkeypatch.setattr(transm_global_params, 'DELAYED_ACK', True)
+    monkeypatch.setattr(transm_global_params, 'SELECTIVE_NACK', is_nack)
+    monkeypatch.setattr(transm_global_params, 'BIT_ERROR_RATE', 3e-5)  # about a quarter of the 1 KB frames
+    monkeypatch.setattr(transm_global_params, 'CHANNEL_JITTER', 0)
+    rtt = 2 * transm_global_params.CHANNEL_LATENCY
+    for seed in range(3):
+        result = simulate_transfer(transmission_protocol, [bytes(1000)] * 200, seed=seed)
+        assert result.is_sent_
+        assert result.sender_.metrics_.retransmitted_frames_ != 0
+        samples = result.sender_.metrics_.rtt_.snapshot()
+        assert samples.count() != 0
+        # upper bound of the bucket of the longest sample, at most 19% above it
+        assert samples.percentile(100) < 1.2 * (rtt + transm_global_params.DELAYED_ACK_TIMEOUT)
+        assert result.sender_.rtt_estimator_.srtt_ == pytest.approx(rtt, rel=0.2)
@@ -0,0 +1,40 @@
+from simulator import simulate_transfer
+from transm_global_params import ChannelLossType
+from transm_global_params import TransmissionProtocol
+import transm_global_params
+
+
+def payloads(count):
+    return [bytes([i % 256]) * 100 for i in range(count)]
+
+
+def test_lossless(monkeypatch):
+    monkeypatch.setattr(transm_global_params, 'BIT_ERROR_RATE', 0)
+    result = simulate_transfer(TransmissionProtocol.ALGORITHM_TYPE_SR, payloads(50))
+    assert result.is_sent_
+    assert result.payloads_ == payloads(50)
+    assert result.sender_.metrics_.timeouts_ == 0
+
+
+def test_lost_frames_are_resent_on_their_own_deadline(monkeypatch):
+    # without nacks only the timers of the lost frames bring them back
+    monkeypatch.setattr(transm_global_params, 'BIT_ERROR_RATE', 0)
+    monkeypatch.setattr(transm_global_params, 'SELECTIVE_NACK', False)
+    monkeypatch.setattr(transm_global_params, 'CHANNEL_LOSS_TYPE', ChannelLossType.BERNOULLI)
+    monkeypatch.setattr(transm_global_params, 'CHANNEL_LOSS_PROBABILITY', 0.1)
+    for seed in range(5):
+        result = simulate_transfer(TransmissionProtocol.ALGORITHM_TYPE_SR, payloads(100), seed=seed)
+        assert result.is_sent_
+        assert result.payloads_ == payloads(100)
+        metrics = result.sender_.metrics_
+        assert metrics.timeouts_ != 0
+        # selective: about the lost frames and the ones whose acks were lost are resent, not whole windows
+        assert metrics.retransmitted_frames_ < 40
+
+
+def test_corrupted_frames(monkeypatch):
+    monkeypatch.setattr(transm_global_params, 'BIT_ERROR_RATE', 1e-4)
+    result = simulate_transfer(TransmissionProtocol.ALGORITHM_TYPE_SR, payloads(100), seed=1)
+    assert result.is_sent_
+    assert result.payloads_ == payloads(100)
+    assert result.receiver_.metrics_.corrupted_frames_ != 0
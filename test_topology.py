@@ -0,0 +1,149 @@
+import pickle
+import random
+
+import pytest
+
+from designated_node import DesignatedNode
+from node import Node
+from routing import ShortestPathTree
+from topology import TopologyAck
+from topology import TopologyDelta
+from topology import TopologySnapshot
+import transm_global_params
+
+
+def sent(message):
+    # what the node gets over its link
+    return pickle.loads(pickle.dumps(message))
+
+
+def sync(des_node, node):
+    # one round: the designated node sends what the node needs, the node acks what it has applied
+    message = des_node.topology_message(node.id_)
+    if message is not None:
+        node.update_topology(sent(message))
+    ack = [payload for payload in node.topology_report(len(node.neighbor_ids_)) if isinstance(payload, TopologyAck)]
+    if len(ack) != 0:
+        des_node.acked_epochs_[node.id_] = ack[0].epoch_
+    return message
+
+
+def check(des_node, node):
+    assert node.epoch_ == des_node.epoch_
+    assert {key: neighbors for key, neighbors in node.adjacency_list_.items() if len(neighbors) != 0} == \
+           {key: neighbors for key, neighbors in des_node.adjacency_list_.items() if len(neighbors) != 0}
+    routes = ShortestPathTree(node.id_)
+    routes.build(des_node.adjacency_list_)
+    assert node.routes_.distances_ == routes.distances_
+
+
+def random_neighbors(node_id, nodes_count, rng):
+    return [(neighbor, rng.randint(1, 10)) for neighbor in rng.sample(range(nodes_count), rng.randint(0, 3))
+            if neighbor != node_id]
+
+
+def test_first_sync_is_a_snapshot():
+    des_node = DesignatedNode()
+    des_node.update_neighbors(1, [(0, 1), (2, 3)])
+    node = Node(0)
+    assert isinstance(sync(des_node, node), TopologySnapshot)
+    check(des_node, node)
+    assert node.next_hop(2) == 1
+    assert sync(des_node, node) is None  # up to date
+
+
+def test_delta_after_an_ack():
+    des_node = DesignatedNode()
+    des_node.update_neighbors(1, [(0, 1), (2, 3)])
+    node = Node(0)
+    sync(des_node, node)
+    des_node.update_neighbors(2, [(1, 3), (3, 1)])
+    message = sync(des_node, node)
+    assert isinstance(message, TopologyDelta)
+    assert (message.epoch_base_, message.epoch_) == (1, 2)
+    assert sorted(message.changes_) == [2, 3]  # 1 already had 2 as a neighbor
+    check(des_node, node)
+    assert node.next_hop(3) == 1
+
+
+def test_delta_with_an_epoch_gap_is_ignored():
+    des_node = DesignatedNode()
+    des_node.update_neighbors(1, [(0, 1)])
+    node = Node(0)
+    sync(des_node, node)
+    des_node.update_neighbors(2, [(1, 1)])
+    des_node.acked_epochs_[node.id_] = 2  # as if the node had applied epoch 2, it hasn't
+    des_node.update_neighbors(3, [(2, 1)])
+    delta = des_node.topology_message(node.id_)
+    assert (delta.epoch_base_, delta.epoch_) == (2, 3)
+    node.update_topology(sent(delta))
+    assert node.epoch_ == 1
+    assert 3 not in node.adjacency_list_
+    # the node acks the epoch it is still at, the designated node resends from there
+    sync(des_node, node)
+    assert des_node.acked_epochs_[node.id_] == 1
+    assert isinstance(sync(des_node, node), TopologyDelta)
+    check(des_node, node)
+
+
+def test_delta_without_a_topology_is_ignored():
+    node = Node(0)
+    node.update_topology(TopologyDelta(0, 1, {1: [(0, 1)]}))
+    assert node.epoch_ is None
+    assert node.adjacency_list_ == {}
+
+
+def test_stale_delta_is_ignored():
+    des_node = DesignatedNode()
+    des_node.update_neighbors(1, [(0, 1)])
+    node = Node(0)
+    sync(des_node, node)
+    des_node.update_neighbors(2, [(1, 1)])
+    delta = des_node.topology_message(node.id_)
+    node.update_topology(sent(delta))
+    node.update_topology(sent(delta))  # resent, its ack was lost
+    assert node.epoch_ == 2
+    check(des_node, node)
+
+
+def test_behind_the_history_gets_a_snapshot(monkeypatch):
+    monkeypatch.setattr(transm_global_params, 'TOPOLOGY_HISTORY_LENGTH', 4)
+    des_node = DesignatedNode()
+    des_node.update_neighbors(1, [(0, 1)])
+    node = Node(0)
+    sync(des_node, node)
+    for neighbor in range(2, 6):
+        des_node.update_neighbors(neighbor, [(neighbor - 1, 1)])
+    assert isinstance(des_node.topology_message(node.id_), TopologyDelta)  # 4 epochs behind, still in the history
+    des_node.update_neighbors(6, [(5, 1)])
+    assert isinstance(sync(des_node, node), TopologySnapshot)
+    check(des_node, node)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_random_updates_and_losses(monkeypatch, seed):
+    # nodes reporting random neighbor lists, topology messages lost, delayed and reordered, acks lost at random
+    monkeypatch.setattr(transm_global_params, 'TOPOLOGY_HISTORY_LENGTH', 4)
+    rng = random.Random(seed)
+    nodes_count = 12
+    des_node = DesignatedNode()
+    nodes = [Node(node_id) for node_id in range(nodes_count)]
+    in_flight = {node.id_: [] for node in nodes}
+    for _ in range(100):
+        for _ in range(rng.randint(0, 3)):
+            node_id = rng.randrange(nodes_count)
+            des_node.update_neighbors(node_id, random_neighbors(node_id, nodes_count, rng))
+        for node in nodes:
+            message = des_node.topology_message(node.id_)
+            if message is not None and rng.random() < 0.8:
+                in_flight[node.id_].append(sent(message))
+            rng.shuffle(in_flight[node.id_])
+            while len(in_flight[node.id_]) != 0 and rng.random() < 0.6:
+                node.update_topology(in_flight[node.id_].pop())
+            if node.is_ack_due_ and rng.random() < 0.7:
+                node.is_ack_due_ = False
+                des_node.acked_epochs_[node.id_] = node.epoch_
+    for node in nodes:
+        for _ in range(3):  # the message, then the ack of the epoch in it, then nothing left
+            sync(des_node, node)
+        check(des_node, node)
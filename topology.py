@@ -0,0 +1,25 @@
+# Messages of the versioned topology sync. Every change the designated node makes to its adjacency list starts a new
+# epoch. A node acks the epoch it has applied last, and the designated node sends it only the neighbor lists changed
+# since, or the whole adjacency list when the node is further behind than the TOPOLOGY_HISTORY_LENGTH epochs kept
+
+
+class TopologySnapshot:
+    # the whole adjacency list as of epoch
+    def __init__(self, epoch, adjacency_list):
+        self.epoch_ = epoch
+        self.adjacency_list_ = adjacency_list
+
+
+class TopologyDelta:
+    # node -> new neighbor list of every node whose list changed after epoch_base up to epoch. The lists are the
+    # ones of epoch, so the delta brings an adjacency list of any epoch from epoch_base on to epoch
+    def __init__(self, epoch_base, epoch, changes):
+        self.epoch_base_ = epoch_base
+        self.epoch_ = epoch
+        self.changes_ = changes
+
+
+class TopologyAck:
+    # node -> designated node, epoch of the topology the node has applied last, None for none
+    def __init__(self, epoch):
+        self.epoch_ = epoch
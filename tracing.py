@@ -0,0 +1,131 @@
+import json
+import struct
+import sys
+import time
+from itertools import count
+
+import transm_global_params
+
+# event codes
+# sender
+CONNECT_TRY = 1
+CONNECTED = 2
+START = 3
+SEND_FRAME = 4
+RECEIVE_ACK = 5
+RECEIVE_SACK = 6
+RECEIVE_NACK = 7
+DUPLICATE_ACK = 8
+CORRUPTED_ACK = 9
+TIMEOUT = 10  # seq num of the retransmitted frame, or of the first frame of the resent GBN window
+FAST_RETRANSMIT = 11  # on a nack or duplicate acks
+ZERO_WINDOW_PROBE = 12
+LAST_ACK = 13
+TRANSMISSION_FAILED = 14
+# receiver
+RECEIVE_FRAME = 20  # the expected one
+UNEXPECTED_FRAME = 21
+DUPLICATE_FRAME = 22
+CORRUPTED_FRAME = 23
+SEND_ACK = 24
+SEND_NACK = 25
+ACK_TIMER = 26
+WINDOW_UPDATE = 27
+LAST_FRAME = 28
+# node and designated node, on link 0
+NEIGHBOR_UP = 40  # seq num is the id of the neighbor
+NEIGHBOR_DOWN = 41
+NEIGHBORS_SENT = 42  # seq num is the neighbors count
+NEIGHBORS_SEND_TIMEOUT = 43
+TOPOLOGY_RECEIVED = 44  # seq num is the nodes count
+PATHS_REBUILT = 45  # seq num is the paths count
+ISOLATED = 46  # seq num is the id of the node
+TOPOLOGY_UPDATE = 47  # designated node, seq num is the id of the node the update came from
+TOPOLOGY_BROADCAST = 48  # designated node, seq num is the nodes count
+TOPOLOGY_SNAPSHOT_SENT = 49  # designated node, seq num is the id of the node
+TOPOLOGY_DELTA_SENT = 50  # designated node, seq num is the id of the node
+TOPOLOGY_ACK = 51  # designated node, seq num is the id of the node
+
+EVENT_NAMES = {code: name for name, code in globals().items() if name.isupper() and isinstance(code, int)}
+
+RECORD = struct.Struct('<qiqi')  # binary dump of a record: monotonic ns, event code, seq num, link id
+MAGIC = b'ARQT'
+HEADER = struct.Struct('<4sII')  # magic, records count, length of the JSON link names that follow
+
+
+class Tracer:
+    # Ring of the last capacity events in a preallocated list, record() stores one (monotonic ns, event code,
+    # seq num, link id) tuple with the number of its slot and overwrites the oldest one once the ring is full, so
+    # tracing can stay on under load. Slots are taken with next() of an itertools.count, which the GIL makes
+    # atomic, so every thread of a node can write to the same tracer without a lock; a dump taken meanwhile may
+    # miss the records being written
+
+    def __init__(self, capacity=None, clock=time.monotonic_ns):
+        if capacity is None:
+            capacity = transm_global_params.TRACE_CAPACITY
+        self.capacity_ = capacity
+        self.records_ = [None] * capacity
+        self.next_slot_ = count()
+        self.clock_ = clock
+        self.link_names_ = {0: ""}  # link id -> name, 0 is the node itself
+
+    def link(self, name):
+        # a new link id, its name goes into the dumps
+        link_id = len(self.link_names_)
+        self.link_names_[link_id] = name
+        return link_id
+
+    def record(self, event, seq_num=-1, link_id=0):
+        slot = next(self.next_slot_)
+        self.records_[slot % self.capacity_] = (slot, (self.clock_(), event, seq_num, link_id))
+
+    def records(self):
+        # (time ns, event, seq num, link id) from the oldest to the newest, ordered by the slot numbers stored
+        # with them, so reading takes no slot of the ring
+        return [record for _, record in sorted(entry for entry in list(self.records_) if entry is not None)]
+
+    def dump(self, path):
+        # .jsonl gets a line per record after a line with the link names, anything else the binary format:
+        # HEADER, the link names as JSON, then a RECORD per record
+        records = self.records()
+        if path.endswith('.jsonl'):
+            with open(path, 'w') as file:
+                file.write(json.dumps(dict(links=self.link_names_)) + "\n")
+                for time_ns, event, seq_num, link_id in records:
+                    file.write(json.dumps(dict(time_ns=time_ns, event=EVENT_NAMES.get(event, event),
+                                               seq_num=seq_num, link=link_id)) + "\n")
+            return
+        names = json.dumps(self.link_names_).encode()
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, len(records), len(names)))
+            file.write(names)
+            file.write(b''.join(RECORD.pack(*record) for record in records))
+
+
+def load(path):
+    # (link names, records) of a dump in either format, events of the JSONL one are turned back into codes
+    codes = {name: code for code, name in EVENT_NAMES.items()}
+    if path.endswith('.jsonl'):
+        with open(path) as file:
+            link_names = {int(link_id): name for link_id, name in json.loads(file.readline())['links'].items()}
+            records = []
+            for line in file:
+                record = json.loads(line)
+                records.append((record['time_ns'], codes.get(record['event'], record['event']), record['seq_num'],
+                                record['link']))
+        return link_names, records
+    with open(path, 'rb') as file:
+        magic, records_count, names_size = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("not a trace file: " + path)
+        link_names = {int(link_id): name for link_id, name in json.loads(file.read(names_size)).items()}
+        return link_names, list(RECORD.iter_unpack(file.read(RECORD.size * records_count)))
+
+
+if __name__ == "__main__":
+    # timeline of a dump, times in ms from its first record
+    link_names, records = load(sys.argv[1])
+    for time_ns, event, seq_num, link_id in records:
+        print("{:>12.3f} {:<16} {:<22} {}".format((time_ns - records[0][0]) / 1e6,
+                                                  link_names.get(link_id, link_id),
+                                                  EVENT_NAMES.get(event, event), seq_num))
@@ -3,16 +3,49 @@ from enum import Enum
 ESTABLISH_CONNECTION_CODE = -1
 CONNECTION_ESTABLISHMENT_INTERVAL = 0.5
 CONNECTION_TIMEOUT = 1
-WINDOW_SIZE = 5
-TIMEOUT_GO_BACK_N_SENDER = 0.2  # sec
+WINDOW_SIZE = 5  # window of the FIXED_WINDOW congestion control
+MAX_WINDOW_SIZE = 64  # upper bound for the congestion window
+RECEIVE_BUFFER_SIZE = 64  # frames the receiver holds for its consumer, the free part is advertised in acks
+FRAME_SIZE = 1024  # payload bytes per frame when sending a file
+MMAP_FILE_TRANSFER = True  # sender.py/receiver.py map the files instead of streaming them
+TIMEOUT_GO_BACK_N_SENDER = 0.2  # sec, initial RTO until the sender has measured the RTT
 TIMEOUT_SEL_REPEAT_SENDER = 0.2
+RTO_MIN = 0.02  # sec, well above DELAYED_ACK_TIMEOUT
+RTO_GRANULARITY = 0.002  # sec, G of RFC 6298, the least variance the RTO allows for
+RTO_MAX = 2
 # MAX_LAST_PACKET_SENDING = 1
 # TIMEOUT_LAST_PACKET_SENDER = 0.5
 TIMEOUT_RECEIVER = 0.2
-ERROR_PROBABILITY = 0.1
+RECEIVER_ACK_INTERVAL = 0.001  # sec, a slower consumer is interrupted this often to ack newly arrived frames
+SELECTIVE_ACK = True  # SR receiver acks carry the cumulative ack plus a bitmap of frames received out of order
+DELAYED_ACK = True  # ack every DELAYED_ACK_COUNT-th in-order frame, gaps and the last frame are acked at once
+DELAYED_ACK_COUNT = 2
+DELAYED_ACK_TIMEOUT = 0.002  # sec, ack timer for held in-order frames, keep it below RTO_MIN
+SELECTIVE_NACK = True  # SR receiver nacks corrupted and missing frames, the sender resends them without a timeout
+DUP_ACK_THRESHOLD = 3  # GBN sender resends the window after this many duplicate acks, 0 disables fast retransmit
+FEC_GROUP_SIZE = 0  # a parity frame follows every FEC_GROUP_SIZE data frames (see fec.py), 0 disables FEC
+BIT_ERROR_RATE = 1e-5  # of the sender to receiver channel, about 8% of the 1 KB frames fail their checksum
 
 TRANSMISSION_TIMEOUT = 5
 
+IPC_POLL_INTERVAL = 0.001  # used only where the IPC backend can't block on several links at once
+
+# Link emulation (see channel.py), the same model is used in both directions, bit errors only towards the receiver
+CHANNEL_EMULATION = False
+CHANNEL_LATENCY = 0.005  # sec, one way
+CHANNEL_JITTER = 0.001  # sec, standard deviation of the latency
+CHANNEL_REORDER_PROBABILITY = 0.0  # frames held back CHANNEL_REORDER_DELAY longer, the next ones overtake them
+CHANNEL_REORDER_DELAY = 0.002
+CHANNEL_RATE = 0  # bytes/s, 0 disables the bandwidth limit
+CHANNEL_QUEUE_LIMIT = 0  # frames waiting for the link before the next ones are dropped, 0 for an unbounded queue
+CHANNEL_LOSS_PROBABILITY = 0.01  # BERNOULLI
+CHANNEL_GOOD_TO_BAD_PROBABILITY = 0.01  # GILBERT_ELLIOTT, per frame
+CHANNEL_BAD_TO_GOOD_PROBABILITY = 0.25
+CHANNEL_GOOD_LOSS_PROBABILITY = 0.0
+CHANNEL_BAD_LOSS_PROBABILITY = 0.5
+CHANNEL_RANDOM_BLOCK = 4096  # random numbers drawn at once
+CHANNEL_SEED = None
+
 
 class TransmissionProtocol(Enum):
     ALGORITHM_TYPE_GBN = 1
@@ -22,14 +55,40 @@ class TransmissionProtocol(Enum):
 # TRANSMISSION_PROTOCOL_TYPE = TransmissionProtocol.ALGORITHM_TYPE_GBN
 TRANSMISSION_PROTOCOL_TYPE = TransmissionProtocol.ALGORITHM_TYPE_SR
 
+
+class CongestionControlType(Enum):
+    FIXED_WINDOW = 1
+    AIMD = 2
+
+
+# CONGESTION_CONTROL_TYPE = CongestionControlType.FIXED_WINDOW
+CONGESTION_CONTROL_TYPE = CongestionControlType.AIMD
+CWND_TRACE_LENGTH = 10000  # last window changes kept per connection
+TRACE_CAPACITY = 1 << 16  # events kept by a Tracer (see tracing.py), older ones are overwritten
+
+
+class ChannelLossType(Enum):
+    NONE = 1
+    BERNOULLI = 2
+    GILBERT_ELLIOTT = 3
+
+
+CHANNEL_LOSS_TYPE = ChannelLossType.NONE
+# CHANNEL_LOSS_TYPE = ChannelLossType.BERNOULLI
+# CHANNEL_LOSS_TYPE = ChannelLossType.GILBERT_ELLIOTT
+
 # Network parameters
 GRAPH_SYNC_TIME = 3
 GRAPH_SYNC_TIME_INTERVAL = 10
+TOPOLOGY_HISTORY_LENGTH = 32  # epochs of changes the designated node keeps, nodes further behind get a full snapshot
 NODE_LIFETIME = 40
+NODE_REACTOR = True  # Node.run drives all its links from one event loop, False for a thread per link
 HELLO_TIMEOUT = 3
+ROUTING_MAX_INCREMENTAL_CHANGES = 64  # changed edges up to which a topology update repairs the shortest path tree
 DESIGNATED_NODE_LIFETIME = 60
 NODES_NUMBER = 5
 DISTANCE_THRESHOLD = 4
+NETWORK_TRACE = False  # every node records its events and dumps them to <id>_trace.bin on exit, see tracing.py
 
 NETWORK_TIMEOUT = 90
 
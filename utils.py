@@ -1,5 +1,4 @@
 import time
-import random
 
 
 def get_delta_ms(start, finish):
@@ -22,5 +21,22 @@ def split_string(str, substr_count):
         yield str[i: i + substr_len]
 
 
-def flip_biased_coin(p):
-    return True if random.random() < p else False
+def read_chunks(file, chunk_size):
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def with_last_flag(iterable):
+    # yields (item, is_last) pairs, looking one item ahead
+    iterator = iter(iterable)
+    try:
+        prev = next(iterator)
+    except StopIteration:
+        return
+    for item in iterator:
+        yield prev, False
+        prev = item
+    yield prev, True